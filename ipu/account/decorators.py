@@ -4,7 +4,7 @@ from django.conf import settings
 from django.core.exceptions import PermissionDenied
 from django.http import JsonResponse
 from django.core.urlresolvers import reverse
-from account.utils import get_relevant_reversed_url, get_type_created, render_profile_creation
+from account.utils import get_relevant_reversed_url, get_type_created, has_groups, render_profile_creation
 import requests
 
 def require_user_types(user_types_list):
@@ -28,16 +28,18 @@ def require_user_types(user_types_list):
 			if request.user.is_anonymous():
 				return redirect(settings.LOGIN_URL)
 			if request.user.type in user_types_list:
-				requester = get_type_created(request.user)
-				user_type = requester.pop('user_type')
-				if not requester:
+				if hasattr(request, 'profile'): # Set by account.middleware.ProfileMiddleware
+					user_type, profile = request.user_type, request.profile
+				else:
+					requester = get_type_created(request.user)
+					user_type, profile = requester['user_type'], requester.get('profile')
+				if profile is None:
 					url = reverse(settings.PROFILE_CREATION_URL[user_type])
 					if request.is_ajax():
 						return JsonResponse(status=403, data = {'location': url})
 					else:
 #						return redirect(url)
 						return render_profile_creation(request, user_type)
-				profile = requester['profile']
 #				if user_type == 'S' and profile.has_graduated:
 					# Logout
 					# Redirect to auth
@@ -49,6 +51,29 @@ def require_user_types(user_types_list):
 		return inner
 	return decorator
 
+PLACEMENTS_DENIED = 'Permission Denied. You are not authorized to handle college\'s placements.'
+
+def require_groups(group_names, user_types=('F',), message=PLACEMENTS_DENIED):
+	"""
+		Decorator that answers 403 (JSON) to users of `user_types` who belong to none of the groups.
+		Users of other types pass, as college and company accounts aren't grouped.
+		Place it below require_user_types, which makes sure the user is logged in.
+		Eg.
+			@require_user_types(['C', 'F'])
+			@require_groups(['Placement Handler', 'Notifications Manager'])
+			@login_required
+			def foo:
+				...
+	"""
+	def decorator(func):
+		@wraps(func)
+		def inner(request, *args, **kwargs):
+			if request.user.type in user_types and not has_groups(request.user, group_names):
+				return JsonResponse(status=403, data={'error': message})
+			return func(request, *args, **kwargs)
+		return inner
+	return decorator
+
 def require_AJAX_redirect(redirect_appropriately=True):
 	"""
 		Decorator to allow only asynchronous requests.
@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+
+from account.models import MassMail, MassMailRecipient
+
+from datetime import timedelta
+import redis
+
+# The provider caps outbound email (EMAIL_DAILY_LIMIT, EMAIL_HOURLY_LIMIT). Every email sent takes a unit from Redis
+# counters for the current day/hour. Mass mail leaves EMAIL_TRANSACTIONAL_RESERVE of the daily quota to activation and
+# forgot password emails, and whatever doesn't fit stays pending (in priority order) for the next window.
+TRANSACTIONAL_DEFERRED_KEY = 'email_queue:transactional_deferred'
+
+def get_redis():
+	return redis.StrictRedis.from_url(settings.BROKER_URL)
+
+def get_quota_windows(now=None):
+	''' [(redis key, limit, reserve for transactional emails, seconds till reset)] of the current day and hour '''
+	now = timezone.localtime(now or timezone.now())
+	windows = []
+	if settings.EMAIL_DAILY_LIMIT:
+		reset_on = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+		windows.append(('email_quota:day:%s' % now.strftime('%Y%m%d'), settings.EMAIL_DAILY_LIMIT, settings.EMAIL_TRANSACTIONAL_RESERVE, (reset_on - now).total_seconds()))
+	if settings.EMAIL_HOURLY_LIMIT:
+		reset_on = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+		windows.append(('email_quota:hour:%s' % now.strftime('%Y%m%d%H'), settings.EMAIL_HOURLY_LIMIT, 0, (reset_on - now).total_seconds()))
+	return windows
+
+def consume_email_quota(transactional=False):
+	''' Takes one email off every window's quota. Returns the keys of the windows it was taken from, None (and nothing taken) if a window is used up '''
+	r = get_redis()
+	taken = []
+	for key, limit, reserve, reset_in in get_quota_windows():
+		used = r.incr(key)
+		taken.append(key)
+		if used == 1:
+			r.expire(key, int(reset_in) + 60)
+		if used > limit - (0 if transactional else reserve):
+			release_email_quota(taken)
+			return None
+	return taken
+
+def release_email_quota(keys):
+	''' Returns the unit taken for an email that couldn't be sent, to the windows (keys) consume_email_quota took it from '''
+	r = get_redis()
+	for key in keys:
+		r.decr(key)
+
+def get_remaining_quota(transactional=False):
+	''' Emails that may still go out in the current windows; None if there's no cap '''
+	windows = get_quota_windows()
+	if not windows:
+		return None
+	used = get_redis().mget([w[0] for w in windows])
+	return max(0, min(limit - (0 if transactional else reserve) - int(u or 0) for (key, limit, reserve, reset_in), u in zip(windows, used)))
+
+def seconds_until_quota(transactional=False):
+	''' Time till the used up windows reset (a minute at least, the counters may be racing) '''
+	windows = get_quota_windows()
+	used = get_redis().mget([w[0] for w in windows]) if windows else []
+	resets = [reset_in for (key, limit, reserve, reset_in), u in zip(windows, used) if int(u or 0) >= limit - (0 if transactional else reserve)]
+	return max([60] + [int(r) + 1 for r in resets])
+
+def defer_transactional_email(email_task, *args):
+	''' Re-queues an activation/forgot password email task for when the quota is back '''
+	get_redis().incr(TRANSACTIONAL_DEFERRED_KEY)
+	email_task.apply_async(args, {'deferred': True}, countdown=seconds_until_quota(transactional=True))
+
+def transactional_email_resumed():
+	get_redis().decr(TRANSACTIONAL_DEFERRED_KEY)
+
+def get_queue_depth():
+	''' Emails waiting for quota, per priority '''
+	depth = {'Transactional': int(get_redis().get(TRANSACTIONAL_DEFERRED_KEY) or 0)}
+	depth.update((label, 0) for priority, label in MassMail.PRIORITIES)
+	labels = dict(MassMail.PRIORITIES)
+	for row in MassMailRecipient.objects.filter(status__in=['P', 'Q']).values('mass_mail__priority').annotate(count=Count('pk')):
+		depth[labels[row['mass_mail__priority']]] = row['count']
+	return {
+		'pending': depth,
+		'total': sum(depth.values()),
+		'quota': get_remaining_quota(),
+		'transactional_quota': get_remaining_quota(transactional=True),
+	}
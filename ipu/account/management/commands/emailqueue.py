@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from account.emailqueue import get_queue_depth
+from account.tasks import drain_email_queue_task
+
+class Command(BaseCommand):
+	help = 'Shows the outbound email queue depth per priority and the quota left in the current window'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--drain', action='store_true', help='Also dispatch as much of the queue as the quota allows')
+
+	def handle(self, *args, **options):
+		if options['drain']:
+			drain_email_queue_task()
+		depth = get_queue_depth()
+		for label, count in depth['pending'].items():
+			self.stdout.write('%-15s %d' % (label, count))
+		self.stdout.write('%-15s %d' % ('Total', depth['total']))
+		unlimited = depth['quota'] is None
+		self.stdout.write('Quota left: %s (%s for transactional emails)' % ('no cap' if unlimited else depth['quota'], 'no cap' if unlimited else depth['transactional_quota']))
@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from account.models import CustomUser
+from college.models import College, Stream
+from company.models import Company
+from download.models import Requester
+from notification.models import Notification, Issue
+from recruitment.models import Association, PlacementSession, OpenOpportunity
+from student.models import Student
+
+def first_pk(model, **filters):
+	# EXPLAIN doesn't need matching rows, but real values give the planner real statistics
+	return model.objects.filter(**filters).values_list('pk', flat=True).first() or 1
+
+def get_canonical_queries():
+	''' [(name, queryset)] in the shapes the views filter and order by '''
+	user, college, stream = first_pk(CustomUser, type='S'), first_pk(College), first_pk(Stream)
+	today = timezone.now().date()
+	return [
+		('notification feed', Notification.objects.filter(target=user).order_by('-creation_time', '-pk')[:20]),
+		('unread notifications', Notification.objects.filter(target=user, is_read=False)),
+		('studying cohort', Student.studying.filter(college=college, stream=stream, current_year='3')),
+		('open placement sessions', PlacementSession.objects.filter(ended=False, application_deadline__gte=today)),
+		('my download requests', Requester.objects.filter(requester=user).order_by('-requested_on')),
+		('unsolved issues', Issue.objects.filter(college=college, issue_reply__isnull=True).order_by('-marked', '-creation_time')),
+		('approved associations', Association.objects.filter(college=college, approved=True, type='J')),
+		('pending associations', Association.objects.filter(college=college, approved=None)),
+		('company associations', Association.objects.filter(company=first_pk(Company), approved=True)),
+		('open opportunities', OpenOpportunity.objects.filter(college=college, stream=stream, year='3', application_deadline__gte=today)),
+	]
+
+def find_full_scans(sql, params):
+	''' Tables read without an index, per the database's plan '''
+	with connection.cursor() as cursor:
+		if connection.vendor == 'mysql':
+			cursor.execute('EXPLAIN ' + sql, params)
+			columns = [c[0] for c in cursor.description]
+			rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+			return [
+				'%s (%s rows%s)' % (row['table'], row['rows'], ', filesort' if 'filesort' in (row['Extra'] or '') else '')
+				for row in rows if row['type'] == 'ALL'
+			]
+		elif connection.vendor == 'sqlite':
+			cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+			return [row[-1] for row in cursor.fetchall() if row[-1].startswith('SCAN') and 'USING' not in row[-1]]
+		cursor.execute('EXPLAIN ' + sql, params)
+		return [row[0].strip() for row in cursor.fetchall() if 'Seq Scan' in row[0]]
+
+class Command(BaseCommand):
+	help = 'Runs EXPLAIN on the canonical hot queries and flags the ones that scan whole tables'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--sql', action='store_true', help='Print the SQL of each query as well')
+
+	def handle(self, *args, **options):
+		flagged, queries = 0, get_canonical_queries()
+		for name, queryset in queries:
+			sql, params = queryset.query.sql_with_params()
+			scans = find_full_scans(sql, params)
+			flagged += bool(scans)
+			self.stdout.write('%-25s %s' % (name, ('FULL SCAN: ' + '; '.join(scans)) if scans else 'ok'))
+			if options['sql']:
+				self.stdout.write('\t' + sql % tuple(repr(p) for p in params))
+		self.stdout.write('%d of %d queries scan whole tables' % (flagged, len(queries)))
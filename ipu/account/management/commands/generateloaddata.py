@@ -0,0 +1,270 @@
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from account.models import CustomUser
+from account.search import rebuild_index
+from college.models import College, Programme, Stream
+from college.utils import invalidate_reference_data
+from company.models import Company
+from notification.models import Notification, BroadcastNotification, BroadcastCohort
+from recruitment.eligibility import years_to_mask
+from recruitment.models import Association, SelectionCriteria, PlacementSession, OpenOpportunity
+from stats.models import Company as SCompany, College as SCollege, YearRecord as SYear, Placement as SPlacement
+from student.models import ExaminationBoard, Subject, Score, ScoreMarksheet, CGPAMarksheet, SchoolMarksheet, Student, Qualification
+
+from datetime import date, timedelta
+from decimal import Decimal
+import random
+
+# Every synthetic row can be told apart from real data, so that --flush only ever removes what this command made
+EMAIL_DOMAIN = 'synthetic.invalid'
+NAME_PREFIX = 'Synthetic'
+CODE_PREFIX = '9' # College and stream codes are 9xx
+PASSWORD = 'synthetic'
+BATCH_SIZE = 1000
+
+PROGRAMMES = [ # (name, years, [stream names])
+	('B.Tech.', '4', ['Computer Science', 'Information Technology', 'Electronics', 'Mechanical']),
+	('BCA', '3', ['Computer Applications']),
+	('MBA', '2', ['Finance', 'Marketing']),
+]
+FIRSTNAMES = ['aarav', 'aditi', 'akash', 'ananya', 'arjun', 'diya', 'ishaan', 'kavya', 'kabir', 'meera', 'nikhil', 'pooja', 'rahul', 'riya', 'rohan', 'sanya', 'shivam', 'sneha', 'varun', 'zoya']
+LASTNAMES = ['agarwal', 'bansal', 'chopra', 'gupta', 'jain', 'kapoor', 'khanna', 'malhotra', 'mehta', 'sharma', 'singh', 'verma']
+
+def bulk_insert(model, objects):
+	''' bulk_create with explicit pks, so that the rows can be referenced right away (MySQL doesn't return inserted pks) '''
+	start = (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+	for pk, obj in enumerate(objects, start):
+		obj.pk = pk
+	model.objects.bulk_create(objects, batch_size=BATCH_SIZE)
+	return objects
+
+def flush():
+	''' Deletes the synthetic rows; marksheets and scores cascade from the synthetic boards and subjects '''
+	ExaminationBoard.objects.filter(name__startswith=NAME_PREFIX).delete()
+	Subject.objects.filter(name__startswith=NAME_PREFIX).delete()
+	CustomUser.objects.filter(email__endswith='@' + EMAIL_DOMAIN).delete()
+	Programme.objects.filter(name__startswith=NAME_PREFIX).delete()
+	SCollege.objects.filter(name__startswith=NAME_PREFIX).delete()
+	SCompany.objects.filter(name__startswith=NAME_PREFIX).delete()
+
+def get_academic_years(count):
+	''' The latest `count` academic years (Jul - Jun), latest first; eg. ['2017-18', '2016-17'] '''
+	today = date.today()
+	start = today.year if today.month >= 7 else today.year - 1
+	return ['%d-%s' % (year, str(year + 1)[2:]) for year in range(start, start - count, -1)]
+
+class Command(BaseCommand):
+	help = 'Generates synthetic colleges, students, associations, sessions and notifications to reproduce placement season load locally'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--colleges', type=int, default=20, dest='colleges')
+		parser.add_argument('--students', type=int, default=20000, dest='students')
+		parser.add_argument('--companies', type=int, default=100, dest='companies')
+		parser.add_argument('--sessions-per-college', type=int, default=10, dest='sessions')
+		parser.add_argument('--notifications-per-student', type=int, default=20, dest='notifications')
+		parser.add_argument('--broadcasts-per-college', type=int, default=5, dest='broadcasts')
+		parser.add_argument('--seed', type=int, default=0, dest='seed')
+		parser.add_argument('--flush', action='store_true', help='Only delete the synthetic data generated earlier')
+
+	def handle(self, *args, **options):
+		if not 0 < options['colleges'] < 100:
+			raise CommandError('--colleges must be between 1 and 99, as college codes are %sxx' % CODE_PREFIX)
+		with transaction.atomic():
+			flush()
+			if options['flush']:
+				self.stdout.write('Synthetic data deleted')
+				return
+			self.rand = random.Random(options['seed'])
+			self.password = make_password(PASSWORD) # Hashing once; it's deliberately slow
+			self.now = timezone.now()
+			self.generate(options)
+			with connection.cursor() as cursor: # Explicit pks leave PostgreSQL sequences behind
+				for sql in connection.ops.sequence_reset_sql(no_style(), [CustomUser, College, Programme, Stream, Company, ExaminationBoard, Subject, Score,
+						ScoreMarksheet, CGPAMarksheet, SchoolMarksheet, Student, SelectionCriteria, Association, PlacementSession, BroadcastNotification]):
+					cursor.execute(sql)
+			OpenOpportunity.objects.rebuild()
+			rebuild_index() # bulk_create skips the receivers that keep it
+			invalidate_reference_data('stats') # Likewise the ones that bump these namespaces; done once committed
+		self.stdout.write('Every synthetic user has the password "%s"' % PASSWORD)
+
+	def get_user(self, username, type):
+		return CustomUser(username=username, email='%s@%s' % (username, EMAIL_DOMAIN), type=type, password=self.password,
+						  is_active=True, date_joined=self.now - timedelta(days=365))
+
+	def get_score(self, subject, low=55):
+		return Score(subject=subject, subject_name=subject.name, subject_code=subject.code, marks=self.rand.randint(low, 99))
+
+	def report(self, label, count):
+		self.stdout.write('%-15s %d' % (label, count))
+
+	def generate(self, options):
+		# Programmes and streams
+		programmes = bulk_insert(Programme, [Programme(name='%s %s' % (NAME_PREFIX, name), years=years) for name, years, streams in PROGRAMMES])
+		streams = bulk_insert(Stream, [
+			Stream(programme=programme, name=stream, code='%s%02d' % (CODE_PREFIX, i))
+			for i, (programme, stream) in enumerate((p, s) for p, (name, years, names) in zip(programmes, PROGRAMMES) for s in names)
+		])
+		self.programmes = [(p, [s for s in streams if s.programme_id == p.pk]) for p in programmes]
+		self.report('Streams', len(streams))
+
+		# Colleges offer every stream
+		users = bulk_insert(CustomUser, [self.get_user('synthetic_college_%d' % i, 'C') for i in range(options['colleges'])])
+		colleges = bulk_insert(College, [
+			College(profile=user, name='%s College %d' % (NAME_PREFIX, i), code='%s%02d' % (CODE_PREFIX, i)) for i, user in enumerate(users)
+		])
+		College.streams.through.objects.bulk_create([College.streams.through(college_id=c.pk, stream_id=s.pk) for c in colleges for s in streams])
+		self.report('Colleges', len(colleges))
+
+		users = bulk_insert(CustomUser, [self.get_user('synthetic_company_%d' % i, 'CO') for i in range(options['companies'])])
+		companies = bulk_insert(Company, [
+			Company(profile=user, name='%s Company %d' % (NAME_PREFIX, i), corporate_code='SYNTHETIC%d' % i, website='http://company%d.%s' % (i, EMAIL_DOMAIN))
+			for i, user in enumerate(users)
+		])
+		self.report('Companies', len(companies))
+
+		self.generate_students(options, colleges, streams)
+		self.generate_sessions(options, colleges, companies)
+		self.generate_notifications(options, colleges)
+		self.generate_stats(colleges, companies)
+
+	def generate_students(self, options, colleges, streams):
+		rand = self.rand
+		boards = bulk_insert(ExaminationBoard, [ExaminationBoard(name='%s Board %d' % (NAME_PREFIX, i), abbreviation='SB%d' % i) for i in range(3)])
+		subjects = bulk_insert(Subject, [Subject(name='%s Subject %d' % (NAME_PREFIX, i), code='SYN%d' % i) for i in range(12)])
+		admission_year = date.today().year if date.today().month >= 7 else date.today().year - 1
+
+		# A student's username is roll (3) + college code (3) + stream code (3) + admission year (2)
+		cohorts = [(college, stream, str(year)) for college in colleges for stream in streams for year in range(1, int(stream.programme.years) + 1)]
+		if options['students'] > len(cohorts) * 999:
+			raise CommandError('%d students don\'t fit in %d cohorts of 999; add colleges' % (options['students'], len(cohorts)))
+		rolls, students = {}, []
+		for i in range(options['students']):
+			college, stream, year = cohorts[i % len(cohorts)]
+			roll = rolls[college, stream, year] = rolls.get((college, stream, year), 0) + 1
+			username = '%03d%s%s%s' % (roll, college.code, stream.code, str(admission_year - int(year) + 1)[2:])
+			students.append(Student(
+				firstname=rand.choice(FIRSTNAMES), lastname=rand.choice(LASTNAMES), gender=rand.choice('MF'), phone_number='7%09d' % i,
+				dob=date(2000, 1, 1) - timedelta(days=rand.randint(0, 2500)), college=college, programme=stream.programme, stream=stream,
+				current_year=year, is_sub_back=rand.random() < 0.1, is_verified=rand.random() < 0.8, salary_expected=rand.choice([2, 4, 6, 8]),
+				profile=self.get_user(username, 'S'),
+			))
+
+		bulk_insert(CustomUser, [s.profile for s in students])
+		for s in students:
+			s.profile_id = s.profile.pk # Assigned by bulk_insert
+
+		# Marksheets: 12th scores for everybody; half have 10th scores and half a 10th CGPA
+		marksheets = []
+		for s in students:
+			scores_12 = [self.get_score(subject) for subject in rand.sample(subjects, 5)]
+			scores_10 = [self.get_score(subject, 60) for subject in rand.sample(subjects, 5)] if rand.random() < 0.5 else None
+			marksheets.append((scores_12, scores_10))
+		bulk_insert(Score, [score for scores_12, scores_10 in marksheets for score in scores_12 + (scores_10 or [])])
+		pairs = [] # (12th, 10th ScoreMarksheet or CGPAMarksheet)
+		for scores_12, scores_10 in marksheets:
+			marksheet_12 = ScoreMarksheet(klass='12', board=rand.choice(boards), **{'score%d' % n: score for n, score in enumerate(scores_12, 1)})
+			if scores_10:
+				pairs.append((marksheet_12, ScoreMarksheet(klass='10', board=rand.choice(boards), **{'score%d' % n: score for n, score in enumerate(scores_10, 1)})))
+			else:
+				pairs.append((marksheet_12, CGPAMarksheet(board=rand.choice(boards), cgpa=Decimal('%.1f' % rand.uniform(6, 10)), conversion_factor=Decimal('9.5'))))
+		bulk_insert(ScoreMarksheet, [m for pair in pairs for m in pair if isinstance(m, ScoreMarksheet)])
+		bulk_insert(CGPAMarksheet, [tenth for twelfth, tenth in pairs if isinstance(tenth, CGPAMarksheet)])
+		school_marksheets = bulk_insert(SchoolMarksheet, [
+			SchoolMarksheet(marksheet_12=twelfth, **{'marksheet_10' if isinstance(tenth, ScoreMarksheet) else 'cgpa_marksheet': tenth}) for twelfth, tenth in pairs
+		])
+		for student, marksheet in zip(students, school_marksheets):
+			student.marksheet_id = marksheet.pk
+		bulk_insert(Student, students)
+
+		percentage = lambda: Decimal('%.2f' % rand.uniform(50, 98))
+		Qualification.objects.bulk_create([
+			Qualification(student=s, tenth=percentage(), twelfth=percentage(), graduation=percentage(),
+						  post_graduation=percentage() if s.programme.years == '2' else None, is_verified=s.is_verified)
+			for s in students
+		], batch_size=BATCH_SIZE)
+		self.students = students
+		self.report('Students', len(students))
+
+	def generate_sessions(self, options, colleges, companies):
+		''' Approved associations with running sessions; each session enrols some of the eligible cohort '''
+		rand = self.rand
+		by_college = {}
+		for s in self.students:
+			by_college.setdefault(s.college_id, []).append(s)
+		associations, criteria = [], []
+		for college in colleges:
+			for company in rand.sample(companies, min(options['sessions'], len(companies))):
+				programme = rand.choice(self.programmes)[0]
+				associations.append(Association(college=college, company=company, programme=programme, type=rand.choice('IJ'),
+												salary=Decimal(rand.choice([0, 3, 4, 6, 8, 12])), initiator=rand.choice(['C', 'CO']), approved=True))
+				years = ','.join(str(y) for y in range(max(1, int(programme.years) - 1), int(programme.years) + 1))
+				criteria.append(SelectionCriteria(years=years, years_mask=years_to_mask(years), tenth=rand.choice(['', '60', '70']), twelfth=rand.choice(['', '60', '70'])))
+		bulk_insert(Association, associations)
+		bulk_insert(SelectionCriteria, criteria)
+		streams = {p.pk: streams for p, streams in self.programmes}
+		Association.streams.through.objects.bulk_create([
+			Association.streams.through(association_id=a.pk, stream_id=s.pk) for a in associations for s in streams[a.programme_id]
+		], batch_size=BATCH_SIZE)
+
+		today = date.today()
+		sessions = bulk_insert(PlacementSession, [
+			PlacementSession(association=a, selection_criteria=c, status='Resume Submission', last_modified_by=a.initiator,
+							 application_deadline=today + timedelta(days=rand.randint(-10, 30)), ended=rand.random() < 0.2)
+			for a, c in zip(associations, criteria)
+		])
+		enrolments = []
+		for session, association, criterion in zip(sessions, associations, criteria):
+			years = criterion.years.split(',')
+			cohort = [s for s in by_college.get(association.college_id, []) if s.programme_id == association.programme_id and s.current_year in years]
+			enrolments.extend(PlacementSession.students.through(placementsession_id=session.pk, student_id=s.pk) for s in cohort if rand.random() < 0.6)
+		PlacementSession.students.through.objects.bulk_create(enrolments, batch_size=BATCH_SIZE)
+		self.report('Sessions', len(sessions))
+		self.report('Enrolments', len(enrolments))
+
+	def generate_notifications(self, options, colleges):
+		''' Direct notifications from the college (a quarter unread) and college wide broadcasts; unread counters to match '''
+		rand = self.rand
+		college_profiles = {c.pk: c.profile_id for c in colleges}
+		notifications, unread = [], {}
+		for s in self.students:
+			for i in range(options['notifications']):
+				is_read = rand.random() < 0.75
+				notifications.append(Notification(actor_id=college_profiles[s.college_id], target_id=s.profile_id, is_read=is_read,
+												  message='%s notification %d' % (NAME_PREFIX, i)))
+				unread[s.profile_id] = unread.get(s.profile_id, 0) + (not is_read)
+		Notification.objects.bulk_create(notifications, batch_size=BATCH_SIZE)
+
+		broadcasts = bulk_insert(BroadcastNotification, [
+			BroadcastNotification(actor_id=c.profile_id, college=c, message='%s broadcast %d' % (NAME_PREFIX, i)) for c in colleges for i in range(options['broadcasts'])
+		])
+		BroadcastCohort.objects.bulk_create([BroadcastCohort(broadcast=b) for b in broadcasts]) # Whole college
+		for s in self.students:
+			unread[s.profile_id] = unread.get(s.profile_id, 0) + options['broadcasts']
+		by_count = {}
+		for pk, count in unread.items():
+			by_count.setdefault(count, []).append(pk)
+		for count, pks in by_count.items():
+			for i in range(0, len(pks), BATCH_SIZE):
+				CustomUser.objects.filter(pk__in=pks[i:i + BATCH_SIZE]).update(unread_notifications=count)
+		self.report('Notifications', len(notifications))
+		self.report('Broadcasts', len(broadcasts))
+
+	def generate_stats(self, colleges, companies):
+		''' Past placement records, for the public stats page '''
+		rand = self.rand
+		scolleges = bulk_insert(SCollege, [SCollege(name=c.name, code=c.code) for c in colleges])
+		scompanies = bulk_insert(SCompany, [SCompany(name=c.name, website=c.website) for c in companies])
+		records = bulk_insert(SYear, [
+			SYear(college=c, academic_year=year, jobs_placement_percentage=Decimal(rand.randint(40, 95)), internships_placement_percentage=Decimal(rand.randint(20, 80)))
+			for c in scolleges for year in get_academic_years(3)
+		])
+		SPlacement.objects.bulk_create([
+			SPlacement(record=r, company=company, type=rand.choice('IJ'), salary=Decimal(rand.choice([0, 3, 4, 6, 8, 12])), total_offers=rand.randint(1, 30))
+			for r in records for company in rand.sample(scompanies, min(15, len(scompanies)))
+		], batch_size=BATCH_SIZE)
+		self.report('Stats records', len(records))
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+
+from account.search import rebuild_index
+
+class Command(BaseCommand):
+	help = 'Rebuilds the search index (account.search) of current students, colleges and companies from scratch'
+
+	def handle(self, *args, **options):
+		self.stdout.write('Indexed %d words' % rebuild_index())
@@ -0,0 +1,135 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.urlresolvers import reverse
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from account.management.commands.generateloaddata import EMAIL_DOMAIN
+from account.models import CustomUser
+from notification.models import Notification
+from notification.tasks import create_notifications_task
+from recruitment.models import PlacementSession
+from recruitment.utils import get_master_excel_structure
+from stats.models import YearRecord
+from student.models import Student
+
+from collections import OrderedDict
+import json, os, subprocess, tempfile, time
+
+def get_revision():
+	try:
+		return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, stderr=subprocess.DEVNULL).decode('utf-8').strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+def measure(func, repeat):
+	'''
+	Runs func once to warm up and then `repeat` times, each inside a transaction that is rolled back,
+	so that views which write (eg. marking notifications read) see the same data every run.
+	'''
+	timings = []
+	for run in range(repeat + 1):
+		with transaction.atomic():
+			with CaptureQueriesContext(connection) as context:
+				start = time.time()
+				func()
+				elapsed = (time.time() - start) * 1000
+			transaction.set_rollback(True)
+		if run:
+			timings.append(elapsed)
+	timings.sort()
+	return OrderedDict([
+		('min_ms', round(timings[0], 2)),
+		('median_ms', round(timings[len(timings) // 2], 2)),
+		('max_ms', round(timings[-1], 2)),
+		('queries', len(context)),
+	])
+
+def get_client(user=None):
+	client = Client(HTTP_X_REQUESTED_WITH='XMLHttpRequest') # The benchmarked views answer AJAX requests
+	if user:
+		client.force_login(user)
+	return client
+
+def get_view(client, url, data=None):
+	def view():
+		response = client.get(url, data or {})
+		if response.status_code != 200:
+			raise CommandError('GET %s returned %d' % (url, response.status_code))
+	return view
+
+class Command(BaseCommand):
+	help = 'Times the hot views and celery tasks against the data of `manage.py generateloaddata` and writes the results as JSON'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--repeat', type=int, default=10, dest='repeat')
+		parser.add_argument('--output', dest='output', help='File to write the JSON to, instead of stdout')
+		parser.add_argument('--only', nargs='+', dest='only', help='Names of the benchmarks to run')
+
+	def handle(self, *args, **options):
+		synthetic = Student.studying.filter(profile__email__endswith='@' + EMAIL_DOMAIN)
+		# The busiest student: verified, in the most sessions
+		student = synthetic.filter(is_verified=True, is_barred=False).annotate(count=Count('sessions')).order_by('-count').select_related('profile', 'college__profile').first()
+		if not student:
+			raise CommandError('No synthetic data; run `manage.py generateloaddata` first')
+		college = student.college
+		session = PlacementSession.objects.filter(association__college=college).annotate(count=Count('students')).order_by('-count').first()
+		record = YearRecord.objects.filter(college__code=college.code).order_by('-academic_year').first()
+		cohort = list(synthetic.filter(college=college).values_list('profile', flat=True))
+		excel_path = os.path.join(tempfile.gettempdir(), 'benchmark_master_excel_%d.xlsx' % college.pk)
+
+		def master_excel():
+			# The work of generate_master_excel_task without the task itself, whose lock and waiting set are the college's real ones
+			try:
+				get_master_excel_structure(college, college.students(manager='studying').all()).save(excel_path)
+				if not os.path.exists(excel_path):
+					raise CommandError('The master excel was not written to %s' % excel_path)
+			finally:
+				if os.path.exists(excel_path):
+					os.remove(excel_path)
+
+		student_client, college_client = get_client(student.profile), get_client(college.profile)
+		benchmarks = OrderedDict([
+			('view_companies', get_view(student_client, reverse('view_companies'))),
+			('mysessions', get_view(student_client, reverse('mysessions'))),
+			('excel', get_view(college_client, reverse('excel', kwargs={'sess': settings.HASHID_PLACEMENTSESSION.encode(session.pk)}))),
+			('get_notifications', get_view(student_client, reverse('get_notifications'))),
+			('search', get_view(college_client, reverse('search'), {'query': student.firstname})),
+			('stats', get_view(get_client(), reverse('stats'), {'stats': 'true', 'college': record.college_id, 'year': record.academic_year})),
+			('create_notifications_task', lambda: create_notifications_task(college.profile_id, cohort, 'Benchmark')),
+			('master_excel', master_excel),
+		])
+		if options['only']:
+			unknown = set(options['only']) - set(benchmarks)
+			if unknown:
+				raise CommandError('Unknown benchmark(s): %s. Choose from %s' % (', '.join(unknown), ', '.join(benchmarks)))
+			benchmarks = OrderedDict((name, func) for name, func in benchmarks.items() if name in options['only'])
+
+		setup_test_environment() # Lets the test client through ALLOWED_HOSTS and keeps emails in memory
+		try:
+			results = OrderedDict((name, measure(func, options['repeat'])) for name, func in benchmarks.items())
+		finally:
+			teardown_test_environment()
+		report = OrderedDict([
+			('timestamp', timezone.now().isoformat()),
+			('revision', get_revision()),
+			('database', connection.vendor),
+			('repeat', options['repeat']),
+			('data', OrderedDict([
+				('students', synthetic.count()),
+				('college_students', len(cohort)),
+				('session_students', session.students.count()),
+				('notifications', Notification.objects.filter(target__email__endswith='@' + EMAIL_DOMAIN).count()),
+				('users', CustomUser.objects.count()),
+			])),
+			('benchmarks', results),
+		])
+		output = json.dumps(report, indent=2)
+		if options['output']:
+			with open(options['output'], 'w') as f:
+				f.write(output + '\n')
+		else:
+			self.stdout.write(output)
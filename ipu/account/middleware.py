@@ -0,0 +1,13 @@
+from account.utils import get_type_created
+
+class ProfileMiddleware(object):
+	'''
+	Resolves the logged in user's type and profile (account.utils.get_profile) once per request, with what each type
+	is used with selected along, and sets request.user_type and request.profile (None if anonymous or not created yet).
+	require_user_types hands them to the views; get_type_created and request.user.<college/faculty/student/company> read the same object.
+	'''
+	def process_request(self, request):
+		request.user_type, request.profile = None, None
+		if request.user.is_authenticated():
+			requester = get_type_created(request.user)
+			request.user_type, request.profile = requester['user_type'], requester.get('profile')
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0005_smsdeliveryreport'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MassMail',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(blank=True, max_length=512)),
+                ('message', models.TextField(blank=True)),
+                ('created_on', models.DateTimeField(auto_now_add=True)),
+                ('unsuccessful_email', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reattempts', to='account.UnsuccessfulEmail')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MassMailRecipient',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('P', 'Pending'), ('S', 'Sent'), ('F', 'Failed')], default='P', max_length=1)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('sent_on', models.DateTimeField(blank=True, null=True)),
+                ('mass_mail', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipients', to='account.MassMail')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mass_mails', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='massmailrecipient',
+            unique_together=set([('mass_mail', 'user')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='massmailrecipient',
+            index_together=set([('mass_mail', 'status')]),
+        ),
+    ]
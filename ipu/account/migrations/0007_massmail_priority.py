@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0006_massmail_massmailrecipient'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='massmail',
+            name='priority',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Notice'), (2, 'Posting')], default=1),
+        ),
+        migrations.AddField(
+            model_name='massmailrecipient',
+            name='queued_on',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='massmailrecipient',
+            name='status',
+            field=models.CharField(choices=[('P', 'Pending'), ('Q', 'Queued'), ('S', 'Sent'), ('F', 'Failed')], default='P', max_length=1),
+        ),
+        migrations.AlterIndexTogether(
+            name='massmailrecipient',
+            index_together=set([('mass_mail', 'status'), ('status', 'queued_on')]),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+def count_unread_notifications(apps, schema_editor):
+    # Direct notifications only; run `manage.py reconcileunread` to add broadcasts
+    CustomUser = apps.get_model('account', 'CustomUser')
+    Notification = apps.get_model('notification', 'Notification')
+    unread = Notification.objects.filter(is_read=False).values('target').annotate(count=models.Count('pk'))
+    for row in unread:
+        CustomUser.objects.filter(pk=row['target']).update(unread_notifications=row['count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0007_massmail_priority'),
+        ('notification', '0008_broadcastnotification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='unread_notifications',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_unread_notifications, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import re
+
+
+# The tokenizer as of this migration (account.search.tokenize), kept here so that later changes to it don't change this migration
+def get_entries(model, kind, user_pk, name, college_pk=None):
+    words = []
+    for word in re.findall(r'\w+', (name or '').lower()):
+        word = word[:32]
+        if word not in words:
+            words.append(word)
+    return [model(word=word, position=position, kind=kind, user_id=user_pk, college_id=college_pk, name=name) for position, word in enumerate(words)]
+
+
+def build_search_index(apps, schema_editor):
+    SearchEntry = apps.get_model('account', 'SearchEntry')
+    Student = apps.get_model('student', 'Student')
+    College = apps.get_model('college', 'College')
+    Company = apps.get_model('company', 'Company')
+    entries = []
+    for pk, firstname, lastname, college in Student.objects.filter(has_graduated=False).values_list('profile', 'firstname', 'lastname', 'college'):
+        entries += get_entries(SearchEntry, 'S', pk, (firstname + " " + lastname).title(), college)
+    for pk, name in College.objects.values_list('profile', 'name'):
+        entries += get_entries(SearchEntry, 'C', pk, name.title())
+    for pk, name in Company.objects.values_list('profile', 'name'):
+        entries += get_entries(SearchEntry, 'CO', pk, name.title())
+    SearchEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0008_customuser_unread_notifications'),
+        ('college', '0003_auto_20170801_0023'),
+        ('company', '0004_auto_20170801_0023'),
+        ('student', '0029_student_cohort_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('word', models.CharField(db_index=True, max_length=32)),
+                ('position', models.PositiveSmallIntegerField()),
+                ('kind', models.CharField(choices=[('S', 'Student'), ('C', 'College'), ('CO', 'Company')], max_length=2)),
+                ('name', models.CharField(max_length=255)),
+                ('college', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='college.College')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
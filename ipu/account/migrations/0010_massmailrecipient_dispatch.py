@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0009_searchentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='massmailrecipient',
+            name='dispatch',
+            field=models.CharField(blank=True, max_length=32),
+        ),
+        migrations.AlterField(
+            model_name='massmailrecipient',
+            name='status',
+            field=models.CharField(choices=[('P', 'Pending'), ('Q', 'Queued'), ('D', 'Sending'), ('S', 'Sent'), ('F', 'Failed')], default='P', max_length=1),
+        ),
+    ]
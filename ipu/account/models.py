@@ -1,12 +1,15 @@
 from django.conf import settings
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, Group
 from django.core import validators
 from django.core.urlresolvers import reverse
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save, m2m_changed
+from django.dispatch import receiver
 from django.utils import six
 from django.utils.translation import ugettext_lazy as _
 from .validators import ASCIIUsernameValidator, UnicodeUsernameValidator
+from ipu.cache import invalidate
 import re
 from urllib.parse import urlparse
 
@@ -33,6 +36,8 @@ class CustomUser(AbstractUser):
 		If a student has graduated from college, or block recruiter etc.
 	'''
 	is_disabled = models.BooleanField(default=False)
+	# Denormalized badge count, kept by notification.utils (signed so that decrements can't underflow on MySQL)
+	unread_notifications = models.IntegerField(default=0, editable=False)
 
 	def clean(self, *args, **kwargs):
 		super(CustomUser, self).clean()
@@ -85,6 +90,40 @@ class UnsuccessfulEmail(models.Model):
 	created_on = models.DateTimeField(auto_now_add=True)
 	reattempt_on = models.DateTimeField(auto_now=True)
 
+class MassMail(models.Model):
+	''' Queued in priority order behind transactional (activation/forgot password) emails; see account.emailqueue '''
+	NOTICE, POSTING = 1, 2
+	PRIORITIES = (
+		(NOTICE, 'Notice'),
+		(POSTING, 'Posting'),
+	)
+	subject = models.CharField(max_length=512, blank=True)
+	message = models.TextField(blank=True)
+	priority = models.PositiveSmallIntegerField(choices=PRIORITIES, default=NOTICE)
+	unsuccessful_email = models.ForeignKey(UnsuccessfulEmail, blank=True, null=True, on_delete=models.SET_NULL, related_name='reattempts') # When this is a reattempt
+	created_on = models.DateTimeField(auto_now_add=True)
+
+class MassMailRecipient(models.Model):
+	''' Delivery state of a mass mail per user, so that retried chunks resend only what's pending '''
+	STATUS = (
+		('P', 'Pending'),
+		('Q', 'Queued'), # Dispatched to a chunk task
+		('D', 'Sending'), # Claimed by the chunk task it was dispatched to
+		('S', 'Sent'),
+		('F', 'Failed'),
+	)
+	mass_mail = models.ForeignKey(MassMail, related_name='recipients')
+	user = models.ForeignKey(CustomUser, related_name='mass_mails')
+	status = models.CharField(max_length=1, choices=STATUS, default=STATUS[0][0])
+	attempts = models.PositiveSmallIntegerField(default=0)
+	queued_on = models.DateTimeField(blank=True, null=True)
+	dispatch = models.CharField(max_length=32, blank=True) # Token of the chunk task it was last dispatched to
+	sent_on = models.DateTimeField(blank=True, null=True)
+
+	class Meta:
+		unique_together = ['mass_mail', 'user']
+		index_together = [['mass_mail', 'status'], ['status', 'queued_on']]
+
 class UnsuccessfulSMS(models.Model):
 	message = models.CharField(max_length=512, blank=True)
 	phone_numbers = models.TextField(validators=[validators.RegexValidator(r'^([7-9]\d{9}(,[7-9]\d{9})*)$')], help_text="Comma Separated") # Store comma separated string
@@ -103,3 +142,29 @@ class SMSDeliveryReport(models.Model):
 	status_desc = models.CharField(max_length=512, blank=True)
 	error_desc = models.CharField(max_length=512, blank=True)
 	created_on = models.DateTimeField(auto_now_add=True)
+
+class SearchEntry(models.Model):
+	''' One row per word of a searchable name: current students, colleges and companies. Kept by account.search. '''
+	KINDS = (
+		('S', _('Student')),
+		('C', _('College')),
+		('CO', _('Company')),
+	)
+	word = models.CharField(max_length=32, db_index=True) # Lowercase
+	position = models.PositiveSmallIntegerField() # Of the word in the name; matches on earlier words rank higher
+	kind = models.CharField(max_length=2, choices=KINDS)
+	user = models.ForeignKey(CustomUser, related_name='+') # The profile's user
+	college = models.ForeignKey('college.College', blank=True, null=True, related_name='+') # Of a student; companies only find students of associated colleges
+	name = models.CharField(max_length=255) # As displayed
+
+# Group names cached by account.utils.get_group_names
+# Invalidated once the change is committed; before that, a request could cache the names it still reads
+@receiver(m2m_changed, sender=CustomUser.groups.through)
+def invalidate_group_names(sender, **kwargs):
+	if kwargs.get('action') in ['post_add', 'post_remove', 'post_clear']:
+		transaction.on_commit(lambda: invalidate('groups'))
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_groups(sender, **kwargs):
+	transaction.on_commit(lambda: invalidate('groups'))
@@ -0,0 +1,88 @@
+from django.db import transaction
+from django.db.models import Case, IntegerField, Max, Min, Q, Sum, When
+
+from functools import reduce
+import operator, re
+
+# The site wide search (account.views.search). Every current student, college and company has one SearchEntry
+# per word of their name; a query's words are matched as prefixes of those words through the index on `word`
+# (MySQL's case insensitive collation lets LIKE 'prefix%' use it), so a search no longer scans the profile tables.
+
+WORD_LENGTH = 32 # SearchEntry.word's max_length
+MAX_QUERY_WORDS = 4 # Each one costs an aggregate in the query
+
+def tokenize(text):
+	''' Lowercase words in order, without repeats '''
+	words = []
+	for word in re.findall(r'\w+', (text or '').lower()):
+		word = word[:WORD_LENGTH]
+		if word not in words:
+			words.append(word)
+	return words
+
+def get_entries(model, kind, user_pk, name, college_pk=None):
+	''' Unsaved rows; `model` is SearchEntry, or its historical version in migrations '''
+	return [model(word=word, position=position, kind=kind, user_id=user_pk, college_id=college_pk, name=name) for position, word in enumerate(tokenize(name))]
+
+def index(kind, user_pk, name, college_pk=None):
+	from account.models import SearchEntry
+	unindex(user_pk)
+	SearchEntry.objects.bulk_create(get_entries(SearchEntry, kind, user_pk, name, college_pk))
+
+def unindex(*user_pks):
+	from account.models import SearchEntry
+	SearchEntry.objects.filter(user__in=user_pks).delete()
+
+def index_student(student):
+	''' Only current students are searchable '''
+	if student.has_graduated:
+		unindex(student.profile_id)
+	else:
+		index('S', student.profile_id, student.get_full_name(), student.college_id)
+
+def index_college(college):
+	index('C', college.profile_id, college.name.title())
+
+def index_company(company):
+	index('CO', company.profile_id, company.name.title())
+
+def rebuild_index():
+	''' Returns the number of rows written '''
+	from account.models import SearchEntry
+	from college.models import College
+	from company.models import Company
+	from student.models import Student
+	entries = []
+	for pk, firstname, lastname, college in Student.studying.values_list('profile', 'firstname', 'lastname', 'college'):
+		entries += get_entries(SearchEntry, 'S', pk, (firstname + " " + lastname).title(), college)
+	for pk, name in College.objects.values_list('profile', 'name'):
+		entries += get_entries(SearchEntry, 'C', pk, name.title())
+	for pk, name in Company.objects.values_list('profile', 'name'):
+		entries += get_entries(SearchEntry, 'CO', pk, name.title())
+	with transaction.atomic(): # Searches meanwhile see the old index
+		SearchEntry.objects.all().delete()
+		SearchEntry.objects.bulk_create(entries, batch_size=1000)
+	return len(entries)
+
+def search(query, user_type, profile, limit=12):
+	'''
+	[{'kind', 'name', 'user__username', ...}] of the best `limit` matches. Every word of the query has to prefix a word
+	of the name; names with more exactly matching words come first, then those matching earlier in the name.
+	Companies only find the students of colleges they are associated with.
+	'''
+	from account.models import SearchEntry
+	words = tokenize(query)[:MAX_QUERY_WORDS]
+	if not words:
+		return []
+	entries = SearchEntry.objects.filter(reduce(operator.or_, [Q(word__istartswith=w) for w in words]))
+	if user_type == 'CO':
+		from recruitment.models import Association
+		colleges = Association.objects.filter(company=profile, approved=True).values('college')
+		entries = entries.filter(Q(kind__in=['C', 'CO']) | Q(kind='S', college__in=colleges))
+	matches = {'match%d' % i: Max(Case(When(word__istartswith=w, then=1), default=0, output_field=IntegerField())) for i, w in enumerate(words)}
+	entries = entries.values('user__username', 'kind', 'name').annotate(
+		exact=Sum(Case(When(word__in=words, then=1), default=0, output_field=IntegerField())),
+		first=Min('position'),
+		**matches
+	).filter(**{name: 1 for name in matches})
+	return list(entries.order_by('-exact', 'first', 'name')[:limit])
@@ -5,17 +5,26 @@ from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator # An instance of PasswordResetTokenGenerator
 from django.core import mail
 from django.core.mail import EmailMultiAlternatives
+from django.db.models import F
 from django.template import loader
+from django.utils import timezone
 
-from account.models import CustomUser, UnsuccessfulEmail, UnsuccessfulSMS, SMSDeliveryReport
+from account.models import CustomUser, UnsuccessfulEmail, UnsuccessfulSMS, SMSDeliveryReport, MassMail, MassMailRecipient
+from account.emailqueue import get_redis, consume_email_quota, release_email_quota, get_remaining_quota, defer_transactional_email, transactional_email_resumed
 from account.tokens import account_activation_token_generator  # An instance of AccountActivationTokenGenerator
 
 from sms import send_sms
-from datetime import datetime
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import time, uuid
 
 logger = get_task_logger(__name__)
 
 MAX_RETRIES = 3
+PROVIDER_SLOT_TTL = 10*60
+PROVIDER_SLOT_WAIT = 30 # seconds
+DRAIN_LOCK_KEY = 'email_queue:drain'
+DRAIN_LOCK_TTL = 5*60
 
 # Always pass in user's pk and not the user object
 # Because celery needs to serialize the arguments for a task
@@ -28,7 +37,7 @@ def how_to_greet(user, html=False):
 		greeting = "Hi " + ("<b>%s</b>" if html else "%s") + "!"
 	return (greeting % (user.username))
 
-def send_email_message(user, email_message, unsuccessful_email_pk, domain, is_activation_email=False, is_forgot_password_email=False):
+def send_email_message(user, email_message, quota, unsuccessful_email_pk, domain, is_activation_email=False, is_forgot_password_email=False):
 	email_type = 'Account activation' if is_activation_email else 'Forgot password'
 
 	for tries in range(MAX_RETRIES):
@@ -45,6 +54,7 @@ def send_email_message(user, email_message, unsuccessful_email_pk, domain, is_ac
 			# Error thrown on the last retry. Therefore, unsuccessful.
 			if tries == MAX_RETRIES-1:
 				logger.error("%s email could not be sent to %s" % (email_type, user.username))
+				release_email_quota(quota)
 				if unsuccessful_email_pk:
 					try:
 						unsuccessful_email = UnsuccessfulEmail.objects.get(pk=unsuccessful_email_pk)
@@ -57,11 +67,18 @@ def send_email_message(user, email_message, unsuccessful_email_pk, domain, is_ac
 	return
 
 @task(name="send_activation_email_task")
-def send_activation_email_task(user_pk, domain, unsuccessful_email_pk=None):
+def send_activation_email_task(user_pk, domain, unsuccessful_email_pk=None, deferred=False):
+	if deferred:
+		transactional_email_resumed()
 	try:
 		user = CustomUser.objects.get(pk=user_pk)
 	except CustomUser.DoesNotExist:
 		return
+	quota = consume_email_quota(transactional=True)
+	if quota is None:
+		logger.warning("Account activation email to %s deferred; email quota used up" % user.username)
+		defer_transactional_email(send_activation_email_task, user_pk, domain, unsuccessful_email_pk)
+		return
 	email_body_context = {
 		'type': user.type,
 		'token': account_activation_token_generator.make_token(user),
@@ -77,14 +94,21 @@ def send_activation_email_task(user_pk, domain, unsuccessful_email_pk=None):
 	html = loader.render_to_string('account/activation_email_html.html', email_body_context)
 	email_message = EmailMultiAlternatives('Verify Email Address', body, settings.DEFAULT_FROM_EMAIL, [user.email])
 	email_message.attach_alternative(html, 'text/html')
-	send_email_message(user, email_message, unsuccessful_email_pk, domain, is_activation_email=True)
+	send_email_message(user, email_message, quota, unsuccessful_email_pk, domain, is_activation_email=True)
 
 @task(name="send_forgot_password_email_task")
-def send_forgot_password_email_task(user_pk, domain, unsuccessful_email_pk=None):
+def send_forgot_password_email_task(user_pk, domain, unsuccessful_email_pk=None, deferred=False):
+	if deferred:
+		transactional_email_resumed()
 	try:
 		user = CustomUser.objects.get(pk=user_pk)
 	except CustomUser.DoesNotExist:
 		return
+	quota = consume_email_quota(transactional=True)
+	if quota is None:
+		logger.warning("Forgot password email to %s deferred; email quota used up" % user.username)
+		defer_transactional_email(send_forgot_password_email_task, user_pk, domain, unsuccessful_email_pk)
+		return
 	email_body_context = {
 		'token': default_token_generator.make_token(user),
 		'user_hashid' : settings.HASHID_CUSTOM_USER.encode(user.pk),
@@ -106,68 +130,145 @@ def send_forgot_password_email_task(user_pk, domain, unsuccessful_email_pk=None)
 	html = loader.render_to_string('account/forgot_password_email_body_html.html', email_body_context)
 	email_message = EmailMultiAlternatives('Reset Password', body, settings.DEFAULT_FROM_EMAIL, [user.email])
 	email_message.attach_alternative(html, 'text/html')
-	send_email_message(user, email_message, unsuccessful_email_pk, domain, is_forgot_password_email=True)
+	send_email_message(user, email_message, quota, unsuccessful_email_pk, domain, is_forgot_password_email=True)
+
+def get_provider_slots_key():
+	return 'mass_mail_slots:%s' % settings.EMAIL_PROVIDER
+
+# One ZSET entry (token -> time acquired) per holder: entries of workers that died holding a slot age out on their own
+ACQUIRE_PROVIDER_SLOT_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', tonumber(ARGV[1]) - tonumber(ARGV[2]))
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+	return 0
+end
+redis.call('ZADD', KEYS[1], ARGV[1], ARGV[4])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+def acquire_provider_slot():
+	''' Redis semaphore limiting concurrent SMTP connections per provider (EMAIL_PROVIDER_CONCURRENCY). Returns the slot's token, None if all are taken '''
+	token = uuid.uuid4().hex
+	limit = settings.EMAIL_PROVIDER_CONCURRENCY.get(settings.EMAIL_PROVIDER)
+	if not limit:
+		return token
+	acquired = get_redis().eval(ACQUIRE_PROVIDER_SLOT_SCRIPT, 1, get_provider_slots_key(), time.time(), PROVIDER_SLOT_TTL, limit, token)
+	return token if acquired else None
+
+def release_provider_slot(token):
+	if settings.EMAIL_PROVIDER_CONCURRENCY.get(settings.EMAIL_PROVIDER):
+		get_redis().zrem(get_provider_slots_key(), token)
 
 @task(name='send_mass_mail_task')
-def send_mass_mail_task(subject, message, user_pks_list, unsuccessful_email_pk=None):
-# # # # #
-	# Email Limitations
-	if settings.LIMIT_EMAIL:
-		logger.warning("Exited; EMAIL LIMIT; %s emails requested" % str(len(user_pks_list)))
+def send_mass_mail_task(subject, message, user_pks_list, unsuccessful_email_pk=None, priority=MassMail.NOTICE):
+	''' Queues a MassMail with a pending MassMailRecipient per user; drain_email_queue_task sends it as quota allows '''
+	user_pks = list(CustomUser.objects.filter(pk__in=user_pks_list).values_list('pk', flat=True))
+	if not user_pks:
 		return
-	# # #
+	unsuccessful_email = UnsuccessfulEmail.objects.filter(pk=unsuccessful_email_pk).first() if unsuccessful_email_pk else None
+	mass_mail = MassMail.objects.create(subject=subject, message=message, priority=priority, unsuccessful_email=unsuccessful_email)
+	MassMailRecipient.objects.bulk_create([MassMailRecipient(mass_mail=mass_mail, user_id=pk) for pk in user_pks])
+	logger.info('MassMail[%d] - %d recipients queued' % (mass_mail.pk, len(user_pks)))
+	drain_email_queue_task.delay()
 
-	users = CustomUser.objects.filter(pk__in=user_pks_list)
-	if not users:
-		return
-	unsuccessful_users = []
-# # # # #
-	unsuccessful_email = None
-	if unsuccessful_email_pk:
-		try:
-			unsuccessful_email = UnsuccessfulEmail.objects.get(pk=unsuccessful_email_pk)
-		except:
-			pass
-# # # # #
+@task(name='drain_email_queue_task')
+def drain_email_queue_task():
+	''' Dispatches pending recipients in chunks, by priority and then age, as far as the current quota allows '''
+	r = get_redis()
+	if not r.set(DRAIN_LOCK_KEY, 1, nx=True, ex=DRAIN_LOCK_TTL):
+		return # Another drain is dispatching
 	try:
-		connection = mail.get_connection()
-		opened = connection.open()
-		if not opened:
-			raise Exception('Connection could not be opened')
-		for user in users:
-			email = mail.EmailMessage(subject, message, settings.DEFAULT_FROM_EMAIL, [user.email], connection=connection)
-			for tries in range(MAX_RETRIES):
-				try:
-					email.send(fail_silently=False)
-					if unsuccessful_email: # i.e. UnsuccessfulEmail object or this function call is a reattempt to send UnsuccessfulEmail
-						unsuccessful_email.users.remove(user)
-					break
-				except Exception as e:
-					if tries == MAX_RETRIES-1:
-						logger.error(e)
-						logger.critical('Failed to send email to %s' % (user.email))
-						unsuccessful_users.append(user)
-					# Continue with the loop
-		# Loop ends
-
-		if unsuccessful_users and not unsuccessful_email: # i.e. failed attempts for a new task i.e. not a reattempt
-			unsuccessful_obj = UnsuccessfulEmail.objects.create(subject=subject, message=message)
-			for user in unsuccessful_users:
-				unsuccessful_obj.users.add(user)
-		elif unsuccessful_email:
-			count =  unsuccessful_email.users.count() # or len(unsuccessful_users) is also same
-			if count == 0:
-				unsucessful_email.delete()
-			else:
-				unsuccessful_email.save() # i.e. still failed attempts. Therefore, Update modification time 
+		stale = timezone.now() - timedelta(seconds=settings.EMAIL_QUEUE_STALE_AFTER)
+		MassMailRecipient.objects.filter(status='Q', queued_on__lt=stale).update(status='P') # Chunk task was lost; should it still run, it won't claim them
+		MassMailRecipient.objects.filter(status='D', queued_on__lt=stale).update(status='F', attempts=F('attempts')+1) # Chunk task died sending; they may have gone out, so aren't resent
+		queryset = MassMailRecipient.objects.filter(status='P').order_by('mass_mail__priority', 'mass_mail', 'pk')
+		available = get_remaining_quota()
+		if available is not None:
+			queryset = queryset[:available]
+		rows = list(queryset.values_list('pk', 'mass_mail', 'user'))
+		if not rows:
+			return
+		user_pks = OrderedDict()
+		for pk, mass_mail_pk, user_pk in rows:
+			user_pks.setdefault(mass_mail_pk, []).append((pk, user_pk))
+		chunk_size = settings.MASS_MAIL_CHUNK_SIZE
+		for mass_mail_pk, pks in user_pks.items():
+			for i in range(0, len(pks), chunk_size):
+				chunk, dispatch = pks[i:i+chunk_size], uuid.uuid4().hex
+				MassMailRecipient.objects.filter(pk__in=[pk for pk, user_pk in chunk]).update(status='Q', queued_on=timezone.now(), dispatch=dispatch)
+				send_mass_mail_chunk_task.delay(mass_mail_pk, [user_pk for pk, user_pk in chunk], dispatch)
+		logger.info('Email queue - %d recipients dispatched' % len(rows))
+	finally:
+		r.delete(DRAIN_LOCK_KEY)
+
+@task(bind=True, name='send_mass_mail_chunk_task', max_retries=MAX_RETRIES, default_retry_delay=60)
+def send_mass_mail_chunk_task(self, mass_mail_pk, user_pks, dispatch):
+	'''
+	Sends a chunk over one SMTP connection. Only recipients still dispatched to this chunk (`dispatch`) are claimed and
+	sent to, so a chunk that runs after its recipients were queued again sends nothing. Retries resend only the failed ones.
+	'''
+	try:
+		mass_mail = MassMail.objects.select_related('unsuccessful_email').get(pk=mass_mail_pk)
+	except MassMail.DoesNotExist:
+		return
+	slot = acquire_provider_slot()
+	if not slot:
+		# Provider busy; re-queued as a fresh task, not counted as a retry
+		send_mass_mail_chunk_task.apply_async((mass_mail_pk, user_pks, dispatch), countdown=PROVIDER_SLOT_WAIT)
+		return
+	recipients = mass_mail.recipients.filter(user__pk__in=user_pks, dispatch=dispatch)
+	recipients.filter(status__in=['Q', 'F']).update(status='D', queued_on=timezone.now())
+	pending = list(recipients.filter(status='D').select_related('user'))
+	if not pending:
+		release_provider_slot(slot)
+		return
 
+	sent, failed, postponed = [], [], []
+	connection = mail.get_connection()
+	try:
+		connection.open()
+		for i, recipient in enumerate(pending):
+			quota = consume_email_quota()
+			if quota is None:
+				postponed = pending[i:] # Carried over to the next window
+				break
+			email = mail.EmailMessage(mass_mail.subject, mass_mail.message, settings.DEFAULT_FROM_EMAIL, [recipient.user.email])
+			try:
+				if connection.send_messages([email]):
+					sent.append(recipient)
+					continue
+			except Exception as e:
+				logger.error(e)
+			release_email_quota(quota)
+			failed.append(recipient)
 	except Exception as e:
 		logger.error(e) # Maybe ConnectionError/SMTPError or connection is not avilable.. whatever
-		obj = UnsuccessfulEmail.objects.create(subject=subject, message=message)
-		for user in users:
-			obj.users.add(user)
+		failed = [r for r in pending if r not in sent and r not in postponed]
 	finally:
 		connection.close()
+		release_provider_slot(slot)
+
+	MassMailRecipient.objects.filter(pk__in=[r.pk for r in sent]).update(status='S', sent_on=timezone.now(), attempts=F('attempts')+1)
+	MassMailRecipient.objects.filter(pk__in=[r.pk for r in failed]).update(status='F', attempts=F('attempts')+1)
+	if postponed:
+		MassMailRecipient.objects.filter(pk__in=[r.pk for r in postponed]).update(status='P')
+		logger.warning('MassMail[%d] - %d recipients postponed; email quota used up' % (mass_mail.pk, len(postponed)))
+	unsuccessful_email = mass_mail.unsuccessful_email # i.e. this is a reattempt to send UnsuccessfulEmail
+	if unsuccessful_email and sent:
+		unsuccessful_email.users.remove(*[r.user for r in sent])
+		if not unsuccessful_email.users.exists():
+			unsuccessful_email.delete()
+	if not failed:
+		return
+	if self.request.retries < self.max_retries:
+		raise self.retry()
+	for r in failed:
+		logger.critical('Failed to send email to %s' % (r.user.email))
+	if unsuccessful_email and unsuccessful_email.pk:
+		unsuccessful_email.save() # i.e. still failed attempts. Therefore, Update modification time
+	else:
+		unsuccessful_obj = UnsuccessfulEmail.objects.create(subject=mass_mail.subject, message=mass_mail.message)
+		unsuccessful_obj.users.add(*[r.user for r in failed])
 
 @task(name='send_mass_sms_task')
 def send_mass_sms_task(actor_pk, message, to_list, unsuccessful_sms_pk=None, sender='GGSIPU', template_name='basic', *VAR):
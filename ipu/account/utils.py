@@ -4,11 +4,13 @@ from django.shortcuts import redirect, render
 
 from account.models import CustomUser
 from college.forms import CollegeCreationForm
-from college.models import College, Stream
+from college.models import College
+from college.utils import get_college_pk, get_stream
 from company.forms import CompanyCreationForm
 from company.models import Company
 from faculty.forms import FacultyProfileForm
 from faculty.models import Faculty
+from ipu.cache import cached
 from student.forms import StudentCreationForm
 from student.models import Student
 
@@ -31,8 +33,8 @@ def render_profile_creation(request, user_type):
 		except ValueError:
 #			pass
 			raise Http404(_('Enrollment number should be 11 digits long'))
-		coll = College.objects.get(code=coll).pk
-		strm = Stream.objects.get(code=strm).pk
+		coll = get_college_pk(coll)
+		strm = get_stream(strm).pk
 		return render(request, 'student/create.html', {'student_creation_form': StudentCreationForm(profile=user_profile, coll=coll, strm=strm, year=year)})
 	else:
 		return render(request, 'company/create.html', {'company_creation_form': CompanyCreationForm()})
@@ -68,31 +70,52 @@ def get_relevant_reversed_url(request):
 	else:
 		return reverse(settings.PROFILE_CREATION_URL[user_type])
 
+# The reverse OneToOne each user type's profile hangs off, and what the profile is used with
+PROFILE_RELATIONS = {
+	'C': ('college', []),
+	'F': ('faculty', ['college__profile']),
+	'S': ('student', ['college', 'stream', 'programme', 'qualifications']),
+	'CO': ('company', []),
+}
+
+def get_profile(user):
+	"""
+		The user's College, Faculty, Student or Company (None if not created yet), queried once per user object.
+		The result is stored where user.college/faculty/student/company reads it from, so those stop querying too.
+		Setting the profile's `profile` (as the creation forms do) replaces it.
+	"""
+	accessor, related = PROFILE_RELATIONS.get(user.type, PROFILE_RELATIONS['CO'])
+	rel = user._meta.get_field(accessor)
+	cache_name = rel.get_cache_name()
+	try:
+		return getattr(user, cache_name)
+	except AttributeError:
+		pass
+	profile = rel.related_model.objects.select_related(*related).filter(profile=user.pk).first()
+	setattr(user, cache_name, profile) # None makes user.<accessor> raise DoesNotExist without a query
+	if profile is not None:
+		setattr(profile, rel.field.get_cache_name(), user)
+	return profile
+
 def get_type_created(user):
 	user_type = user.type
-	if user_type == 'C':
-		try:
-			college = user.college
-			return ({'profile': college, 'user_type': user_type})
-		except College.DoesNotExist:
-			return ({'user_type': user_type})
-	elif user_type == 'F':
-		try:
-			faculty = user.faculty
-			if not faculty.firstname:
-				return ({'user_type': user_type})
-			return ({'profile': faculty, 'user_type': user_type})
-		except Faculty.DoesNotExist:
-			return ({'user_type': user_type})
-	elif user_type == 'S':
-		try:
-			student = user.student
-			return ({'profile': student, 'user_type': user_type})
-		except Student.DoesNotExist:
-			return ({'user_type': user_type})
-	else:
-		try:
-			company = user.company
-			return ({'profile': company, 'user_type': user_type})
-		except Company.DoesNotExist:
-			return ({'user_type': user_type})
+	profile = get_profile(user)
+	if profile is None or (user_type == 'F' and not profile.firstname):
+		return ({'user_type': user_type})
+	return ({'profile': profile, 'user_type': user_type})
+
+def get_group_names(user):
+	"""
+		Names of the user's auth groups, cached briefly in the 'groups' namespace (invalidated by the receivers in account.models)
+		and kept on the user object, so that every check after the first in a request is free.
+	"""
+	try:
+		return user._group_names
+	except AttributeError:
+		pass
+	user._group_names = cached('groups', [user.pk], lambda: frozenset(user.groups.values_list('name', flat=True)), settings.CACHE_GROUPS_TIMEOUT)
+	return user._group_names
+
+def has_groups(user, group_names):
+	""" True if the user belongs to any of the groups """
+	return not get_group_names(user).isdisjoint(group_names)
@@ -15,6 +15,7 @@ from django.views.decorators.http import require_http_methods, require_GET, requ
 from account.decorators import require_AJAX , check_recaptcha
 from account.forms import AccountForm, ForgotPasswordForm, LoginForm, SetPasswordForm, SignupForm, SocialProfileForm
 from account.models import CustomUser, SocialProfile
+from account.search import search as search_index
 from account.tasks import send_forgot_password_email_task, send_activation_email_task
 from account.tokens import account_activation_token_generator, time_unbounded_activation_token_generator
 from account.utils import *
@@ -270,23 +271,7 @@ def search(request):
 # If no matching queries, then success will be false and 'message' will be provided. Otherwise, success will be True
 	if not query:
 		return JsonResponse({'success': False, 'message': "No results found."})
-	result = []
-	space_separated_query = query.split(' ')
-	first = ' '.join(space_separated_query[:-1]) if len(space_separated_query)-1 else space_separated_query[0]
-	students = Student.studying.filter( Q(firstname__istartswith=first) | Q(lastname__istartswith=space_separated_query[-1]) ) # Only current students
-	if user_type == 'CO':
-		associated_colleges = list({a.college for a in Association.objects.filter(company=profile, approved=True)})
-		students = students.filter(college__in = associated_colleges)
-	for s in students:
-		result.append({'name': s.get_full_name(), 'url': request.build_absolute_uri(s.get_absolute_url())})
-		
-	colleges = College.objects.filter(name__icontains=query)
-	for c in colleges:
-		result.append({'name': c.name.title(), 'url': request.build_absolute_uri(c.get_absolute_url())})
-	companies = Company.objects.filter(name__icontains=query)
-	for co in companies:
-		result.append({'name': co.name.title(), 'url': request.build_absolute_uri(co.get_absolute_url())})
-	result = result[:12]
+	result = [{'name': e['name'], 'url': request.build_absolute_uri(reverse('view_profile', kwargs={'username': e['user__username']}))} for e in search_index(query, user_type, profile, limit=12)]
 	if result:
 		return JsonResponse({'success': True, 'result': result})
 	else:
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('college', '0003_auto_20170801_0023'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='college',
+            name='promotions',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -1,6 +1,6 @@
 from django.core.validators import RegexValidator
 from django.db import models
-from django.db.models.signals import post_delete
+from django.db.models.signals import post_delete, post_save, m2m_changed
 from django.dispatch import receiver
 from django.utils.translation import ugettext_lazy as _
 from account.models import CustomUser
@@ -52,9 +52,11 @@ class College(models.Model):
 	photo = models.ImageField(_('Photo'), upload_to=get_hashed_photo_name, blank=True)
 
 	streams = models.ManyToManyField(Stream, related_name="colleges")
+	promotions = models.PositiveIntegerField(default=0, editable=False) # Times `manage.py graduatestudents` promoted the students; pins broadcasts to the years they were sent to
 
 	def get_programmes_queryset(self):
-		return Programme.objects.filter(pk__in = {s.programme.pk for s in self.streams.all()})
+		from college.utils import get_college_programme_pks # college.utils imports this module
+		return Programme.objects.filter(pk__in = get_college_programme_pks(self.pk))
 
 	def __str__(self):
 		return "%s (%s)" % (self.name.title(), self.code)
@@ -72,3 +74,41 @@ def delete_photo(sender, **kwargs):
 		college.photo.delete(False)
 	except:
 		pass
+
+# Keeping the cache and the reference data registry in sync (see college.utils and ipu.cache)
+@receiver(post_save, sender=Programme)
+@receiver(post_delete, sender=Programme)
+@receiver(post_save, sender=Stream)
+@receiver(post_delete, sender=Stream)
+def invalidate_reference_data(sender, **kwargs):
+	from college.utils import invalidate_reference_data # college.utils imports this module
+	invalidate_reference_data()
+
+@receiver(post_save, sender=College)
+@receiver(post_delete, sender=College)
+def invalidate_college(sender, **kwargs):
+	from college.utils import invalidate_reference_data
+	invalidate_reference_data('profile:college:%d' % kwargs['instance'].pk)
+
+# Keeping the search index (account.search) in sync
+@receiver(post_save, sender=College)
+def index_college(sender, **kwargs):
+	from account.search import index_college
+	if kwargs.get('update_fields') is None or 'name' in kwargs['update_fields']:
+		index_college(kwargs['instance'])
+
+@receiver(post_delete, sender=College)
+def unindex_college(sender, **kwargs):
+	from account.search import unindex
+	unindex(kwargs['instance'].profile_id)
+
+@receiver(m2m_changed, sender=College.streams.through)
+def invalidate_college_streams(sender, **kwargs):
+	if kwargs.get('action') not in ['post_add', 'post_remove', 'post_clear']:
+		return
+	from college.utils import invalidate_reference_data
+	if kwargs.get('reverse'): # Stream's colleges changed
+		colleges = kwargs.get('pk_set') or College.objects.filter(streams=kwargs['instance']).values_list('pk', flat=True)
+	else:
+		colleges = [kwargs['instance'].pk]
+	invalidate_reference_data(*['profile:college:%d' % pk for pk in colleges])
@@ -0,0 +1,145 @@
+from django.conf import settings
+from django.db import transaction
+
+from college.models import College, Programme, Stream
+from ipu.cache import cached, get_namespace_version, invalidate
+from student.models import ExaminationBoard, Subject
+
+from collections import namedtuple
+import threading, time
+
+# Read-only copies of the reference tables' rows
+ProgrammeRecord = namedtuple('ProgrammeRecord', ['pk', 'name', 'years'])
+CollegeRecord = namedtuple('CollegeRecord', ['pk', 'code', 'name', 'streams']) # streams: frozenset of stream pks
+BoardRecord = namedtuple('BoardRecord', ['pk', 'name', 'abbreviation'])
+SubjectRecord = namedtuple('SubjectRecord', ['pk', 'name', 'code'])
+
+class StreamRecord(namedtuple('StreamRecord', ['pk', 'code', 'name', 'programme'])): # programme: ProgrammeRecord
+	__slots__ = ()
+
+	def __str__(self): # Same as Stream's
+		return "[%s] %s - %s" % (self.code, self.programme.name, self.name)
+
+def load_reference_rows():
+	college_streams = {}
+	for college, stream in College.streams.through.objects.values_list('college', 'stream'):
+		college_streams.setdefault(college, set()).add(stream)
+	return {
+		'programmes': list(Programme.objects.values_list('pk', 'name', 'years')),
+		'streams': list(Stream.objects.values_list('pk', 'code', 'name', 'programme')),
+		'colleges': [(pk, code, name, frozenset(college_streams.get(pk, ()))) for pk, code, name in College.objects.values_list('pk', 'code', 'name')],
+		'boards': list(ExaminationBoard.objects.values_list('pk', 'name', 'abbreviation')),
+		'subjects': list(Subject.objects.values_list('pk', 'name', 'code')),
+	}
+
+class ReferenceData(object):
+	''' Programmes, streams, colleges, boards and subjects by pk, and by code where they have one '''
+	def __init__(self, rows):
+		self.programmes = {row[0]: ProgrammeRecord(*row) for row in rows['programmes']}
+		self.streams = {row[0]: StreamRecord(*(row[:3] + (self.programmes[row[3]],))) for row in rows['streams']}
+		self.streams_by_code = {s.code: s for s in self.streams.values()}
+		self.colleges = {row[0]: CollegeRecord(*row) for row in rows['colleges']}
+		self.colleges_by_code = {c.code: c for c in self.colleges.values()}
+		self.boards = {row[0]: BoardRecord(*row) for row in rows['boards']}
+		self.subjects = {row[0]: SubjectRecord(*row) for row in rows['subjects']}
+		self.subjects_by_code = {s.code: s for s in self.subjects.values() if s.code}
+
+class ReferenceRegistry(object):
+	'''
+	Every process keeps its own ReferenceData. Save/delete receivers bump the shared 'reference' namespace version
+	(ipu.cache); a process looks it up at most every REFERENCE_REGISTRY_CHECK_INTERVAL seconds and reloads when it
+	changed, from the rows cached in Redis by whichever process reloaded first.
+	'''
+	def __init__(self):
+		self._data, self._version, self._checked_at = None, None, 0
+		self._lock = threading.Lock()
+
+	def get(self):
+		if time.time() - self._checked_at >= settings.REFERENCE_REGISTRY_CHECK_INTERVAL or self._data is None:
+			with self._lock:
+				version = get_namespace_version('reference')
+				if version is None or version != self._version or self._data is None: # None: unknown, the cache is unreachable
+					# Version read before loading, so that a change made meanwhile makes the next check reload again
+					self._data = ReferenceData(cached('reference', ['rows'], load_reference_rows, settings.CACHE_REFERENCE_TIMEOUT))
+					self._version = version
+				self._checked_at = time.time()
+		return self._data
+
+	def reset(self):
+		''' The next get() checks the version '''
+		self._checked_at = 0
+
+	def reload(self):
+		''' Straight from the database: the rows cached in Redis can be as stale as this process' copy '''
+		with self._lock:
+			version = get_namespace_version('reference')
+			self._data = ReferenceData(load_reference_rows())
+			self._version, self._checked_at = version, time.time()
+		return self._data
+
+registry = ReferenceRegistry()
+
+def get_reference_data():
+	return registry.get()
+
+def get_reference_record(table, pk):
+	'''
+	For pks read off other rows, e.g. a student's stream_id. One missing from this process' copy, which can be up to
+	REFERENCE_REGISTRY_CHECK_INTERVAL behind, makes it reload once; KeyError if the row is still not there.
+	'''
+	try:
+		return getattr(registry.get(), table)[pk]
+	except KeyError:
+		return getattr(registry.reload(), table)[pk]
+
+def invalidate_reference_data(*namespaces):
+	'''
+	For the receivers; `namespaces` are invalidated along with 'reference'. Done once the change is committed: a
+	version bumped before that could have a process load (and keep) the rows as they were.
+	'''
+	def invalidate_committed():
+		invalidate('reference', *namespaces)
+		registry.reset() # This process doesn't wait for the check interval
+	transaction.on_commit(invalidate_committed)
+
+def get_college_pk(code):
+	try:
+		return get_reference_data().colleges_by_code[code].pk
+	except KeyError:
+		raise College.DoesNotExist('College with code %s does not exist' % code)
+
+def get_stream(code):
+	try:
+		return get_reference_data().streams_by_code[code]
+	except KeyError:
+		raise Stream.DoesNotExist('Stream with code %s does not exist' % code)
+
+def get_stream_programme_pk(stream_pk):
+	try:
+		return get_reference_data().streams[stream_pk].programme.pk
+	except KeyError:
+		raise Stream.DoesNotExist('Stream %s does not exist' % stream_pk)
+
+def college_has_stream(college_code, stream_code):
+	data = get_reference_data()
+	college, stream = data.colleges_by_code.get(college_code), data.streams_by_code.get(stream_code)
+	return bool(college and stream and stream.pk in college.streams)
+
+def get_college_programme_pks(college_pk):
+	data = get_reference_data()
+	college = data.colleges.get(college_pk)
+	return {data.streams[pk].programme.pk for pk in college.streams} if college else set()
+
+def get_college_programmes(college_pk):
+	''' [(pk, name)] of the programmes the college offers streams of '''
+	data = get_reference_data()
+	return sorted((pk, data.programmes[pk].name) for pk in get_college_programme_pks(college_pk))
+
+def get_programme_streams(programme_pk):
+	''' [(pk, name)] '''
+	return sorted((s.pk, s.name) for s in get_reference_data().streams.values() if s.programme.pk == programme_pk)
+
+def get_board_name(board_pk):
+	''' Abbreviation if there is one '''
+	board = get_reference_data().boards.get(board_pk)
+	return (board.abbreviation or board.name) if board else '--'
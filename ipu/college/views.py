@@ -15,8 +15,10 @@ from college.forms import CollegeCreationForm, CollegeEditForm, CollegeSignupFor
 from college.models import College
 from dummy_company.forms import DummySessionFilterForm
 from faculty.forms import FacultySignupForm
+from ipu.cache import cached
 from notification.forms import NotifySessionStudentsForm
 from notification.models import Notification
+from notification.utils import get_unread_count
 from recruitment.models import PlacementSession
 from recruitment.forms import AssociationForm, SessionFilterForm
 
@@ -114,7 +116,7 @@ def college_home(request, **kwargs):
 		context['social_profile_form'] = SocialProfileForm(instance=user.social)
 	except SocialProfile.DoesNotExist:
 		context['social_profile_form'] = SocialProfileForm()
-	context['badge'] = college.profile.notification_target.filter(is_read=False).count() 
+	context['badge'] = get_unread_count(college.profile) 
 	context['session_filter_form'] = SessionFilterForm(profile=college)
 	context['dsession_filter_form'] = DummySessionFilterForm(college=college)
 	return render(request, 'college/home.html', context)
@@ -152,14 +154,18 @@ def edit_college(request, **kwargs):
 	else:
 		return handle_user_type(request, redirect_request=True)
 
-def get_college_public_profile(user, requester_type):
-	try:
-		college = College.objects.get(id = user.college.id)
-	except College.DoesNotExist:
-		return '<div class="valign-wrapper"><p class="valign">College doesn\'t have a profile yet. Stay tuned!</p></div>'
+def render_college_public_profile(college, requester_type):
 	context = {'name': college.name.title(), 'streams': college.streams.count(), 'students': college.students.count(), 'website': college.website, 'type': requester_type, 'college': college}
 	if college.photo:
 		context['photo'] = college.photo.url
 	context['associations'] = PlacementSession.objects.filter(association__college=college).count(),
 # Add queryset to filter out mass recruiters
 	return render_to_string ('college/pub_profile.html', context)
+
+def get_college_public_profile(user, requester_type):
+	try:
+		college = user.college
+	except College.DoesNotExist:
+		return '<div class="valign-wrapper"><p class="valign">College doesn\'t have a profile yet. Stay tuned!</p></div>'
+	# Invalidated by the receivers in college, student and recruitment models
+	return cached('profile:college:%d' % college.pk, [requester_type], lambda: render_college_public_profile(college, requester_type))
@@ -1,8 +1,9 @@
 from django.utils.translation import ugettext_lazy as _
 from django.db import models
-from django.db.models.signals import post_delete
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from account.models import CustomUser
+from ipu.cache import invalidate
 
 from utils import get_hashed_photo_name
 
@@ -35,3 +36,20 @@ def delete_photo(sender, **kwargs):
 		company.photo.delete(False)
 	except:
 		pass
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+def invalidate_company_profile(sender, **kwargs):
+	invalidate('profile:company:%d' % kwargs['instance'].pk)
+
+# Keeping the search index (account.search) in sync
+@receiver(post_save, sender=Company)
+def index_company(sender, **kwargs):
+	from account.search import index_company
+	if kwargs.get('update_fields') is None or 'name' in kwargs['update_fields']:
+		index_company(kwargs['instance'])
+
+@receiver(post_delete, sender=Company)
+def unindex_company(sender, **kwargs):
+	from account.search import unindex
+	unindex(kwargs['instance'].profile_id)
@@ -14,7 +14,9 @@ from account.tasks import send_activation_email_task
 from account.utils import handle_user_type, get_relevant_reversed_url
 from company.forms import CompanyCreationForm, CompanyEditForm
 from company.models import Company
+from ipu.cache import cached
 from notification.models import Notification
+from notification.utils import get_unread_count
 from recruitment.models import PlacementSession
 from recruitment.forms import AssociationForm, SessionFilterForm
 
@@ -82,7 +84,7 @@ def company_home(request, **kwargs):
 		context['social_profile_form'] = SocialProfileForm(instance=user.social)
 	except SocialProfile.DoesNotExist:
 		context['social_profile_form'] = SocialProfileForm()
-	context['badge'] = company.profile.notification_target.filter(is_read=False).count()
+	context['badge'] = get_unread_count(company.profile)
 	return render(request, 'company/home.html', context)
 ##	else:
 ##		return handle_user_type(request, redirect_request=True)
@@ -118,13 +120,16 @@ def edit_company(request, **kwargs):
 	else:
 		return handle_user_type(request, redirect_request=True)
 
-def get_company_public_profile(user, requester_type):
-	try:
-		company = Company.objects.get(id=user.company.id)
-	except Company.DoesNotExist:
-		return '<div class="valign-wrapper"><p class="valign">Company doesn\'t have a profile yet. Stay tuned!</p></div>'
+def render_company_public_profile(company, requester_type):
 	context = {'name': company.name.title(), 'associations': PlacementSession.objects.filter(association__company=company).count(), 'website': company.website, 'type': requester_type, 'company': company}
 	if company.photo:
 		context['photo'] = company.photo.url
-	print(context)
 	return render_to_string('company/pub_profile.html', context)
+
+def get_company_public_profile(user, requester_type):
+	try:
+		company = user.company
+	except Company.DoesNotExist:
+		return '<div class="valign-wrapper"><p class="valign">Company doesn\'t have a profile yet. Stay tuned!</p></div>'
+	# Invalidated by the receivers in company and recruitment models
+	return cached('profile:company:%d' % company.pk, [requester_type], lambda: render_company_public_profile(company, requester_type))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from download.utils import build_archive
+
+import os, shutil, tempfile, time
+
+class Command(BaseCommand):
+	help = 'Benchmarks cold, warm (unchanged roster) and incremental (grown roster) resume archive builds on synthetic files'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--resumes', type=int, default=500, dest='resumes')
+		parser.add_argument('--added', type=int, default=10, dest='added', help='Students joining for the incremental build')
+		parser.add_argument('--size', type=int, default=200, dest='size', help='Resume size in KB')
+
+	def handle(self, *args, **options):
+		workdir = tempfile.mkdtemp()
+		try:
+			resumes, archives = os.path.join(workdir, 'resumes'), os.path.join(workdir, 'compressed')
+			os.makedirs(resumes)
+			entries = {}
+			for i in range(options['resumes'] + options['added']):
+				path = os.path.join(resumes, 'resume_%d.pdf' % i)
+				with open(path, 'wb') as f:
+					f.write(os.urandom(options['size'] * 1024))
+				entries['%011d.pdf' % i] = path
+			initial = dict(list(sorted(entries.items()))[:options['resumes']])
+
+			built = []
+			for label, roster in [('cold', initial), ('warm', initial), ('incremental', entries)]:
+				start = time.time()
+				path, stats = build_archive(roster, [], folder=archives, candidates=built)
+				built.append(path)
+				self.stdout.write('%-12s %4d resumes: %.3fs (reused %d, added %d)' % (label, len(roster), time.time() - start, stats['reused'], stats['added']))
+		finally:
+			shutil.rmtree(workdir)
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import hashlib
+from django.db import migrations, models
+
+
+def backfill_fingerprints(apps, schema_editor):
+    DLRequest = apps.get_model('download', 'DLRequest')
+    for dl_request in DLRequest.objects.all():
+        students = ','.join(sorted(set(dl_request.students.split(','))))
+        DLRequest.objects.filter(pk=dl_request.pk).update(fingerprint=hashlib.sha1(students.encode('utf-8')).hexdigest())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('download', '0009_auto_20170729_1034'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dlrequest',
+            name='fingerprint',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=40),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_fingerprints, migrations.RunPython.noop),
+    ]
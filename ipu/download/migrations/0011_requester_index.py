@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('download', '0010_dlrequest_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='requester',
+            index_together=set([('requester', 'requested_on')]),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import validate_comma_separated_integer_list
 from django.db import models
@@ -7,7 +8,8 @@ from django.dispatch import receiver
 from account.models import CustomUser
 from college.models import College, Stream
 from student.models import Student
-import re, uuid
+from download.utils import delete_archive
+import hashlib, os, re, uuid
 
 # Create your models here.
 
@@ -30,6 +32,12 @@ class DLRequest(models.Model):
 	requesters = models.ManyToManyField(CustomUser, through='Requester', related_name="download_requests", blank=True)
 	batch = models.ForeignKey(Batch, related_name="download_requests")
 	students = models.TextField(validators=[validate_comma_separated_integer_list]) # Stores student enrollment numbers
+	fingerprint = models.CharField(max_length=40, db_index=True, editable=False) # SHA1 of the sorted enrollment numbers, see get_fingerprint
+
+	@staticmethod
+	def get_fingerprint(enrollment_numbers):
+		''' Same for any ordering/repetition of the same set of students '''
+		return hashlib.sha1(','.join(sorted(set(enrollment_numbers))).encode('utf-8')).hexdigest()
 
 	def get_students(self):
 		students = self.students.split(',')
@@ -50,6 +58,7 @@ class DLRequest(models.Model):
 			raise ValidationError('The students of a session must belong to the same college and programme.')
 
 	def save(self, *args, **kwargs):
+		self.fingerprint = DLRequest.get_fingerprint(self.students.split(','))
 		self.full_clean()
 		return super(DLRequest, self).save(*args, **kwargs)
 
@@ -61,6 +70,9 @@ class Requester(models.Model):
 	downloaded = models.BooleanField(default=False)
 	downloaded_on = models.DateTimeField(null=True)
 
+	class Meta:
+		index_together = [['requester', 'requested_on']]
+
 
 class ZippedFile(models.Model):
 	uuid = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -82,9 +94,6 @@ def validate_requester(sender, **kwargs):
 @receiver(post_delete, sender=ZippedFile)
 def delete_zip(sender, **kwargs):
 	zipped_file = kwargs['instance']
-	try:
-		print(zipped_file.zipped_file.path)
-		zipped_file.zipped_file.delete(False)
-	except Exception as e:
-		print('---', e, '---')
-		pass
+	name = zipped_file.zipped_file.name
+	if name and not ZippedFile.objects.filter(zipped_file=name).exists(): # Archives are content-addressed, hence may be shared
+		delete_archive(os.path.join(settings.MEDIA_ROOT, name))
@@ -3,16 +3,14 @@ from account.tasks import send_mass_mail_task
 from celery.decorators import task
 from celery.utils.log import get_task_logger
 from django.conf import settings
-from django.core.files import File
 from django.core.urlresolvers import reverse
 from django.template.loader import render_to_string
-from django.utils.crypto import get_random_string
 from download.models import DLRequest, ZippedFile
+from download.utils import get_resume_entries, build_archive, delete_archive
 from notification.models import Notification, NotificationData
 from student.models import Student
-from hashids import Hashids
 
-import os, time, zipfile
+import os
 
 logger = get_task_logger(__name__)
 
@@ -28,8 +26,6 @@ except PermissionError:
 	if not os.path.exists(ZIP_FOLDER):
 		os.mkdir(ZIP_FOLDER)
 '''
-ZIP_FOLDER = os.path.join(settings.MEDIA_ROOT, 'compressed')
-
 @task(name='handle_resume_dl_task')
 def handle_resume_dl_task(students, requester_pk, dl_request_pk, link, description):
 	''' Zip resumes and notify requester '''
@@ -39,33 +35,20 @@ def handle_resume_dl_task(students, requester_pk, dl_request_pk, link, descripti
 		requester = CustomUser.objects.get(pk=requester_pk)
 		dl_request = DLRequest.objects.get(pk=dl_request_pk)
 		user_hashid = settings.HASHID_CUSTOM_USER.encode(requester.pk)
-		'''
-		if getattr(getattr(getattr(dl_request, 'zipped_file', None), 'zipped_file', None),'name', ''):
-			zipped_file_obj = dl_request.zipped_file
-		else:
-		# FIXME: Not caching the result because of complex discrepancies. As of now, zipping on every request.
-		'''
-		zip_file_name = Hashids(salt="AbhiKaSamay", min_length=11).encode(round(time.time()))+ '_' + get_random_string() + '.zip'
-		zip_path = os.path.join(ZIP_FOLDER, zip_file_name)
-		zfile = zipfile.ZipFile(zip_path, 'w')
-		no_resumes_for = []
-		# Compressing each student's resume, if uploaded
-		for student in students_q:
-			if student.resume:
-				zfile.write(student.resume.path, student.profile.username + '.' + student.resume.name.split('.')[-1])#, compress_type=zipfile.ZIP_DEFLATED)
-			else:
-				no_resumes_for.append(student.profile.username)
-		if any(no_resumes_for):
-				zfile.writestr('missing_resumes_list.txt', '\n'.join(no_resumes_for).encode('utf-8'))
-		zfile.close()
-		# Creating Django File instance
-	
-		zfile = open(zip_path, 'rb')
-		zipped_file_obj,created = ZippedFile.objects.get_or_create(download_request=dl_request)
-		zipped_file_obj.zipped_file = File(zfile, name=zip_file_name)
-		zipped_file_obj.save()
-		zfile.close()
-		os.remove(zip_path) # Removing the zip file because save z_f_obj copies the zip file to a new one <name_randomstr>
+		# Content-addressed archive in MEDIA_ROOT/compressed; unchanged rosters reuse it, grown ones extend an older one
+		entries, missing = get_resume_entries(students_q)
+		# Only archives of the same batch can hold these students' resumes
+		candidates = ZippedFile.objects.filter(download_request__batch=dl_request.batch_id).exclude(zipped_file='').values_list('zipped_file', flat=True)
+		zip_path, stats = build_archive(entries, missing, candidates=[os.path.join(settings.MEDIA_ROOT, name) for name in candidates])
+		zip_name = os.path.relpath(zip_path, settings.MEDIA_ROOT)
+		zipped_file_obj, created = ZippedFile.objects.get_or_create(download_request=dl_request)
+		old_name = zipped_file_obj.zipped_file.name
+		if old_name != zip_name:
+			zipped_file_obj.zipped_file.name = zip_name # Already in its final location, no copy needed
+			zipped_file_obj.save()
+			if old_name and not ZippedFile.objects.filter(zipped_file=old_name).exists():
+				delete_archive(os.path.join(settings.MEDIA_ROOT, old_name))
+		logger.info('ZIP[%s] - hit: %s, reused: %d, added: %d' % (zip_name, stats['hit'], stats['reused'], stats['added']))
 		
 		link = link + reverse('serve', kwargs={'user_hashid': user_hashid, 'uuid': zipped_file_obj.uuid})
 		# Notifying
@@ -0,0 +1,113 @@
+from django.conf import settings
+from django.utils.crypto import get_random_string
+
+import hashlib, json, os, shutil, zipfile
+
+# Resume archives are content-addressed: <sha1 of entries>.zip, with a <sha1>.json manifest beside it.
+# An archive is reused as is when nothing changed, and an archive of the same batch (DLRequest.batch) is copied +
+# appended to when students were only added.
+ARCHIVE_FOLDER = os.path.join(settings.MEDIA_ROOT, 'compressed')
+MISSING_RESUMES = 'missing_resumes_list.txt'
+
+def get_resume_entries(students_queryset):
+	''' ({arcname: resume path}, [usernames without resume]) '''
+	entries, missing = {}, []
+	for student in students_queryset.select_related('profile'):
+		if student.resume and os.path.exists(student.resume.path):
+			entries[student.profile.username + '.' + student.resume.name.split('.')[-1]] = student.resume.path
+		else:
+			missing.append(student.profile.username)
+	return entries, missing
+
+def build_archive(entries, missing, folder=ARCHIVE_FOLDER, candidates=()):
+	'''
+	Returns (archive path, stats). `entries` maps arcname -> file path. The archive is keyed by
+	each entry's source name and mtime, so a changed resume yields a new archive.
+	`candidates` are the paths of archives it may extend (see find_base_archive).
+	'''
+	manifest = {
+		'entries': dict((arcname, [os.path.basename(path), os.path.getmtime(path)]) for arcname, path in entries.items()),
+		'missing': sorted(missing),
+	}
+	key = hashlib.sha1(json.dumps(manifest, sort_keys=True).encode('utf-8')).hexdigest()
+	path = os.path.join(folder, key + '.zip')
+	if os.path.exists(path + '.json') and os.path.exists(path):
+		return path, {'hit': True, 'reused': len(entries), 'added': 0}
+
+	os.makedirs(folder, exist_ok=True)
+	base = find_base_archive(manifest, candidates)
+	temp_path = '%s.%s.tmp' % (path, get_random_string(6))
+	reused = {}
+	if base:
+		shutil.copyfile(base[0], temp_path)
+		reused = base[1]['entries']
+		zfile = zipfile.ZipFile(temp_path, 'a')
+	else:
+		zfile = zipfile.ZipFile(temp_path, 'w')
+	for arcname, source in entries.items():
+		if arcname not in reused:
+			zfile.write(source, arcname)
+	if missing:
+		zfile.writestr(MISSING_RESUMES, '\n'.join(missing).encode('utf-8'))
+	zfile.close()
+	os.replace(temp_path, path)
+	with open(path + '.json', 'w') as f: # Written last; its presence marks the archive complete
+		json.dump(manifest, f)
+	return path, {'hit': False, 'reused': len(reused), 'added': len(entries) - len(reused)}
+
+def find_base_archive(manifest, candidates):
+	'''
+	Largest of the `candidates` (archive paths) whose entries are all unchanged in `manifest`. Archives
+	carrying a missing resumes list can't be extended, since zip entries can't be replaced in place.
+	'''
+	best = None
+	for manifest_path in set(path + '.json' for path in candidates):
+		try:
+			with open(manifest_path) as f:
+				candidate = json.load(f)
+		except (OSError, ValueError):
+			continue
+		if candidate['missing'] or not candidate['entries']:
+			continue
+		if any(manifest['entries'].get(arcname) != entry for arcname, entry in candidate['entries'].items()):
+			continue
+		if best is None or len(candidate['entries']) > len(best[1]['entries']):
+			best = (manifest_path[:-len('.json')], candidate)
+	if best and os.path.exists(best[0]):
+		return best
+	return None
+
+def delete_archive(path):
+	for p in [path, path + '.json']:
+		try:
+			os.remove(p)
+		except FileNotFoundError:
+			pass
+
+class ZipStreamBuffer(object):
+	''' Unseekable sink for ZipFile (which then writes data descriptors); drained after every member '''
+	def __init__(self):
+		self.chunks = []
+
+	def write(self, data):
+		self.chunks.append(bytes(data))
+		return len(data)
+
+	def flush(self):
+		pass
+
+	def drain(self):
+		data = b''.join(self.chunks)
+		self.chunks = []
+		return data
+
+def stream_archive(entries, missing):
+	''' Yields a zip of `entries` (arcname -> path) member by member; memory is bound by the largest resume '''
+	buffer = ZipStreamBuffer()
+	with zipfile.ZipFile(buffer, 'w') as zfile:
+		for arcname, path in sorted(entries.items()):
+			zfile.write(path, arcname)
+			yield buffer.drain()
+		if missing:
+			zfile.writestr(MISSING_RESUMES, '\n'.join(missing).encode('utf-8'))
+	yield buffer.drain() # Central directory
@@ -2,23 +2,29 @@ from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.sites.shortcuts import get_current_site
 from django.core.exceptions import PermissionDenied
-from django.http import HttpResponse, Http404, JsonResponse
+from django.http import HttpResponse, Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404
+from django.utils import timezone
 from django.utils.crypto import get_random_string
 from django.views.decorators.http import require_GET
-from account.decorators import require_user_types, require_AJAX
+from account.decorators import require_user_types, require_AJAX, require_groups
 from dummy_company.models import DummySession
 from recruitment.models import PlacementSession
+from student.models import Student
 from .models import *
 from .tasks import handle_resume_dl_task
+from .utils import get_resume_entries, stream_archive
+from utils import serve_file
 from datetime import datetime
 
+REQUEST_INTERVAL = 5*60 # Seconds a user waits between download requests
+
 # Create your views here.
 
-@require_AJAX
 @require_GET
 @login_required
 @require_user_types(['C', 'F', 'CO'])
+@require_groups(['Placement Handler'])
 def download_resume(request, sess_hashid, user_type, profile, **kwargs):
 	try:
 		session_id = settings.HASHID_PLACEMENTSESSION.decode(sess_hashid)[0]
@@ -30,8 +36,6 @@ def download_resume(request, sess_hashid, user_type, profile, **kwargs):
 			session = PlacementSession.objects.get(association__college=profile, pk=session_id)
 			description = " session by " + session.association.company.name
 		else:
-			if not request.user.groups.filter(name='Placement Handler'):
-				return JsonResponse(status=403, data={'error': 'Permission Denied. You are not authorized to handle college\'s placements.'})
 			session = PlacementSession.objects.get(association__college=profile.college, pk=session_id)
 			description = " session by " + session.association.company.name
 		if session.ended:
@@ -42,15 +46,13 @@ def download_resume(request, sess_hashid, user_type, profile, **kwargs):
 		print(e)
 		return JsonResponse(status=400, data={'error': 'Invalid Request.'})
 
-@require_AJAX
 @require_GET
 @login_required
 @require_user_types(['C','F'])
+@require_groups(['Placement Handler'])
 def download_resume_dummy(request, dsess_hashid, user_type, profile, **kwargs):
 	college = profile
 	if user_type == 'F':
-		if not request.user.groups.filter(name='Placement Handler'):
-			return JsonResponse(status=403, data={'error': 'Permission Denied. You are not authorized to handle college\'s placements.'})
 		college = college.college
 	try:
 		dsession_id = settings.HASHID_DUMMY_SESSION.decode(dsess_hashid)[0]
@@ -97,50 +99,100 @@ def serve_zipped_file(request, user_hashid, uuid):
 		if is_ajax:
 			return JsonResponse(status=200, data={'message': 'Proceed to download'})
 		else:
-			response = HttpResponse(zipped_file.zipped_file, content_type="application/x-zip-compressed")
-			response['Content-Disposition'] = 'attachment; filename=%s' % (zipped_file.zipped_file.name.split('/')[-1].split('.')[0] + get_random_string(6) + '.zip')
-			return response
+			filename = zipped_file.zipped_file.name.split('/')[-1].split('.')[0] + get_random_string(6) + '.zip'
+			return serve_file(request, zipped_file.zipped_file.path, filename=filename, content_type="application/x-zip-compressed")
 	except Exception as e:
 		print(e)
 		raise Http404('Link has expired.')
 
+@require_GET
+@login_required
+@require_user_types(['C', 'F', 'CO', 'S'])
+def serve_student_file(request, username, field, user_type, profile, **kwargs):
+	'''
+	Resume/photo of a student, for the student, their college and faculty, and companies associated with their college.
+	Photos also for other students, who see them on the student's public profile.
+	'''
+	student = get_object_or_404(Student.objects.select_related('profile'), profile__username=username)
+	if user_type == 'S':
+		allowed = student.pk == profile.pk or field == 'photo'
+	elif user_type == 'C':
+		allowed = student.college_id == profile.pk
+	elif user_type == 'F':
+		allowed = student.college_id == profile.college_id
+	else:
+		allowed = profile.associations.filter(college=student.college_id, approved=True).exists()
+	if not allowed:
+		raise PermissionDenied
+	file = getattr(student, field)
+	if not file:
+		raise Http404('No %s has been uploaded.' % field)
+	filename = '%s.%s' % (username, file.name.split('.')[-1])
+	return serve_file(request, file.path, filename=filename, attachment=(field == 'resume'))
+
+
+def is_rate_limited(user):
+	''' Whether the user made a download request (streamed or zipped) within the last REQUEST_INTERVAL seconds '''
+	last_request = Requester.objects.filter(requester=user, requested_on__isnull=False).order_by('-requested_on').first()
+	return last_request is not None and (timezone.now() - last_request.requested_on).total_seconds() < REQUEST_INTERVAL
+
+def get_dl_request(students_queryset):
+	''' The DLRequest of the roster as it is now; there's one per distinct set of students '''
+	enrollment_numbers = list(students_queryset.order_by('profile__username').values_list('profile__username', flat=True))
+	dl_request = DLRequest.objects.filter(fingerprint=DLRequest.get_fingerprint(enrollment_numbers)).first()
+	if dl_request is None:
+		student = students_queryset.first() # Because a session contains homogeneous students (same batch)
+		batch, created = Batch.objects.get_or_create(college=student.college, stream=student.stream, year=student.get_year())
+		dl_request = DLRequest.objects.create(batch=batch, students=','.join(enrollment_numbers))
+	return dl_request
+
+def stream_requested_resumes(request):
+	'''
+	The download (non AJAX GET) of a small roster. Streams the roster the AJAX call recorded (?request=<Requester pk>),
+	so students enrolled in between neither change what's downloaded nor push it over STREAMING_ZIP_MAX_STUDENTS.
+	Each recorded request downloads once.
+	'''
+	try:
+		user_request = Requester.objects.select_related('requested').get(pk=int(request.GET.get('request', '')), requester=request.user, downloaded=False)
+	except (ValueError, Requester.DoesNotExist):
+		raise Http404('Request the download again.')
+	if (timezone.now() - user_request.requested_on).total_seconds() >= REQUEST_INTERVAL:
+		raise Http404('The download link has expired. Request the download again.')
+	students = user_request.requested.students.split(',')
+	if len(students) > settings.STREAMING_ZIP_MAX_STUDENTS: # Requested to be zipped in the background, see handle_resume_downloads
+		raise Http404('Link has expired.')
+	user_request.downloaded, user_request.downloaded_on = True, timezone.now()
+	user_request.save()
+	entries, missing = get_resume_entries(user_request.requested.get_students())
+	response = StreamingHttpResponse(stream_archive(entries, missing), content_type="application/x-zip-compressed")
+	response['Content-Disposition'] = 'attachment; filename=%s.zip' % get_random_string(12)
+	return response
 
 def handle_resume_downloads(request, students_queryset, description):
 	''' Utility function '''
+	if not request.is_ajax():
+		return stream_requested_resumes(request)
 	if not students_queryset.exists():
 		return JsonResponse(status=400, data={'error': 'There are no students enrolled in the session.'})
-	link = "%s://%s" % (('https' if settings.USE_HTTPS else 'http'), get_current_site(request).domain)
-	user_requests = Requester.objects.filter(requester=request.user).order_by('-requested_on')
-	if user_requests.exists() and user_requests.first().requested_on and (datetime.utcnow() - user_requests.first().requested_on.replace(tzinfo=None)).total_seconds() < 300:
+	if is_rate_limited(request.user):
 		# Limiting the request issuing because of server limitations
-		return JsonResponse(status=400, data={'error': 'You are required to wait at least 10min before issuing a new download request.\
+		return JsonResponse(status=400, data={'error': 'You are required to wait at least 5min before issuing a new download request.\
 														Thanks for cooperating with us.'})
-	dl_request = None
-	for ur in DLRequest.objects.all():
-		if not ur.is_different(students_queryset):
-			# Checking if already a dl_request exists, which has the same set of students' zipped resumes. i.e. no difference
-			dl_request = ur
-			break
-	if dl_request is not None:
-		# A pre-existing dl request has been found.
-		user_request, created = Requester.objects.get_or_create(requester=request.user, requested=dl_request)
-		if not created:
-			# This user has requested this again.
-			if user_request.downloaded_on and (datetime.utcnow() - user_request.downloaded_on.replace(tzinfo=None)).total_seconds() < 1200 and user_request.downloaded:
-				# User has already downloaded it once. Requesting for another creation within 20min only.
-				return JsonResponse(status=400, data={'error': 'You have already downloaded the requested data. You must wait at least 20 min from your last download.'})
-			else:
-				# Update requested_on on successful download grant
-				user_request.requested_on = datetime.now()
-				user_request.save()
-		handle_resume_dl_task.delay(dl_request.students, request.user.pk, dl_request.pk, link, description)
-	else:
-		# A new DLRequest has to be created.
-		student = students_queryset.first() # Because a session contains homogeneous students (same batch)
-		batch,created = Batch.objects.get_or_create(college=student.college, stream=student.stream, year=student.get_year())
-		students = ','.join(s['profile__username'] for s in students_queryset.values('profile__username').order_by('profile__username'))
-		dlr = DLRequest.objects.create(batch=batch, students=students)
-		# Create new Requester. This user is asking for this, for the first time.
-		Requester.objects.create(requester=request.user, requested=dlr, requested_on=datetime.now())
-		handle_resume_dl_task.delay(students, request.user.pk, dlr.pk, link, description)
+	dl_request = get_dl_request(students_queryset)
+	user_request, created = Requester.objects.get_or_create(requester=request.user, requested=dl_request)
+	if len(dl_request.students.split(',')) <= settings.STREAMING_ZIP_MAX_STUDENTS:
+		# Small roster: zipped on the fly, straight to the client. The AJAX call records the request and hands back the link.
+		user_request.requested_on, user_request.downloaded = timezone.now(), False
+		user_request.save()
+		return JsonResponse(status=200, data={'location': '%s?request=%d' % (request.path, user_request.pk)})
+	if not created:
+		# This user has requested this again.
+		if user_request.downloaded_on and (datetime.utcnow() - user_request.downloaded_on.replace(tzinfo=None)).total_seconds() < 1200 and user_request.downloaded:
+			# User has already downloaded it once. Requesting for another creation within 20min only.
+			return JsonResponse(status=400, data={'error': 'You have already downloaded the requested data. You must wait at least 20 min from your last download.'})
+	# Update requested_on on successful download grant
+	user_request.requested_on = datetime.now()
+	user_request.save()
+	link = "%s://%s" % (('https' if settings.USE_HTTPS else 'http'), get_current_site(request).domain)
+	handle_resume_dl_task.delay(dl_request.students, request.user.pk, dl_request.pk, link, description)
 	return JsonResponse(status=200, data={'message': 'Compressed files successfully'})
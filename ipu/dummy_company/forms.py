@@ -7,7 +7,7 @@ from account.tasks import send_mass_mail_task
 from college.models import College, Programme, Stream
 from company.models import Company
 from dummy_company.models import DummyCompany, DummySession
-from notification.models import Notification
+from notification.tasks import notify_users
 from recruitment.fields import ModelHashidChoiceField, ModelMultipleHashidChoiceField
 from recruitment.models import SelectionCriteria
 from student.models import Student
@@ -219,12 +219,11 @@ class ManageDummySessionStudentsForm(forms.ModelForm):
 		message = "Sorry, your involvement in the %s session by %s was till here only!\
 					\nThanks for showing your interest.\
 					\nBest of luck for your future." % ("job" if self.instance.type == 'J' else "internship", self.instance.dummy_company.name)
-		for student in disqualified:
-			Notification.objects.create(actor=actor, target=student.profile, message=message)
+		disqualified_user_pks = list(disqualified.values_list('profile__pk', flat=True))
+		notify_users(actor, disqualified_user_pks, message=message)
 		# send mass email
 		subject = '%s session with %s' % ('Internship' if self.instance.type == 'I' else 'Job', self.instance.dummy_company.name)
 
-		disqualified_user_pks = [u['profile__pk'] for u in disqualified.values('profile__pk')]
 		send_mass_mail_task.delay(subject, message, disqualified_user_pks)
 #		send_mass_mail_task.delay(subject, message, list(disqualified_pks))
 		# LOG
@@ -281,9 +280,9 @@ class EditDummySessionForm(forms.ModelForm):
 			message += "You have grabbed the internship at %s. " % (dsession.dummy_company.name.title())
 		students = self.instance.students.all() # Not using 'studying' manager
 		student_usernames = ','.join([s['profile__username'] for s in students.values('profile__username')])
-		for student in students:
-			Notification.objects.create(actor=actor, target=student.profile, message=message)
-		send_mass_mail_task.delay("Congratulations!", message, [s['profile__pk'] for s in students.values('profile__pk')])
+		customuser_pks = list(students.values_list('profile__pk', flat=True))
+		notify_users(actor, customuser_pks, message=message)
+		send_mass_mail_task.delay("Congratulations!", message, customuser_pks)
 		# Log
 		dummyLogger.info('%s - Students selected %s - [DS: %d]' % (actor.username, student_usernames, self.instance.pk))
 		# # #
@@ -5,10 +5,11 @@ from django.dispatch import receiver
 from django.db.utils import IntegrityError
 from django.template.loader import render_to_string
 from django.utils.translation import ugettext_lazy as _
+from account.models import MassMail
 from account.tasks import send_mass_mail_task
 from college.models import College, Programme, Stream
 from company.models import Company
-from recruitment.models import SelectionCriteria
+from recruitment.models import SelectionCriteria, OpenOpportunity
 from student.models import Student
 from decimal import Decimal
 import datetime
@@ -125,18 +126,35 @@ def notify_students_about_new_posting(sender, **kwargs):
 #		streams = Stream.objects.filter(pk__in=kwargs.get('pk_set'))
 		subject = "New %s Posting - %s" % (dict(DummySession.PLACEMENT_TYPE)[dsession.type], dsession.dummy_company.name)
 		message = render_to_string('dummy_company/new_posting.txt', {'dcompany': dsession.dummy_company, 'dsession': dsession, 'deadline':dsession.application_deadline + datetime.timedelta(1)})
-		student_pks = []
-		customuser_pks = []
-		years = dsession.selection_criteria.years.split(',')
-		for stream in dsession.streams.all():
-			students = stream.students(manager='studying').filter(current_year__in=years) # Only currently studying students should be notified about new posting
-			student_pks += [s['pk'] for s in students.values('pk')]
-			customuser_pks += [u['profile__pk'] for u in students.values('profile__pk')]
+		years = dsession.selection_criteria.get_years()
+		students = Student.studying.filter(college=dsession.dummy_company.college, stream__in=dsession.streams.all(), current_year__in=years) # Only currently studying students should be notified about new posting
+		# As listed to students (student.views): those without qualifications yet are told too
+		not_ineligible = SelectionCriteria.objects.eligibility([dsession.selection_criteria], students).possibly_eligible_students(dsession.selection_criteria.pk)
+		customuser_pks = list(students.filter(pk__in=list(not_ineligible)).values_list('profile__pk', flat=True))
 #		students = Student.studying.filter(pk__in=student_pks)
 #		notification_data = NotificationData.objects.create(message=message, subject=subject) IMPORT ME
 #		college = association.college
 #		for student in students:
 #			Notification.objects.create(notification_data=notification_data, actor=college.profile, target=student.profile)
-		send_mass_mail_task.delay(subject, message, customuser_pks)
+		send_mass_mail_task.delay(subject, message, customuser_pks, priority=MassMail.POSTING)
 
 
+
+@receiver(post_save, sender=DummySession)
+def index_dsession_opportunities(sender, **kwargs):
+	OpenOpportunity.objects.index_dsession(kwargs.get('instance'))
+
+@receiver(m2m_changed, sender=DummySession.streams.through)
+def index_dsession_streams_opportunities(sender, **kwargs):
+	action = kwargs.get('action')
+	if action not in ['post_add', 'post_remove', 'post_clear']:
+		return
+	if not kwargs.get('reverse'):
+		dsessions = DummySession.objects.filter(pk=kwargs.get('instance').pk)
+	elif action == 'post_clear':
+		OpenOpportunity.objects.filter(stream=kwargs.get('instance'), dummy_session__isnull=False).delete()
+		return
+	else:
+		dsessions = DummySession.objects.filter(pk__in=kwargs.get('pk_set'))
+	for dsession in dsessions.select_related('dummy_company', 'selection_criteria'):
+		OpenOpportunity.objects.index_dsession(dsession)
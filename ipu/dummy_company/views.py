@@ -8,7 +8,7 @@ from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.utils.translation import ugettext_lazy as _
 from django.views.decorators.http import require_http_methods, require_GET, require_POST
-from account.decorators import require_user_types, require_AJAX
+from account.decorators import require_user_types, require_AJAX, require_groups
 from account.utils import handle_user_type, get_relevant_reversed_url, get_type_created
 from college.models import College
 from company.models import Company
@@ -17,8 +17,9 @@ from dummy_company.models import DummyCompany, DummySession
 from faculty.models import Faculty
 from notification.forms import NotifySessionStudentsForm
 from recruitment.models import SelectionCriteria
+from recruitment.summaries import get_dsession_summaries
 from recruitment.tasks import dump_stats_record_task
-from recruitment.utils import get_excel_structure
+from recruitment.utils import get_excel_structure, get_excel_response
 from student.models import Student, Programme, Stream
 
 import openpyxl as excel, datetime, time, logging
@@ -210,6 +211,7 @@ def create_dummy_session(request, **kwargs):
 @require_user_types(['C', 'F'])
 @login_required
 @require_GET
+@require_groups(['Placement Handler', 'Notifications Manager'])
 def dummy_excel(request, dsess, **kwargs):
 	requester = get_type_created(request.user)
 	user_type = requester.pop('user_type')
@@ -217,8 +219,6 @@ def dummy_excel(request, dsess, **kwargs):
 		return redirect(reverse(settings.PROFILE_CREATION_URL[user_type]))
 	college = requester['profile']
 	if user_type == 'F':
-		if not request.user.groups.filter(name__in=['Placement Handler', 'Notifications Manager']):
-			return JsonResponse(status=403, data={'error': 'Permission Denied. You are not authorized to handle college\'s placements.'})
 		college = college.college
 	try:
 		dsession_id = settings.HASHID_DUMMY_SESSION.decode(dsess)[0]
@@ -229,9 +229,7 @@ def dummy_excel(request, dsess, **kwargs):
 	streams_title = dsession.programme.name + ' - ' + ', '.join(["%s (%s)" % (s.name, s.code) for s in dsession.streams.all()])
 	students_queryset = dsession.students.all() # Not using 'studying' manager because otherwise graduated students' data won't be available for download for an archived session
 	workbook = get_excel_structure(title, streams_title, students_queryset)
-	response = HttpResponse(content=excel.writer.excel.save_virtual_workbook(workbook), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-	response['Content-Disposition'] = 'attachment; filename=dummy_session_%s.xlsx' % Hashids(salt="AbhiKaSamay").encode(round(time.time()))
-	return response
+	return get_excel_response(workbook, 'dummy_session_%s.xlsx' % Hashids(salt="AbhiKaSamay").encode(round(time.time())))
 
 
 @require_user_types(['S'])
@@ -284,18 +282,7 @@ def apply_to_dummy_company(request, dsess, **kwargs):
 def my_dummy_sessions(request, **kwargs):
 	user_type = kwargs.pop('user_type')
 	college = kwargs.pop('profile') if user_type == 'C' else kwargs.pop('profile').college
-	dsessions = DummySession.objects.filter(dummy_company__college=college)
-	dsessions_list = []
-	for ds in dsessions:
-		data = {}
-		data['dsessobj'] = ds
-		data['dsess_hashid'] = settings.HASHID_DUMMY_SESSION.encode(ds.pk)
-		data['salary'] = "%d LPA" % ds.salary
-		data['dcompany'] = ds.dummy_company.name.title()
-		data['type'] = "Internship" if ds.type == 'I' else "Job"
-		data['streams'] = ', '.join([s.name.title() for s in ds.streams.all()])
-		data['students'] = ds.students.count() # Don't Use 'studying'
-		dsessions_list.append(data)
+	dsessions_list = get_dsession_summaries(DummySession.objects.filter(dummy_company__college=college), user_type)
 	html = render(request, 'dummy_company/dummy_sessions.html', {'dsessions': dsessions_list}).content.decode('utf-8')
 	return JsonResponse(status=200, data={'html': html})
 
@@ -389,10 +376,9 @@ def edit_dummy_session(request, dsess_hashid, user_type, profile, **kwargs):
 @require_AJAX
 @login_required
 @require_POST
+@require_groups(['Placement Handler', 'Notifications Manager'])
 def notify_dsession(request, dsess_hashid, user_type, profile):
 	if user_type == 'F':
-		if not request.user.groups.filter(name__in=['Placement Handler', 'Notifications Manager']):
-			return JsonResponse(status=403, data={'error': 'Permission Denied. You are not authorized to handle college\'s placements.'})
 		profile = profile.college
 	try:
 		dsession_pk = settings.HASHID_DUMMY_SESSION.decode(dsess_hashid)[0]
@@ -411,27 +397,13 @@ def notify_dsession(request, dsess_hashid, user_type, profile):
 @require_AJAX
 @login_required
 @require_POST
+@require_groups(['Placement Handler', 'Notifications Manager'])
 def filter_dsessions(request, user_type, profile):
 	if user_type == 'F':
-		if not request.user.groups.filter(name__in=['Placement Handler', 'Notifications Manager']):
-			return JsonResponse(status=403, data={'error': 'Permission Denied. You are not authorized to handle college\'s placements.'})
 		profile = profile.college
 	f = DummySessionFilterForm(request.POST, college=profile)
 	if f.is_valid():
-		dsessions = f.get_filtered_dsessions()
-		dsessions_list = []
-		for ds in dsessions:
-			data = {}
-			data['dsessobj'] = ds
-			data['dsess_hashid'] = settings.HASHID_DUMMY_SESSION.encode(ds.pk)
-			data['salary'] = "%d LPA" % ds.salary
-			data['dcompany'] = ds.dummy_company.name.title()
-			data['type'] = "Internship" if ds.type == 'I' else "Job"
-			data['programme'] = ds.programme
-			data['years'] = ds.selection_criteria.years
-			data['streams'] = ', '.join([s.name.title() for s in ds.streams.all()])
-			data['students'] = ds.students.count()
-			dsessions_list.append(data)
+		dsessions_list = get_dsession_summaries(f.get_filtered_dsessions(), user_type)
 		html = render(request, 'college/dsessions_snippet.html', {'dsessions': dsessions_list, 'filtering': True}).content.decode('utf-8')
 		return JsonResponse(status=200, data={'html': html})
 	else:
@@ -1,10 +1,13 @@
 from django.core import validators
 from django.db import models
-from django.db.models.signals import post_delete
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.utils.translation import ugettext_lazy as _
 from account.models import CustomUser
 from college.models import College
+from recruitment.utils import invalidate_master_excel
+from student.models import Student, Qualification, SchoolMarksheet, ScoreMarksheet, CGPAMarksheet, ExaminationBoard
 
 from utils import get_hashed_photo_name
 
@@ -45,3 +48,32 @@ def delete_photo(sender, **kwargs):
 		faculty.photo.delete(False)
 	except:
 		pass
+
+# Master excel cached in MEDIA_ROOT goes stale whenever any data it shows changes
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def student_changed(sender, **kwargs):
+	invalidate_master_excel(College.objects.filter(pk=kwargs['instance'].college_id))
+
+@receiver(post_save, sender=Qualification)
+@receiver(post_delete, sender=Qualification)
+def qualification_changed(sender, **kwargs):
+	invalidate_master_excel(College.objects.filter(students__pk=kwargs['instance'].student_id))
+
+@receiver(post_save, sender=SchoolMarksheet)
+@receiver(post_save, sender=ScoreMarksheet)
+@receiver(post_save, sender=CGPAMarksheet)
+def marksheet_changed(sender, **kwargs):
+	marksheet = kwargs['instance']
+	if sender == SchoolMarksheet:
+		q = Q(students__marksheet=marksheet)
+	elif sender == ScoreMarksheet:
+		q = Q(students__marksheet__marksheet_10=marksheet) | Q(students__marksheet__marksheet_12=marksheet)
+	else:
+		q = Q(students__marksheet__cgpa_marksheet=marksheet)
+	invalidate_master_excel(College.objects.filter(q).distinct())
+
+@receiver(post_save, sender=ExaminationBoard)
+def board_changed(sender, **kwargs):
+	if not kwargs.get('created'):
+		invalidate_master_excel(College.objects.all())
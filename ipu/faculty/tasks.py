@@ -0,0 +1,72 @@
+from account.emailqueue import get_redis
+from account.models import CustomUser
+from celery.decorators import task
+from celery.utils.log import get_task_logger
+from college.models import College
+from notification.models import Notification
+from recruitment.utils import get_master_excel_structure, get_master_excel_version, get_master_excel_path, get_master_excel_paths, MASTER_EXCEL_FOLDER
+from django.utils.crypto import get_random_string
+
+import os
+
+logger = get_task_logger(__name__)
+
+MAX_ATTEMPTS = 3
+MASTER_EXCEL_LOCK_TTL = 30*60 # In case a worker dies generating
+
+def get_master_excel_keys(college_pk):
+	''' Redis keys of the college's "generating" lock and of the set of users waiting for the workbook '''
+	return ('master_excel:generating:%d' % college_pk, 'master_excel:waiting:%d' % college_pk)
+
+def queue_master_excel(college_pk, requester_pk, link):
+	''' Queues generation of the college's master excel, unless it's underway; the requester is notified either way '''
+	lock_key, waiting_key = get_master_excel_keys(college_pk)
+	r = get_redis()
+	r.sadd(waiting_key, requester_pk)
+	if r.set(lock_key, 1, nx=True, ex=MASTER_EXCEL_LOCK_TTL):
+		generate_master_excel_task.delay(college_pk, link)
+
+@task(name='generate_master_excel_task')
+def generate_master_excel_task(college_pk, link):
+	''' Write the college's master excel to MEDIA_ROOT (unless already there) and notify the requesters (see queue_master_excel) '''
+	generated = False
+	try:
+		college = College.objects.get(pk=college_pk)
+		for attempt in range(1, MAX_ATTEMPTS+1):
+			# While the version is unknown (None; the cache is unreachable), the workbook is made once, under a name of its
+			# own, and no other is deleted: there's no telling which of them is stale
+			version = get_master_excel_version(college)
+			path = get_master_excel_path(college, version)
+			if version is not None and os.path.exists(path):
+				break
+			os.makedirs(MASTER_EXCEL_FOLDER, exist_ok=True)
+			temp_path = '%s.%s.tmp' % (path, get_random_string(6))
+			workbook = get_master_excel_structure(college, college.students(manager='studying').all()) # Only current students
+			workbook.save(temp_path)
+			current = get_master_excel_version(college) if version is not None else None
+			if current is not None and current != version and attempt < MAX_ATTEMPTS:
+				os.remove(temp_path) # Some student changed while generating
+				continue
+			os.replace(temp_path, path)
+			if version is not None:
+				for old_path in get_master_excel_paths(college): # Of older versions, and the one made while the version was unknown
+					if old_path != path:
+						os.remove(old_path)
+			logger.info('Master Excel[%s] generated in %d attempt(s)' % (college.code, attempt))
+			break
+		generated = True
+	except College.DoesNotExist:
+		logger.error('College[%d] for master excel doesn\'t exist' % college_pk)
+	except Exception as e:
+		logger.critical('Master Excel of college[%d] - \n%s' % (college_pk, e))
+	finally:
+		lock_key, waiting_key = get_master_excel_keys(college_pk)
+		pipeline = get_redis().pipeline() # Whoever asks after this queues a new task, which finds the workbook ready
+		pipeline.smembers(waiting_key)
+		pipeline.delete(waiting_key, lock_key)
+		requester_pks = [int(pk) for pk in pipeline.execute()[0]]
+	if not generated:
+		return
+	for requester in CustomUser.objects.filter(pk__in=requester_pks):
+		Notification.objects.create(actor=requester, target=requester, message='Master excel of your college\'s students is ready to be downloaded <a class="x-master" href="%s"><b>here.</b></a>' % link)
+		logger.info('Notified - Master Excel[%s] - User[%d]' % (college.code, requester.pk))
@@ -5,11 +5,11 @@ from django.contrib.auth.decorators import login_required, permission_required,
 from django.contrib.sites.shortcuts import get_current_site
 from django.core.exceptions import PermissionDenied
 from django.core.urlresolvers import reverse
-from django.http import HttpResponse, Http404, JsonResponse
+from django.http import HttpResponse, Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.template.loader import render_to_string
 from django.views.decorators.http import require_GET, require_POST, require_http_methods
-from account.decorators import require_user_types, require_AJAX
+from account.decorators import require_user_types, require_AJAX, require_groups
 from account.forms import AccountForm, SocialProfileForm, SetPasswordForm
 from account.models import CustomUser, SocialProfile
 from account.tasks import send_activation_email_task
@@ -19,16 +19,19 @@ from college.models import College
 from dummy_company.forms import DummySessionFilterForm
 from faculty.forms import FacultySignupForm, FacultyProfileForm, EnrollmentForm, EditGroupsForm, ChooseFacultyForm, VerifyStudentProfileForm
 from faculty.models import Faculty
+from faculty.tasks import queue_master_excel
 from notification.models import Notification
+from notification.utils import get_unread_count
 from notification.forms import NotifySessionStudentsForm
 from recruitment.forms import SessionFilterForm
-from recruitment.utils import get_master_excel_structure
+from recruitment.utils import get_master_excel_path, get_master_excel_version
 from student.models import Qualification, Student
 from student.forms import QualificationForm, ScoreMarksheetForm, CGPAMarksheetForm, ScoreForm, QualForm
-import re
+import os, re
 import logging
 import openpyxl as excel, time
 from hashids import Hashids
+from wsgiref.util import FileWrapper
 
 # Create your views here.
 
@@ -122,21 +125,19 @@ def faculty_home(request, **kwargs):
 		context['social_profile_form'] = SocialProfileForm(instance=user.social)
 	except SocialProfile.DoesNotExist:
 		context['social_profile_form'] = SocialProfileForm()
-	context['badge'] = (faculty.college.profile.notification_target.filter(is_read=False).count() + faculty.profile.notification_target.filter(is_read=False).count())
+	context['badge'] = (get_unread_count(faculty.college.profile) + get_unread_count(faculty.profile))
 	return render(request, 'faculty/home.html', context)
 ##	else:
 ##		return handle_user_type(request, redirect_request=True)
 
-#@user_passes_test(lambda u: u.groups.filter(name='Verifier')) cant use this because need to return Jsonresp
 @require_user_types(['F'])
 @login_required
 @require_http_methods(['GET','POST'])
+@require_groups(['Verifier'], message='Permission Denied. You cannot verify students')
 def get_enrollment_number(request, profile, user_type):
 	if not request.is_ajax():
 #		return handle_user_type(request)
 		raise PermissionDenied('')
-	if not request.user.groups.filter(name='Verifier'):
-		return JsonResponse(status=403, data={'error': 'Permission Denied. You cannot verify students'})
 	if request.method == 'GET':
 		try:
 			del request.session['enrollmentno']
@@ -253,11 +254,10 @@ def manage(request, user_type, profile):
 @require_user_types(['F'])
 @login_required
 @require_POST
+@require_groups(['Verifier'], message='Permission Denied. You cannot verify students')
 def verify_cgpa(request, klass_hashid, user_type, profile, **kwargs):
 	if not request.is_ajax():
 		raise PermissionDenied('')
-	if not request.user.groups.filter(name='Verifier'):
-		return JsonResponse(status=403, data={'error': 'Permission Denied. You cannot verify students'})
 	try:
 		klass = str(settings.HASHID_KLASS.decode(klass_hashid)[0])
 		if klass not in ['10','12']:
@@ -287,11 +287,10 @@ def verify_cgpa(request, klass_hashid, user_type, profile, **kwargs):
 @require_user_types(['F'])
 @login_required
 @require_POST
+@require_groups(['Verifier'], message='Permission Denied. You cannot verify students')
 def verify_board(request, klass_hashid, user_type, profile, **kwargs):
 	if not request.is_ajax():
 		raise PermissionDenied('')
-	if not request.user.groups.filter(name='Verifier'):
-		return JsonResponse(status=403, data={'error': 'Permission Denied. You cannot verify students'})
 	try:
 		klass = str(settings.HASHID_KLASS.decode(klass_hashid)[0])
 		if klass not in ['10','12']:
@@ -323,13 +322,21 @@ def verify_board(request, klass_hashid, user_type, profile, **kwargs):
 @require_http_methods(['GET','POST'])
 @login_required
 @require_user_types(['F'])
+@require_groups(['Placement Handler', 'Notifications Manager'])
 def download_master_excel(request, profile, **kwargs):
-	if not request.user.groups.filter(name__in=['Placement Handler', 'Notifications Manager']):
-			return JsonResponse(status=403, data={'error': 'Permission Denied. You are not authorized to handle college\'s placements.'})
 	college = profile.college
-	workbook = get_master_excel_structure(college, college.students(manager='studying').all()) # Only current students
-	response = HttpResponse(content=excel.writer.excel.save_virtual_workbook(workbook), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+	path = get_master_excel_path(college, get_master_excel_version(college))
+	if not os.path.exists(path):
+		if not request.is_ajax():
+			raise Http404('Master excel is being prepared. You will be notified once it is ready.')
+		link = "%s://%s%s" % (('https' if settings.USE_HTTPS else 'http'), get_current_site(request).domain, reverse('master_excel'))
+		queue_master_excel(college.pk, request.user.pk, link)
+		return JsonResponse(status=200, data={'queued': True, 'message': 'The master excel is being prepared. A notification containing the download link will be generated once it is ready.'})
+	if request.is_ajax():
+		return JsonResponse(status=200, data={})
 	facultyLogger.warning("[%s] - [%s] - Downloaded Master Excel for %d students" % (college.code, profile.profile.username, college.students(manager='studying').count())) # Only current students
+	response = StreamingHttpResponse(FileWrapper(open(path, 'rb')), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+	response['Content-Length'] = os.path.getsize(path)
 	response['Content-Disposition'] = 'attachment; filename=master_%s.xlsx' % Hashids(salt="AbhiKaSamay").encode(round(time.time()))
 	return response
 
@@ -0,0 +1,134 @@
+from django.core.cache import cache
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+from django.utils.crypto import get_random_string
+
+import logging, pickle, redis, time
+
+cacheLogger = logging.getLogger('cache')
+
+class RedisCache(BaseCache):
+	'''
+	Cache backend on the Redis that already runs for celery (Django 1.9 ships none). LOCATION is a redis:// URL.
+	While Redis is unreachable nothing is cached: reads miss, so every value is computed afresh, and writes are dropped.
+	Redis is retried after OPTIONS['RETRY_AFTER'] seconds, and on getting it back the cache is cleared, since the
+	invalidations dropped meanwhile would have left stale values in it. An outage slows pages down instead of breaking them.
+	'''
+	def __init__(self, server, params):
+		super(RedisCache, self).__init__(params)
+		options = params.get('OPTIONS', {})
+		self._client = redis.StrictRedis.from_url(server, socket_timeout=options.get('SOCKET_TIMEOUT', 0.5), socket_connect_timeout=options.get('SOCKET_TIMEOUT', 0.5))
+		self._retry_after = options.get('RETRY_AFTER', 30)
+		self._retry_at = 0
+		self._recovering = False
+
+	def _run(self, operation, default=None):
+		if time.time() >= self._retry_at:
+			try:
+				if self._recovering:
+					self._clear(self._client)
+					self._recovering = False
+					cacheLogger.info('Redis reachable again, cache cleared')
+				return operation(self._client)
+			except redis.RedisError as e:
+				self._retry_at = time.time() + self._retry_after
+				self._recovering = True
+				cacheLogger.warning('Redis unreachable, not caching for %ds - %s' % (self._retry_after, e))
+		return default
+
+	def _key(self, key, version):
+		key = self.make_key(key, version=version)
+		self.validate_key(key)
+		return key
+
+	def _set(self, client, key, value, timeout, **kwargs):
+		timeout = self.get_backend_timeout(timeout)
+		if timeout is not None and timeout <= 0:
+			client.delete(key)
+			return True
+		return client.set(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), ex=None if timeout is None else max(1, int(timeout)), **kwargs)
+
+	def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+		k = self._key(key, version)
+		return self._run(lambda r: bool(self._set(r, k, value, timeout, nx=True)), False)
+
+	def get(self, key, default=None, version=None):
+		k = self._key(key, version)
+		def get(r):
+			value = r.get(k)
+			return default if value is None else pickle.loads(value)
+		return self._run(get, default)
+
+	def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+		k = self._key(key, version)
+		self._run(lambda r: self._set(r, k, value, timeout))
+
+	def delete(self, key, version=None):
+		k = self._key(key, version)
+		self._run(lambda r: r.delete(k))
+
+	def has_key(self, key, version=None):
+		k = self._key(key, version)
+		return self._run(lambda r: bool(r.exists(k)), False)
+
+	def get_many(self, keys, version=None):
+		keys = list(keys)
+		def get_many(r):
+			values = r.mget([self._key(key, version) for key in keys]) if keys else []
+			return {key: pickle.loads(value) for key, value in zip(keys, values) if value is not None}
+		return self._run(get_many, {})
+
+	def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+		def set_many(r):
+			pipeline = r.pipeline()
+			for key, value in data.items():
+				self._set(pipeline, self._key(key, version), value, timeout)
+			pipeline.execute()
+		self._run(set_many)
+
+	def delete_many(self, keys, version=None):
+		keys = list(keys)
+		if keys:
+			self._run(lambda r: r.delete(*[self._key(key, version) for key in keys]))
+
+	def _clear(self, client):
+		keys = list(client.scan_iter(match='%s:*' % self.key_prefix))
+		for i in range(0, len(keys), 1000):
+			client.delete(*keys[i:i + 1000])
+
+	def clear(self):
+		''' Only the keys under this cache's KEY_PREFIX; the database is shared with celery '''
+		self._run(self._clear)
+
+# Namespaced helpers
+# A namespace (eg. 'stats', 'profile:college:12') carries a version token in the cache; its keys embed the token,
+# so invalidating the whole namespace is a single write and the orphaned entries simply expire.
+
+def get_namespace_version(namespace):
+	''' None while the cache is unreachable: the version is unknown then, and nothing cached can be told current '''
+	key = 'namespace:%s' % namespace
+	version = cache.get(key)
+	if version is None:
+		token = get_random_string(8)
+		version = token if cache.add(key, token, None) else cache.get(key) # Another process got there first, or the cache is unreachable
+	return version
+
+def make_namespaced_key(namespace, *parts):
+	''' None while the namespace's version is unknown '''
+	version = get_namespace_version(namespace)
+	if version is None:
+		return None
+	return '%s:%s:%s' % (namespace, version, ':'.join(str(p) for p in parts))
+
+def cached(namespace, parts, compute, timeout=DEFAULT_TIMEOUT):
+	''' The value of compute() cached under the namespace; `parts` (a list) tells the values of a namespace apart '''
+	key = make_namespaced_key(namespace, *parts)
+	if key is None:
+		return compute()
+	value = cache.get(key)
+	if value is None:
+		value = compute()
+		cache.set(key, value, timeout)
+	return value
+
+def invalidate(*namespaces):
+	cache.set_many({'namespace:%s' % namespace: get_random_string(8) for namespace in namespaces}, None)
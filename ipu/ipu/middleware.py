@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.db import connection
+
+from contextlib import contextmanager
+import logging, re
+
+queryLogger = logging.getLogger('queries')
+
+class QueryBudgetExceeded(AssertionError):
+	pass
+
+def summarize_queries(queries):
+	''' (count, total time in ms, [(ms, sql)] of the slowest) of connection.queries entries '''
+	timed = sorted(((float(q['time']) * 1000, q['sql']) for q in queries), key=lambda t: t[0], reverse=True)
+	return len(timed), sum(t[0] for t in timed), timed[:settings.QUERY_LOG_SLOWEST]
+
+class QueryBudgetMiddleware(object):
+	'''
+	Counts SQL queries and DB time per view. With DEBUG, responses carry X-Query-* headers; otherwise every
+	request is written to the 'queries' log. A view over its QUERY_BUDGETS entry (by URL name) is logged as a
+	warning, or raises QueryBudgetExceeded when QUERY_BUDGET_STRICT is on (for tests).
+	'''
+	def process_request(self, request):
+		# Queries are only recorded with a debug cursor; connection.queries is reset on every request_started
+		request._query_budget = {'forced': connection.force_debug_cursor, 'start': len(connection.queries_log), 'view': request.path}
+		connection.force_debug_cursor = True
+
+	def process_view(self, request, view_func, view_args, view_kwargs):
+		if hasattr(request, '_query_budget'):
+			match = request.resolver_match
+			request._query_budget['view'] = match.url_name if match and match.url_name else '%s.%s' % (view_func.__module__, view_func.__name__)
+
+	def process_response(self, request, response):
+		if not hasattr(request, '_query_budget'):
+			return response
+		state = request._query_budget
+		connection.force_debug_cursor = state['forced']
+		count, total, slowest = summarize_queries(list(connection.queries_log)[state['start']:])
+		if settings.DEBUG:
+			response['X-Query-Count'] = count
+			response['X-Query-Time'] = '%.1fms' % total
+			if slowest:
+				response['X-Query-Slowest'] = '%.1fms %s' % (slowest[0][0], re.sub(r'\s+', ' ', slowest[0][1])[:256])
+		else:
+			queryLogger.info('%s - %d queries, %.1fms%s' % (state['view'], count, total, ''.join(' | %.1fms %s' % (ms, sql[:256]) for ms, sql in slowest if ms >= settings.QUERY_LOG_SLOW_MS)))
+		budget = settings.QUERY_BUDGETS.get(state['view'])
+		if budget is not None and count > budget:
+			message = '%s ran %d queries; budget is %d' % (state['view'], count, budget)
+			if settings.QUERY_BUDGET_STRICT:
+				raise QueryBudgetExceeded(message)
+			queryLogger.warning(message)
+		return response
+
+@contextmanager
+def query_budget(budget):
+	'''
+	For tests, to catch N+1 regressions:
+		with query_budget(10):
+			self.client.get(reverse('mysessions'))
+	'''
+	from django.test.utils import CaptureQueriesContext
+	with CaptureQueriesContext(connection) as context:
+		yield context
+	if len(context) > budget:
+		count, total, slowest = summarize_queries(context.captured_queries)
+		raise QueryBudgetExceeded('%d queries (%.1fms) ran; budget is %d. Slowest:\n%s' % (count, total, budget, '\n'.join('%.1fms %s' % s for s in slowest)))
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/1.9/ref/settings/
 
 import os
 import hashids, socket
+from datetime import timedelta
 from .logging import configure_logging
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
@@ -39,6 +40,7 @@ if socket.gethostname() == 'usict-tnp':
 	SECURE_SSL_REDIRECT = True
 	USE_HTTPS = True # Self defined boolean
 	MEDIA_ROOT = '/var/www/ipu/media/'
+	FILE_SERVING_BACKEND = 'nginx' # X-Accel-Redirect to FILE_SERVING_INTERNAL_URL (an `internal;` nginx location aliased to MEDIA_ROOT)
 	
 else:
 	DEBUG = True
@@ -50,6 +52,7 @@ else:
 	GOOGLE_RECAPTCHA_SECRET_KEY = '6Lf15yUUAAAAAAqiR-42Dd97yqAUqdab0jW3KK4M'
 	GOOGLE_RECAPTCHA_SITE_KEY = "6Lf15yUUAAAAAI1ju9iGXNQQQFKhIQU41J5ccaDC"
 	MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+	FILE_SERVING_BACKEND = 'django' # Chunked FileResponse with Range support
 
 # LOGGING CONFIGURATION
 LOGGING_CONFIG = None
@@ -88,8 +91,27 @@ MIDDLEWARE_CLASSES = [
 	'django.contrib.auth.middleware.SessionAuthenticationMiddleware',
 	'django.contrib.messages.middleware.MessageMiddleware',
 	'django.middleware.clickjacking.XFrameOptionsMiddleware',
+	'ipu.middleware.QueryBudgetMiddleware',
+	'account.middleware.ProfileMiddleware', # After QueryBudgetMiddleware, which counts its query
 ]
 
+# Query instrumentation (ipu.middleware). Budgets are ceilings per URL name, meant to catch N+1 regressions
+QUERY_BUDGETS = {
+	'view_companies': 12,
+	'get_notifications': 8,
+	'unread_notifications': 4,
+	'mysessions': 10,
+	'filter_sessions': 12,
+	'myrequests': 8,
+	'college_association_requests': 8,
+	'company_association_requests': 8,
+	'mydsessions': 8,
+	'filter_dsessions': 10,
+}
+QUERY_BUDGET_STRICT = False # Raise instead of logging a warning; turn on in tests with override_settings
+QUERY_LOG_SLOWEST = 3
+QUERY_LOG_SLOW_MS = 50 # Statements logged along with a request (in prod) when at least this slow
+
 ROOT_URLCONF = 'ipu.urls'
 
 TEMPLATES = [
@@ -125,6 +147,23 @@ DATABASES = {
 	}
 }
 
+# Cache on the celery Redis (its own database); while Redis is down nothing is cached. See ipu.cache
+CACHES = {
+	'default': {
+		'BACKEND': 'ipu.cache.RedisCache',
+		'LOCATION': 'redis://localhost:6379/1',
+		'KEY_PREFIX': 'ipu',
+		'TIMEOUT': 60 * 60,
+		'OPTIONS': {
+			'SOCKET_TIMEOUT': 0.5,
+			'RETRY_AFTER': 30, # Seconds without caching before trying Redis again
+		},
+	}
+}
+CACHE_REFERENCE_TIMEOUT = 24 * 60 * 60 # Colleges, programmes, streams, boards, subjects
+REFERENCE_REGISTRY_CHECK_INTERVAL = 5 # Seconds a process trusts its in-memory reference data before checking the version
+CACHE_STATS_TIMEOUT = 24 * 60 * 60
+CACHE_GROUPS_TIMEOUT = 60 # Bounds how long a permission change can go unseen, should an invalidation be lost
 
 # Password validation
 # https://docs.djangoproject.com/en/1.9/ref/settings/#auth-password-validators
@@ -172,6 +211,11 @@ SILENCED_SYSTEM_CHECKS = ["urls.W001",]
 
 MEDIA_URL = '/media/'
 
+# Protected file downloads (see utils.serve_file): 'nginx' (X-Accel-Redirect), 'sendfile' (X-Sendfile) or 'django'
+FILE_SERVING_INTERNAL_URL = '/protected/'
+# Sessions with at most these many students get their resumes zipped on the fly within the request (<= FILE_MAX_SIZE each)
+STREAMING_ZIP_MAX_STUDENTS = 60
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/1.9/howto/static-files/
 
@@ -224,6 +268,12 @@ CELERY_ACCEPT_CONTENT = ['application/json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'India/Kolkata'
+CELERYBEAT_SCHEDULE = {
+	'drain-email-queue': {
+		'task': 'drain_email_queue_task',
+		'schedule': timedelta(minutes=5),
+	},
+}
 
 # URL NAMES DICTIONARY FOR USER TYPES
 HOME_URL = {
@@ -251,5 +301,21 @@ DISALLOWED_EMAIL_DOMAINS = ['mailinator', 'discard.email', 'thraml', 'mintemail'
 # Default 3 days for password reset link is a potential time bomb for users.
 PASSWORD_RESET_TIMEOUT_DAYS = 1
 
-# Blocking mass mail activity because of limitation on emails (100/day)
-LIMIT_EMAIL = True
+# Notifications to more users than the threshold are created in a celery task instead of the request
+NOTIFICATION_FANOUT_ASYNC_THRESHOLD = 500
+NOTIFICATION_FANOUT_BATCH_SIZE = 500
+NOTIFICATIONS_PAGE_SIZE = 20
+
+# Provider's cap on outbound email (None for no cap). Mass mail waits in a queue, by priority, for quota; it never
+# takes the last EMAIL_TRANSACTIONAL_RESERVE of a day, which are kept for activation and forgot password emails.
+EMAIL_DAILY_LIMIT = 100
+EMAIL_HOURLY_LIMIT = None
+EMAIL_TRANSACTIONAL_RESERVE = 20
+EMAIL_QUEUE_STALE_AFTER = 60 * 60 # Seconds after which recipients dispatched to a chunk that never ran are queued again
+
+# Mass mail is sent in chunks (one task and SMTP connection each); EMAIL_PROVIDER_CONCURRENCY caps simultaneous connections
+MASS_MAIL_CHUNK_SIZE = 100
+EMAIL_PROVIDER = 'sendgrid'
+EMAIL_PROVIDER_CONCURRENCY = {
+	'sendgrid': 4,
+}
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Notification
+from .models import Notification, BroadcastNotification
 
 # Register your models here.
 admin.site.register(Notification)
+admin.site.register(BroadcastNotification)
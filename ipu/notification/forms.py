@@ -2,6 +2,7 @@ from django import forms
 from notification.models import Issue , IssueReply , Report , Notification , NotificationData
 from django.utils.translation import ugettext_lazy as _
 from account.tasks import send_mass_mail_task
+from notification.tasks import notify_users
 from material import *
 import logging
 
@@ -216,7 +217,7 @@ class NotifySessionStudentsForm(forms.Form):
 
 	def notify_all(self, students , actor):
 		if self.cleaned_data.get('mail'):
-			student_pks = self.querysets_to_values(students.values('profile__pk') , 'profile__pk')
+			student_pks = list(students.values_list('profile__pk', flat=True))
 			student_enrolls = self.querysets_to_values(students.values('profile__username') , 'profile__username')
 			subject = self.cleaned_data.get('subject' , None)
 			message = self.cleaned_data.get('message' , None)
@@ -228,10 +229,8 @@ class NotifySessionStudentsForm(forms.Form):
 			message = self.cleaned_data.get('message' , None)
 			student_enrolls = self.querysets_to_values(students.values('profile__username') , 'profile__username')
 			notification_data_object = NotificationData.objects.create(subject = subject , message = message)
-			for student in students:
-				student_customeuser_object = student.profile
-				Notification.objects.create(actor = actor, target = student_customeuser_object , notification_data = notification_data_object)
-			notificationLogger.info('Session notification created for %s' % (student_enrolls))
+			fan_out = notify_users(actor, students.values_list('profile__pk', flat=True), notification_data=notification_data_object)
+			notificationLogger.info('Session notification %s for %d students: %s' % ('queued' if fan_out['queued'] else 'created', fan_out['count'], student_enrolls))
 
 
 	def querysets_to_values(self, queryset , key):
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, Q
+
+from account.models import CustomUser
+from recruitment.eligibility import YEAR_BITS, masks_with_year
+from student.models import Student
+
+from functools import reduce
+import logging, operator
+
+notificationLogger = logging.getLogger('notification')
+
+def get_broadcast_counts(**filters):
+	'''
+	{user pk: number of broadcasts} addressed to each current student, in one grouped query (the conditions of
+	BroadcastNotificationManager.for_user, for every student at once). `filters` further narrow the broadcasts.
+	'''
+	# A student in year `year` was in year - lag when a broadcast `lag` promotions old was sent
+	at_send_time = [Q(current_year=str(year), college__broadcasts__promotions=F('college__promotions') - lag, college__broadcasts__cohorts__years_mask__in=masks_with_year(year - lag))
+					for year in range(1, len(YEAR_BITS) + 1) for lag in range(year)]
+	students = Student.studying.filter(
+		Q(college__broadcasts__cohorts__stream__isnull=True) | Q(college__broadcasts__cohorts__stream=F('stream')),
+		reduce(operator.or_, at_send_time, Q(college__broadcasts__cohorts__years_mask=0)),
+		college__broadcasts__creation_time__gte=F('profile__date_joined'),
+		**filters
+	)
+	return dict(students.order_by().values('profile').annotate(broadcasts=Count('college__broadcasts', distinct=True)).values_list('profile', 'broadcasts'))
+
+class Command(BaseCommand):
+	help = 'Recounts unread notifications (direct and broadcast) and repairs the cached badge counters that drifted'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--dry-run', action='store_true', help='Only report the counters that drifted')
+
+	def handle(self, *args, **options):
+		direct = dict(CustomUser.objects.filter(notification_target__is_read=False).annotate(unread=Count('notification_target')).values_list('pk', 'unread'))
+		addressed = get_broadcast_counts()
+		read = get_broadcast_counts(college__broadcasts__reads__user=F('profile'))
+		broadcast = dict((pk, count - read.get(pk, 0)) for pk, count in addressed.items())
+		repaired = 0
+		for pk, cached in CustomUser.objects.values_list('pk', 'unread_notifications').iterator():
+			actual = direct.get(pk, 0) + broadcast.get(pk, 0)
+			if actual != cached:
+				repaired += 1
+				self.stdout.write('%d: %d -> %d' % (pk, cached, actual))
+				if not options['dry_run']:
+					CustomUser.objects.filter(pk=pk).update(unread_notifications=actual)
+		notificationLogger.info('Unread counters reconciled; %d %s' % (repaired, 'drifted' if options['dry_run'] else 'repaired'))
+		self.stdout.write('%d counters %s' % (repaired, 'drifted' if options['dry_run'] else 'repaired'))
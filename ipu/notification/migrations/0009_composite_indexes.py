@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('college', '0003_auto_20170801_0023'),
+        ('notification', '0008_broadcastnotification'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='notification',
+            index_together=set([('target', 'creation_time'), ('target', 'is_read')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='issue',
+            index_together=set([('college', 'marked', 'creation_time')]),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('college', '0004_college_promotions'),
+        ('notification', '0009_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='broadcastnotification',
+            name='promotions',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -1,9 +1,16 @@
 from django.db import models
+from django.db.models import F, Q
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from account.models import CustomUser
 from django.utils.translation import ugettext_lazy as _
 from faculty.models import Faculty
 from student.models import Student
-from college.models import College
+from college.models import College, Stream
+from recruitment.eligibility import masks_with_year
+
+from functools import reduce
+import operator
 # Create your models here.
 
 class NotificationData(models.Model):
@@ -20,11 +27,81 @@ class Notification(models.Model):
 	notification_data = models.ForeignKey(NotificationData , related_name = "notification_data" , blank = True , null = True)
 	message = models.CharField(_('Message') , max_length = 512 , blank = True)
 	creation_time = models.DateTimeField(auto_now=False, auto_now_add=True)
+	is_broadcast = False
 	def __str__(self):
 		return (" To " + self.target.username + "  From  " + self.actor.username)
 
 	class Meta:
 		verbose_name_plural = _("Notifications")
+		index_together = [['target', 'creation_time'], ['target', 'is_read']] # Feed, unread
+
+@receiver(post_save, sender=Notification)
+def count_unread_notification(sender, instance, created, **kwargs):
+	# Notifications created one at a time; bulk fan-out counts in notification.tasks.create_notifications
+	if created and not instance.is_read:
+		CustomUser.objects.filter(pk=instance.target_id).update(unread_notifications=F('unread_notifications') + 1)
+
+
+class BroadcastNotificationManager(models.Manager):
+	def for_user(self, user):
+		'''
+		Broadcasts addressed to a cohort the student was in when it was sent, created after they joined.
+		A broadcast records how many times its college had been promoted (College.promotions) when it was sent,
+		so the student's year then is their current year less the promotions since. Only current students are
+		addressed by cohorts.
+		'''
+		if user.type != 'S':
+			return self.none()
+		try:
+			student = user.student
+		except Student.DoesNotExist:
+			return self.none()
+		if student.has_graduated:
+			return self.none()
+		promotions, year = student.college.promotions, int(student.current_year)
+		# Sent `lag` promotions ago, to the year the student was in then
+		at_send_time = [Q(broadcast__promotions=promotions - lag, years_mask__in=masks_with_year(year - lag)) for lag in range(min(year, promotions + 1))]
+		cohorts = BroadcastCohort.objects.filter(
+			Q(stream__isnull=True) | Q(stream=student.stream_id),
+			reduce(operator.or_, at_send_time, Q(years_mask=0))
+		)
+		return self.filter(college=student.college_id, creation_time__gte=user.date_joined, pk__in=cohorts.values('broadcast'))
+
+	def unread_for(self, user):
+		return self.for_user(user).exclude(reads__user=user)
+
+class BroadcastNotification(models.Model):
+	''' Stored once for a cohort of students and merged into their feeds at read time; see notification.utils '''
+	actor = models.ForeignKey(CustomUser, related_name="broadcasts_sent")
+	college = models.ForeignKey(College, related_name="broadcasts")
+	notification_data = models.ForeignKey(NotificationData, related_name="broadcasts", blank=True, null=True)
+	message = models.CharField(_('Message'), max_length=512, blank=True)
+	creation_time = models.DateTimeField(auto_now_add=True)
+	promotions = models.PositiveIntegerField(default=0) # The college's College.promotions when sent
+	is_broadcast = True
+
+	objects = BroadcastNotificationManager()
+
+	def __str__(self):
+		return ("To %s From %s" % (self.college, self.actor.username))
+
+	class Meta:
+		index_together = [['college', 'creation_time']]
+
+class BroadcastCohort(models.Model):
+	''' Students of the broadcast's college in `stream` (any, if null) and in the years of `years_mask` (any, if 0) '''
+	broadcast = models.ForeignKey(BroadcastNotification, related_name="cohorts")
+	stream = models.ForeignKey(Stream, related_name="+", blank=True, null=True)
+	years_mask = models.PositiveSmallIntegerField(default=0)
+
+class BroadcastRead(models.Model):
+	''' Read marker; only exists for the users who have seen the broadcast '''
+	broadcast = models.ForeignKey(BroadcastNotification, related_name="reads")
+	user = models.ForeignKey(CustomUser, related_name="broadcasts_read")
+	read_on = models.DateTimeField(auto_now_add=True)
+
+	class Meta:
+		unique_together = ['broadcast', 'user']
 
 
 class Issue(models.Model):
@@ -47,6 +124,9 @@ class Issue(models.Model):
 	def __str__(self):
 		return ("By " + self.actor.profile.username)
 
+	class Meta:
+		index_together = [['college', 'marked', 'creation_time']]
+
 
 class IssueReply(models.Model):
 	root_issue = models.OneToOneField(Issue , related_name = "issue_reply")
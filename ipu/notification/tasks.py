@@ -0,0 +1,39 @@
+from celery.decorators import task
+from celery.utils.log import get_task_logger
+
+from django.conf import settings
+
+from notification.models import Notification
+from notification.utils import increment_unread
+
+logger = get_task_logger(__name__)
+
+# Always pass in pks and not model objects
+# Because celery needs to serialize the arguments for a task
+
+def create_notifications(actor_pk, target_pks, message='', notification_data_pk=None):
+	''' One Notification per target (CustomUser pk), inserted in batches of NOTIFICATION_FANOUT_BATCH_SIZE '''
+	Notification.objects.bulk_create(
+		[Notification(actor_id=actor_pk, target_id=pk, message=message, notification_data_id=notification_data_pk) for pk in target_pks],
+		batch_size=settings.NOTIFICATION_FANOUT_BATCH_SIZE
+	)
+	increment_unread(target_pks) # bulk_create sends no post_save
+	return len(target_pks)
+
+@task(name='create_notifications_task')
+def create_notifications_task(actor_pk, target_pks, message='', notification_data_pk=None):
+	count = create_notifications(actor_pk, target_pks, message, notification_data_pk)
+	logger.info('%d notifications created [Actor: %d]' % (count, actor_pk))
+
+def notify_users(actor, target_pks, message='', notification_data=None):
+	'''
+	Fans a notification out to target_pks (CustomUser pks, e.g. from values_list('profile__pk', flat=True)).
+	Above NOTIFICATION_FANOUT_ASYNC_THRESHOLD targets, rows are created in a celery task instead of the request.
+	Returns {'count': number of targets, 'queued': whether it was left to the task}.
+	'''
+	target_pks = list(target_pks)
+	notification_data_pk = notification_data.pk if notification_data else None
+	if len(target_pks) > settings.NOTIFICATION_FANOUT_ASYNC_THRESHOLD:
+		create_notifications_task.delay(actor.pk, target_pks, message, notification_data_pk)
+		return {'count': len(target_pks), 'queued': True}
+	return {'count': create_notifications(actor.pk, target_pks, message, notification_data_pk), 'queued': False}
@@ -1,5 +1,5 @@
 from django.conf.urls import url, include
-from .views import get_notifications , select_streams , create_notification , submit_issue , select_years , solve_issue , display_issue , display_solution, display_solution_list , mark_issue , notification_detail , truncated_notifications
+from .views import get_notifications , select_streams , create_notification , submit_issue , select_years , solve_issue , display_issue , display_solution, display_solution_list , mark_issue , notification_detail , truncated_notifications , unread_notifications
 
 urlpatterns = [
 	url(r'^get_notifications/$', get_notifications, name='get_notifications'),
@@ -14,4 +14,5 @@ urlpatterns = [
 	url(r'^view_solution/$' , display_solution , name = 'view_solution'),
 	url(r'^notification_detail/$' , notification_detail , name = 'notification_detail'),
 	url(r'^shorten/$', truncated_notifications, name='shortened_notifications'),
+	url(r'^unread/$', unread_notifications, name='unread_notifications'),
 ]
\ No newline at end of file
@@ -0,0 +1,107 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.utils.timezone import utc
+
+from account.models import CustomUser
+from notification.models import Notification, BroadcastNotification, BroadcastCohort, BroadcastRead
+from recruitment.eligibility import years_to_mask, mask_to_years
+from student.models import Student
+
+from functools import reduce
+import datetime, operator
+
+def increment_unread(user_pks):
+	''' `user_pks` may be a list or a values() queryset of CustomUser pks; one UPDATE either way '''
+	CustomUser.objects.filter(pk__in=user_pks).update(unread_notifications=F('unread_notifications') + 1)
+
+def decrement_unread(user, count):
+	if count:
+		CustomUser.objects.filter(pk=user.pk).update(unread_notifications=Greatest(F('unread_notifications') - count, 0))
+
+def create_broadcast(actor, college, cohorts, notification_data=None, message=''):
+	''' `cohorts` is [(stream pk, [years])]; a cohort without years is skipped, as it would address every year '''
+	cohorts = [(stream_pk, years_to_mask(','.join(years))) for stream_pk, years in cohorts]
+	cohorts = [(stream_pk, mask) for stream_pk, mask in cohorts if mask]
+	if not cohorts:
+		return None
+	broadcast = BroadcastNotification.objects.create(actor=actor, college=college, promotions=college.promotions, notification_data=notification_data, message=message)
+	BroadcastCohort.objects.bulk_create([BroadcastCohort(broadcast=broadcast, stream_id=stream_pk, years_mask=mask) for stream_pk, mask in cohorts])
+	increment_unread(get_cohort_students(college, [(stream_pk, mask_to_years(mask)) for stream_pk, mask in cohorts]).values('profile'))
+	return broadcast
+
+def get_cohort_students(college, cohorts):
+	''' Current students of the college in the cohorts, [(stream pk, [years])] as for create_broadcast '''
+	cohorts = [(stream_pk, years) for stream_pk, years in cohorts if years]
+	if not cohorts:
+		return Student.studying.none()
+	return Student.studying.filter(reduce(operator.or_, [Q(stream=stream_pk, current_year__in=years) for stream_pk, years in cohorts]), college=college)
+
+FEED_RELATED = ['notification_data', 'actor', 'actor__college', 'actor__faculty__college', 'actor__company'] # For get_notification_actor_name
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=utc)
+
+def get_feed_key(item):
+	# Feed order (descending): creation time, then broadcasts before direct notifications, then pk
+	return (item.creation_time, item.is_broadcast, item.pk)
+
+def encode_feed_cursor(item):
+	creation_time, is_broadcast, pk = get_feed_key(item)
+	delta = creation_time - EPOCH
+	return '%d.%d.%d' % ((delta.days * 86400 + delta.seconds) * 10**6 + delta.microseconds, is_broadcast, pk)
+
+def decode_feed_cursor(cursor):
+	''' Inverse of encode_feed_cursor; raises ValueError for a malformed cursor '''
+	microseconds, is_broadcast, pk = [int(part) for part in cursor.split('.')]
+	return (EPOCH + datetime.timedelta(microseconds=microseconds), bool(is_broadcast), pk)
+
+def get_older(queryset, before, is_broadcast):
+	''' Items of `queryset` (all direct or all broadcasts) that come after the cursor `before` in the feed '''
+	creation_time, cursor_is_broadcast, pk = before
+	if is_broadcast == cursor_is_broadcast:
+		return queryset.filter(Q(creation_time__lt=creation_time) | Q(creation_time=creation_time, pk__lt=pk))
+	if is_broadcast: # Broadcasts at the cursor's time were listed before the cursor
+		return queryset.filter(creation_time__lt=creation_time)
+	return queryset.filter(creation_time__lte=creation_time)
+
+def get_feed(user, limit=None, before=None):
+	'''
+	Direct notifications and broadcasts addressed to the user's cohort, newest first, after the cursor `before`.
+	Broadcasts get `is_read` from the user's read markers; use `is_broadcast` to tell them apart.
+	'''
+	direct = user.notification_target.select_related(*FEED_RELATED).order_by('-creation_time', '-pk')
+	broadcasts = BroadcastNotification.objects.for_user(user).select_related(*FEED_RELATED).order_by('-creation_time', '-pk')
+	if before:
+		direct, broadcasts = get_older(direct, before, False), get_older(broadcasts, before, True)
+	direct, broadcasts = list(direct[:limit]), list(broadcasts[:limit])
+	read = set(BroadcastRead.objects.filter(user=user, broadcast__in=broadcasts).values_list('broadcast', flat=True))
+	for broadcast in broadcasts:
+		broadcast.is_read = broadcast.pk in read
+	return sorted(direct + broadcasts, key=get_feed_key, reverse=True)[:limit]
+
+def get_feed_page(user, page_size, before=None):
+	''' (items, cursor of the next page or None) '''
+	items = get_feed(user, page_size + 1, before)
+	if len(items) > page_size:
+		return items[:page_size], encode_feed_cursor(items[page_size - 1])
+	return items, None
+
+def mark_feed_read(user, items):
+	''' Marks feed items read; one UPDATE for direct notifications, one INSERT for broadcast read markers '''
+	marked = 0
+	direct_pks = [n.pk for n in items if not n.is_broadcast and not n.is_read]
+	if direct_pks:
+		marked += Notification.objects.filter(pk__in=direct_pks, is_read=False).update(is_read=True)
+	unread_broadcasts = [n for n in items if n.is_broadcast and not n.is_read]
+	if unread_broadcasts:
+		try:
+			with transaction.atomic():
+				BroadcastRead.objects.bulk_create([BroadcastRead(broadcast=b, user=user) for b in unread_broadcasts])
+			marked += len(unread_broadcasts)
+		except IntegrityError: # Marked read concurrently (another tab)
+			for b in unread_broadcasts:
+				marked += BroadcastRead.objects.get_or_create(broadcast=b, user=user)[1]
+	decrement_unread(user, marked)
+
+def get_unread_count(user):
+	''' The cached counter; `manage.py reconcileunread` repairs it if it drifts '''
+	return user.unread_notifications
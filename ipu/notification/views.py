@@ -6,14 +6,16 @@ from django.views.decorators.http import require_GET, require_POST, require_http
 from django.template import Context, Template
 from django.core.exceptions import PermissionDenied
 from .forms import SelectStreamsForm , CreateNotificationForm , IssueForm , IssueReplyForm , ReportBugForm
-from .models import NotificationData , Notification , Issue , IssueReply
+from .models import NotificationData , Notification , Issue , IssueReply , BroadcastNotification , BroadcastCohort
+from .utils import get_feed , get_feed_page , decode_feed_cursor , mark_feed_read , create_broadcast , get_cohort_students , get_unread_count
 from account.models import CustomUser
 from account.decorators import check_recaptcha
 from account.tasks import send_mass_mail_task , send_mass_sms_task
+from notification.tasks import notify_users
 from faculty.models import Faculty
 from student.models import Student
 from college.models import College , Stream
-from django.core import serializers
+from college.utils import get_reference_data , get_stream
 from recruitment.models import PlacementSession
 from django.contrib.auth.decorators import login_required
 from hashids import Hashids
@@ -24,6 +26,8 @@ import logging
 
 notificationLogger = logging.getLogger('notification')
 
+BROADCAST_IDENTIFIER_PREFIX = 'b-'
+
 #notificationLogger.info('%s created a notification for %s' % (faculty.username, ','.join(list_student_usernames))
 #send_mass_mail_task.delay(Subject, message, [reciever_pks])
 #from recruitment.forms import SessionInfoForm
@@ -54,8 +58,11 @@ def select_streams(request):
 			streams_selected = request.POST.getlist('stream_list[]')
 			indices = request.POST.getlist('indices[]')						
 			programme_to_year_list = list()
+			reference = get_reference_data()
 			for stream in streams_selected:
-				stream_object = get_object_or_404(Stream , code = stream)
+				stream_object = reference.streams_by_code.get(stream)
+				if not stream_object:
+					raise Http404
 				if stream_object:	
 					full_name = stream_object
 					#above stores a string like [128] B.Tech. (Dual Degree) - Electronics and Communication
@@ -99,11 +106,11 @@ def select_years(request):
 		
 		for idx , stream in enumerate(stream_codes):
 			try:
-				stream_object = Stream.objects.get(code = stream)
-			except:
+				stream_object = get_stream(stream)
+			except Stream.DoesNotExist:
 				return JsonResponse(status = 400 , data = {"error" : "Please select the stream again."})
 			# Only currently studying students should be shown
-			student_objects = college.students(manager='studying').filter(stream = stream_object , current_year__in = years_selected[idx]).values('profile' , 'profile__username' )
+			student_objects = college.students(manager='studying').filter(stream = stream_object.pk , current_year__in = years_selected[idx]).values('profile' , 'profile__username' )
 			students_of_streams.append(student_objects)
 		
 		students_of_streams = list(itertools.chain.from_iterable(students_of_streams))
@@ -160,7 +167,7 @@ def create_notification(request):
 			student_enrolls = querysets_to_values(student_objects.values('profile__username') , 'profile__username')
 			student_phone_numbers = querysets_to_values(student_objects.values('phone_number') , 'phone_number')
 			#following statement is getting customuser-pks.
-			student_pks = querysets_to_values(student_objects.values('profile__pk') , 'profile__pk')
+			student_pks = list(student_objects.values_list('profile__pk', flat=True))
 			if if_email:
 				send_mass_mail_task.delay(subject , message , student_pks)
 				if request.user.type == 'F':
@@ -178,24 +185,26 @@ def create_notification(request):
 				notificationLogger.info('%s created a notification for %s' % (faculty_object, student_enrolls))
 			else:
 				notificationLogger.info('%s created a notification for %s' % (college_object, student_enrolls))
-			for student_object in student_objects:
-				student_customeuser_object = student_object.profile
-				notification_object = Notification.objects.create(actor = college_customuser_object, target = student_customeuser_object , notification_data = notification_data_object)
-				notification_object.save()
+			broadcast = None
+			cohorts = get_cohorts(request.POST.get('stream_to_year'))
+			# Stored once for the cohorts instead of per student, but only when the students selected are exactly the cohorts' students
+			if cohorts and set(get_cohort_students(college_object , cohorts).values_list('profile' , flat = True)) == set(student_pks):
+				broadcast = create_broadcast(college_customuser_object , college_object , cohorts , notification_data = notification_data_object)
+			if broadcast is not None:
+				fan_out = {'count': len(student_pks), 'queued': False}
+				notificationLogger.info('Broadcast[%d] for %d students' % (broadcast.pk , fan_out['count']))
+			else:
+				fan_out = notify_users(college_customuser_object, student_pks, notification_data=notification_data_object)
+				notificationLogger.info('%d notifications %s' % (fan_out['count'], 'queued' if fan_out['queued'] else 'created'))
 			
 			#sending(cc) it to all the faculties as well.
-			faculty_pks = querysets_to_values(faculties.values('profile__pk') , 'profile__pk')
+			faculty_pks = list(faculties.values_list('profile__pk', flat=True))
 			cc_added_subject = add_cc(subject , 255 , sender_name)
 			cc_added_sms = add_cc(sms_message , 159 , sender_name)
 			cc_notification_data_object = NotificationData.objects.create(subject = cc_added_subject , message = message , sms_message = cc_added_sms)
-			for faculty in faculties:
-				faculty_customuser_object = faculty.profile
-				notification_object = Notification.objects.create(actor = college_customuser_object, target = faculty_customuser_object , notification_data = cc_notification_data_object)
-				notification_object.save()
+			notify_users(college_customuser_object, faculty_pks, notification_data=cc_notification_data_object)
 			if request.user.type == 'F':
-				faculty_customuser_object = faculty_object.profile
-				notification_object = Notification.objects.create(actor = faculty_customuser_object, target = college_customuser_object , notification_data = cc_notification_data_object)
-				notification_object.save()
+				Notification.objects.create(actor = request.user, target = college_customuser_object , notification_data = cc_notification_data_object)
 				#add email of college admin to send email if faculty initiated notification.
 				faculty_pks.append(college_object.profile.pk)
 			#sending mail and sms to faculties
@@ -209,7 +218,7 @@ def create_notification(request):
 				notificationLogger.info('sent CC-SMS Message to faculties')
 			
 			notificationLogger.info('Winded up faculty. Done all notifications. Bye.') 	
-			return HttpResponse(len(students_selected))
+			return HttpResponse(fan_out['count'])
 		else:
 			raise PermissionDenied
  			
@@ -221,7 +230,7 @@ def create_notification(request):
 def truncated_notifications(request):
 	user = request.user
 	data_list = list()
-	notification_object_queryset = Notification.objects.filter(target = user).order_by('-creation_time')[:5]
+	notification_object_queryset = get_feed(user , limit = 5)
 	for notification_object in notification_object_queryset:
 		data_dict = dict()
 		if notification_object.notification_data is not None:
@@ -241,21 +250,26 @@ def truncated_notifications(request):
 @login_required
 @require_http_methods(['GET','POST'])
 def get_notifications(request):
+	'''
+	A page of the feed, newest first. 'next' is the cursor to pass as ?before= for the older page (null on the last page).
+	Only the page returned is marked read.
+	'''
 	user = request.user
 	data_list = list()
-	notification_object_queryset = user.notification_target.all().order_by('-creation_time')
-	notifications = serializers.serialize("json", notification_object_queryset, indent = 4)
+	try:
+		before = decode_feed_cursor(request.GET['before']) if request.GET.get('before') else None
+	except ValueError:
+		return JsonResponse(status = 400 , data = {'error' : 'Invalid cursor.'})
+	notification_object_queryset , next_cursor = get_feed_page(user , settings.NOTIFICATIONS_PAGE_SIZE , before)
+	mark_feed_read(user , notification_object_queryset)
 	for notification_object in notification_object_queryset:
 		data_dict = dict()
 		data_dict['read'] = notification_object.is_read
-		if notification_object.is_read == False:
-			notification_object.is_read = True
-			notification_object.save()
 		if notification_object.notification_data is not None:
 			data = notification_object.notification_data
 			subject = data.subject
 			message = data.message
-			data_dict['identifier'] = notification_pk_encoder(notification_object.pk)
+			data_dict['identifier'] = notification_identifier(notification_object)
 			data_dict['subject'] = subject
 			data_dict['if_ping'] = False
 		else:
@@ -263,14 +277,27 @@ def get_notifications(request):
 			data_dict['if_ping'] = True
 		data_dict['actor'] = str(get_notification_actor_name(notification_object))
 		data_list.append(data_dict)
-	return JsonResponse(data_list , safe = False)
+	return JsonResponse({'notifications' : data_list , 'next' : next_cursor})
+
+@require_GET
+@login_required
+def unread_notifications(request):
+	# Badge poll; the counter is on the user row that's already loaded for the request
+	unread = get_unread_count(request.user)
+	if request.user.type == 'F': # Faculty's badge includes college's notifications (see faculty_home)
+		unread += get_unread_count(request.user.faculty.college.profile)
+	return JsonResponse({'unread' : unread})
 
 @require_GET
 @login_required
 def notification_detail(request):
 	user = request.user
 	identifier = request.GET.get('identifier' , None)
-	notification_object = notification_pk_decoder(identifier)
+	if identifier and identifier.startswith(BROADCAST_IDENTIFIER_PREFIX):
+		# Only broadcasts addressed to the user's cohort
+		notification_object = notification_pk_decoder(identifier[len(BROADCAST_IDENTIFIER_PREFIX):] , BroadcastNotification.objects.for_user(user))
+	else:
+		notification_object = notification_pk_decoder(identifier)
 	data_dict = dict()
 	if notification_object.notification_data is not None:
 		data = notification_object.notification_data
@@ -568,16 +595,22 @@ def notification_pk_encoder(pk):
 	pk_id = hashids.encode(pk_id)
 	return pk_id
 
-def notification_pk_decoder(identifier):
+def notification_pk_decoder(identifier , queryset = Notification):
 	hashids = Hashids("MysteryTomato")
 	pk_tuple = hashids.decode(identifier)
 	pk_list = list(pk_tuple)		
 	possible_pk = pk_list[0]/5754853343
 	if not possible_pk.is_integer():
 		raise Http404
-	notification_object = get_object_or_404(Notification , pk = possible_pk)
+	notification_object = get_object_or_404(queryset , pk = possible_pk)
 	return notification_object		
 
+def notification_identifier(notification_object):
+	# Broadcasts have their own pks; prefixed with a character that hashids never outputs
+	if notification_object.is_broadcast:
+		return BROADCAST_IDENTIFIER_PREFIX + notification_pk_encoder(notification_object.pk)
+	return notification_pk_encoder(notification_object.pk)
+
 
 def clean_string(message , length = 20):
 	
@@ -602,6 +635,15 @@ def add_cc(message , length , sender):
 		return result[:length]
 
 
+def get_cohorts(stream_to_year):
+	# '{"<stream code>": ["1", "2"]}' (as posted to select_years) -> [(stream pk, ['1', '2'])]
+	try:
+		stream_to_year = json.loads(stream_to_year)
+		codes = get_reference_data().streams_by_code
+		return [(codes[code].pk , [str(y) for y in years]) for code , years in stream_to_year.items() if code in codes]
+	except (TypeError , ValueError , AttributeError):
+		return []
+
 def querysets_to_values(queryset , key):
 	result_list = list()
 	for modal_instance in queryset:
@@ -0,0 +1,74 @@
+from array import array
+
+QUALIFICATION_FIELDS = ['tenth', 'twelfth', 'graduation', 'post_graduation', 'doctorate']
+STUDENT_COLUMNS = ['pk', 'current_year', 'is_sub_back'] + ['qualifications__%s' % f for f in QUALIFICATION_FIELDS]
+CRITERIA_COLUMNS = ['pk', 'years_mask', 'is_sub_back'] + QUALIFICATION_FIELDS
+YEAR_BITS = dict((str(y), 1 << (y - 1)) for y in range(1, 7)) # '1' -> 0b1, ..., '6' -> 0b100000
+
+def years_to_mask(years):
+	''' '1,3' -> 0b101 '''
+	return sum(YEAR_BITS[y] for y in set(years.split(',')) if y in YEAR_BITS)
+
+def mask_to_years(mask):
+	''' 0b101 -> ['1', '3'] '''
+	return [y for y in sorted(YEAR_BITS) if mask & YEAR_BITS[y]]
+
+def masks_with_year(year):
+	''' Every mask including the year, for filtering a mask column with __in '''
+	bit = YEAR_BITS.get(str(year), 0)
+	return [m for m in range(1, 1 << len(YEAR_BITS)) if m & bit]
+
+class EligibilityMatrix(object):
+	'''
+	Eligibility of a cohort of students against a set of SelectionCriteria, evaluated column-wise.
+	Rows are tuples in the order of STUDENT_COLUMNS/CRITERIA_COLUMNS (as returned by values_list).
+	Semantics follow SelectionCriteria.check_eligibility: a student without qualifications is
+	neither eligible nor ineligible (None), and an empty score never disqualifies.
+	'''
+	def __init__(self, criteria_rows, student_rows):
+		self.student_pks = array('l')
+		self.scores = dict((f, array('d')) for f in QUALIFICATION_FIELDS)
+		self.unqualified = set()
+		self.buckets = {} # (current_year, is_sub_back) -> student indices
+		for i, row in enumerate(student_rows):
+			pk, year, is_sub_back = row[:3]
+			self.student_pks.append(pk)
+			for f, value in zip(QUALIFICATION_FIELDS, row[3:]):
+				self.scores[f].append(float(value) if value else 0.0)
+			if row[3] is None: # tenth is never null when Qualification exists
+				self.unqualified.add(pk)
+			else:
+				self.buckets.setdefault((year, bool(is_sub_back)), []).append(i)
+		self.eligible = {}
+		evaluated = {} # Criteria are get_or_create'd, but identical rows may still exist
+		for row in criteria_rows:
+			key = tuple(row[1:])
+			if key not in evaluated:
+				evaluated[key] = self._evaluate(*key)
+			self.eligible[row[0]] = evaluated[key]
+
+	def _evaluate(self, years_mask, is_sub_back, *thresholds):
+		indices = []
+		for (year, sub_back), bucket in self.buckets.items():
+			if years_mask & YEAR_BITS.get(year, 0) and (is_sub_back or not sub_back):
+				indices.extend(bucket)
+		for f, threshold in zip(QUALIFICATION_FIELDS, thresholds):
+			if threshold:
+				column, threshold = self.scores[f], int(threshold)
+				indices = [i for i in indices if not column[i] or column[i] >= threshold]
+		return frozenset(self.student_pks[i] for i in indices)
+
+	def is_eligible(self, criterion_pk, student_pk):
+		if student_pk in self.unqualified:
+			return None
+		return student_pk in self.eligible.get(criterion_pk, ())
+
+	def eligible_students(self, criterion_pk):
+		return self.eligible.get(criterion_pk, frozenset())
+
+	def possibly_eligible_students(self, criterion_pk):
+		''' Those not ineligible, i.e. eligible or without qualifications; the students listings show an opening to '''
+		return self.eligible_students(criterion_pk) | self.unqualified
+
+	def eligible_criteria(self, student_pk):
+		return set(c for c, students in self.eligible.items() if student_pk in students)
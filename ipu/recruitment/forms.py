@@ -8,6 +8,7 @@ from account.tasks import send_mass_mail_task
 from college.models import College, Programme, Stream
 from company.models import Company
 from notification.models import Notification
+from notification.tasks import notify_users
 from recruitment.fields import ModelHashidChoiceField, ModelMultipleHashidChoiceField
 from recruitment.models import Association, PlacementSession, Dissociation, SelectionCriteria
 from student.models import Student
@@ -350,9 +351,9 @@ class EditSessionForm(forms.ModelForm):
 			message += "You have grabbed the internship at %s. " % (association.company.name.title())
 		students = self.instance.students.all() # Not using 'studying' manager
 		student_usernames = ','.join([s['profile__username'] for s in students.values('profile__username')])
-		for student in students:
-			Notification.objects.create(actor=actor, target=student.profile, message=message)
-		send_mass_mail_task.delay("Congratulations!", message, [s['profile__pk'] for s in students.values('profile__pk')])
+		customuser_pks = list(students.values_list('profile__pk', flat=True))
+		notify_users(actor, customuser_pks, message=message)
+		send_mass_mail_task.delay("Congratulations!", message, customuser_pks)
 		# Log
 		recruitmentLogger.info('%s - Students selected %s - [S: %d]' % (actor.username, student_usernames, self.instance.pk))
 		# # #
@@ -389,14 +390,13 @@ class ManageSessionStudentsForm(forms.ModelForm):
 		message = "Sorry, your involvement in the placement session with %s was till here only!\
 					\nThanks for showing your interest.\
 					\nBest of luck for your future endeavours." % (self.instance.association.company.name)
-		for student in disqualified:
-			Notification.objects.create(actor=actor, target=student.profile, message=message)
+		disqualified_user_pks = list(disqualified.values_list('profile__pk', flat=True))
+		notify_users(actor, disqualified_user_pks, message=message)
 		
 		# send mass email
 		association = self.instance.association
 		subject = '%s session with %s' % ('Internship' if association.type == 'I' else 'Job', association.company.name)
 		
-		disqualified_user_pks = [u['profile__pk'] for u in disqualified.values('profile__pk')]
 		send_mass_mail_task.delay(subject, message, disqualified_user_pks)
 #		send_mass_mail_task.delay(subject, message, list(disqualified_pks))
 
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from recruitment.eligibility import EligibilityMatrix, years_to_mask
+from recruitment.models import SelectionCriteria
+
+from decimal import Decimal
+import random, time
+
+class Command(BaseCommand):
+	help = 'Benchmarks batch eligibility (EligibilityMatrix) on synthetic students and criteria; no database access'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--students', type=int, default=10000, dest='students')
+		parser.add_argument('--criteria', type=int, default=200, dest='criteria')
+		parser.add_argument('--seed', type=int, default=0, dest='seed')
+
+	def handle(self, *args, **options):
+		rand = random.Random(options['seed'])
+		score = lambda: Decimal('%.2f' % rand.uniform(45, 99))
+		students = []
+		for pk in range(1, options['students'] + 1):
+			if rand.random() < 0.02: # No qualifications yet
+				students.append((pk, str(rand.randint(1, 4)), rand.random() < 0.1, None, None, None, None, None))
+			else:
+				students.append((pk, str(rand.randint(1, 4)), rand.random() < 0.1, score(), score(), score(), score() if rand.random() < 0.2 else None, None))
+		school = [c[0] for c in SelectionCriteria.SCHOOL_PERCENTAGE_CHOICES] + ['']
+		college = [c[0] for c in SelectionCriteria.COLLEGE_PERCENTAGE_CHOICES] + ['']
+		criteria = []
+		for pk in range(1, options['criteria'] + 1):
+			years = ','.join(sorted(rand.sample(['1', '2', '3', '4'], rand.randint(1, 4))))
+			criteria.append((pk, years_to_mask(years), rand.random() < 0.5, rand.choice(school), rand.choice(school), rand.choice(college), rand.choice(college), ''))
+
+		start = time.time()
+		matrix = EligibilityMatrix(criteria, students)
+		elapsed = time.time() - start
+		pairs = sum(len(matrix.eligible_students(c[0])) for c in criteria)
+		self.stdout.write('%d students x %d criteria: %.3fs (%d eligible pairs)' % (len(students), len(criteria), elapsed, pairs))
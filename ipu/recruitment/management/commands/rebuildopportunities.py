@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from recruitment.models import OpenOpportunity
+
+import logging
+
+recruitmentLogger = logging.getLogger('recruitment')
+
+class Command(BaseCommand):
+	help = 'Rebuilds the open opportunities index used for listing sessions to students; drops expired rows'
+
+	def handle(self, *args, **options):
+		OpenOpportunity.objects.rebuild()
+		count = OpenOpportunity.objects.count()
+		recruitmentLogger.info('Opportunity index rebuilt with %d rows' % count)
+		self.stdout.write('Opportunity index rebuilt with %d rows' % count)
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import datetime
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_index(apps, schema_editor):
+    OpenOpportunity = apps.get_model('recruitment', 'OpenOpportunity')
+    PlacementSession = apps.get_model('recruitment', 'PlacementSession')
+    DummySession = apps.get_model('dummy_company', 'DummySession')
+    today = datetime.date.today()
+    rows = []
+    for session in PlacementSession.objects.filter(association__approved=True, ended=False, application_deadline__gte=today).select_related('association', 'selection_criteria'):
+        association = session.association
+        for stream in association.streams.values_list('pk', flat=True):
+            for year in [y for y in session.selection_criteria.years.split(',') if y]:
+                rows.append(OpenOpportunity(college_id=association.college_id, stream_id=stream, year=year, type=association.type, salary=association.salary, application_deadline=session.application_deadline, session=session))
+    for dsession in DummySession.objects.filter(ended=False, application_deadline__gte=today).select_related('dummy_company', 'selection_criteria'):
+        for stream in dsession.streams.values_list('pk', flat=True):
+            for year in [y for y in dsession.selection_criteria.years.split(',') if y]:
+                rows.append(OpenOpportunity(college_id=dsession.dummy_company.college_id, stream_id=stream, year=year, type=dsession.type, salary=dsession.salary, application_deadline=dsession.application_deadline, dummy_session=dsession))
+    OpenOpportunity.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('college', '0003_auto_20170801_0023'),
+        ('dummy_company', '0003_auto_20170802_2227'),
+        ('recruitment', '0011_auto_20170802_2227'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpenOpportunity',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.CharField(max_length=1)),
+                ('type', models.CharField(choices=[('I', 'Internship'), ('J', 'Job')], max_length=1)),
+                ('salary', models.DecimalField(decimal_places=2, default=0, max_digits=4)),
+                ('application_deadline', models.DateField()),
+                ('college', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='open_opportunities', to='college.College')),
+                ('dummy_session', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='opportunities', to='dummy_company.DummySession')),
+                ('session', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='opportunities', to='recruitment.PlacementSession')),
+                ('stream', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='open_opportunities', to='college.Stream')),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='openopportunity',
+            index_together=set([('college', 'stream', 'year', 'application_deadline')]),
+        ),
+        migrations.RunPython(build_index, migrations.RunPython.noop),
+    ]
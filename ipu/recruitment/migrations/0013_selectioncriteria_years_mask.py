@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+def years_to_mask(apps, schema_editor):
+    SelectionCriteria = apps.get_model('recruitment', 'SelectionCriteria')
+    for criterion in SelectionCriteria.objects.all():
+        mask = sum(1 << (int(y) - 1) for y in set(criterion.years.split(',')) if y in ['1', '2', '3', '4', '5', '6'])
+        SelectionCriteria.objects.filter(pk=criterion.pk).update(years_mask=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recruitment', '0012_openopportunity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='selectioncriteria',
+            name='years_mask',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(years_to_mask, migrations.RunPython.noop),
+    ]
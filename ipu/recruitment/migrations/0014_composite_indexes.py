@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('college', '0003_auto_20170801_0023'),
+        ('company', '0004_auto_20170801_0023'),
+        ('recruitment', '0013_selectioncriteria_years_mask'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='association',
+            index_together=set([('college', 'approved', 'type'), ('company', 'approved')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='placementsession',
+            index_together=set([('ended', 'application_deadline')]),
+        ),
+    ]
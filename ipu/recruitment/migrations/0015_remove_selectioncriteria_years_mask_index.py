@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recruitment', '0014_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='selectioncriteria',
+            name='years_mask',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+    ]
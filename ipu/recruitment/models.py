@@ -1,14 +1,17 @@
 from django.core.validators import MinValueValidator, RegexValidator
 from django.db import models
-from django.db.models.signals import post_save, m2m_changed
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.db.utils import IntegrityError
 from django.template.loader import render_to_string
+from account.models import MassMail
 from account.tasks import send_mass_mail_task
 from college.models import College, Programme, Stream
 from company.models import Company
+from ipu.cache import invalidate
 from notification.models import Notification, NotificationData
 from student.models import Student, Qualification
+from recruitment.eligibility import EligibilityMatrix, CRITERIA_COLUMNS, STUDENT_COLUMNS, years_to_mask, mask_to_years
 from django.utils.translation import ugettext_lazy as _
 
 from decimal import Decimal
@@ -47,6 +50,21 @@ class Association(models.Model):
 	def get_streams(self):
 		return ", ".join([s['name'] for s in self.streams.values('name')])
 
+	class Meta:
+		index_together = [['college', 'approved', 'type'], ['company', 'approved']]
+
+class SelectionCriteriaManager(models.Manager):
+	def eligibility(self, criteria, students):
+		'''
+		Returns an EligibilityMatrix of `criteria` (queryset or iterable of SelectionCriteria)
+		against `students` (Student queryset), using at most two queries.
+		'''
+		if isinstance(criteria, models.QuerySet):
+			criteria_rows = criteria.values_list(*CRITERIA_COLUMNS)
+		else:
+			criteria_rows = [[c.pk, years_to_mask(c.years)] + [getattr(c, f) for f in CRITERIA_COLUMNS[2:]] for c in criteria]
+		return EligibilityMatrix(criteria_rows, students.values_list(*STUDENT_COLUMNS))
+
 class SelectionCriteria(models.Model):
 	SCHOOL_PERCENTAGE_CHOICES = tuple((("%s" % i, "%s and above" % i) for i in ['60','70','75','80','85','90','95']))
 	COLLEGE_PERCENTAGE_CHOICES = tuple((("%s" % i, "%s and above" % i) for i in ['50','60','65','70','75','80','85']))
@@ -56,6 +74,7 @@ class SelectionCriteria(models.Model):
 		# UPDATE: Changing length to 30. Desperate times, need desperate measures.
 		# MAX: 1,2,3,4,5,6(w/o spaces)
 		# regex is valid for empty string as well
+	years_mask = models.PositiveSmallIntegerField(default=0, editable=False) # Bit (y-1) set for year y; derived from years on save
 	is_sub_back = models.BooleanField(_('Are student with any subject back(s) allowed'), default=False)
 	tenth = models.CharField(_('Xth Percentage'), max_length=2, blank=True, choices=SCHOOL_PERCENTAGE_CHOICES)
 	twelfth = models.CharField(_('XIIth Percentage'), max_length=2, blank=True, choices=SCHOOL_PERCENTAGE_CHOICES)
@@ -77,25 +96,19 @@ class SelectionCriteria(models.Model):
 
 	def save(self, *args, **kwargs):
 		self.full_clean()
+		self.years_mask = years_to_mask(self.years)
 		criterion = super(SelectionCriteria, self).save()
 		return criterion
 
+	objects = SelectionCriteriaManager()
+
+	def get_years(self):
+		return mask_to_years(self.years_mask)
+
 	def check_eligibility(self, student):
 		if not isinstance(student, Student):
 			return False
-		try:
-			report_card = student.qualifications
-		except Qualification.DoesNotExist:
-			return None
-		fields = ['tenth', 'twelfth', 'graduation', 'post_graduation', 'doctorate']
-		if getattr(student, 'current_year') not in getattr(self, 'years'):
-			return False
-		for f in fields:
-			if getattr(self, f) and getattr(report_card, f) and getattr(report_card, f) < int(getattr(self, f)):
-				return False
-		if not getattr(self, 'is_sub_back') and getattr(student, 'is_sub_back'):
-				return False
-		return True
+		return SelectionCriteria.objects.eligibility([self], Student.objects.filter(pk=student.pk)).is_eligible(self.pk, student.pk)
 
 class PlacementSession(models.Model):
 	association = models.OneToOneField(Association, related_name="session")
@@ -122,6 +135,9 @@ class PlacementSession(models.Model):
 	def __str__(self):
 		return self.association.company.__str__() + ' placement session at ' + self.association.college.__str__()
 
+	class Meta:
+		index_together = [['ended', 'application_deadline']]
+
 class Dissociation(models.Model):
 	''' Block '''
 	company = models.ForeignKey(Company, related_name="dissociations")
@@ -140,6 +156,68 @@ class Dissociation(models.Model):
 	class Meta:
 		unique_together = ['company', 'college', 'initiator'] # Because both A and B can block each other
 
+class OpportunityIndexManager(models.Manager):
+	def index_session(self, session):
+		''' (Re)builds rows for a PlacementSession. Only approved, running sessions are listed. '''
+		self.filter(session=session).delete()
+		association = session.association
+		if not association.approved or session.ended or not session.application_deadline:
+			return
+		years = session.selection_criteria.get_years()
+		self.bulk_create([
+			self.model(college_id=association.college_id, stream_id=stream, year=year, type=association.type, salary=association.salary,
+					   application_deadline=session.application_deadline, session=session)
+			for stream in association.streams.values_list('pk', flat=True) for year in years
+		])
+
+	def index_dsession(self, dsession):
+		''' (Re)builds rows for a DummySession. '''
+		self.filter(dummy_session=dsession).delete()
+		if dsession.ended or not dsession.application_deadline:
+			return
+		years = dsession.selection_criteria.get_years()
+		college_pk = dsession.dummy_company.college_id
+		self.bulk_create([
+			self.model(college_id=college_pk, stream_id=stream, year=year, type=dsession.type, salary=dsession.salary,
+					   application_deadline=dsession.application_deadline, dummy_session=dsession)
+			for stream in dsession.streams.values_list('pk', flat=True) for year in years
+		])
+
+	def index_criterion(self, criterion):
+		for session in criterion.sessions.select_related('association'):
+			self.index_session(session)
+		for dsession in criterion.dummy_sessions.select_related('dummy_company'):
+			self.index_dsession(dsession)
+
+	def rebuild(self):
+		from dummy_company.models import DummySession # dummy_company.models imports this module
+		self.all().delete()
+		today = datetime.date.today()
+		for session in PlacementSession.objects.filter(association__approved=True, ended=False, application_deadline__gte=today).select_related('association', 'selection_criteria'):
+			self.index_session(session)
+		for dsession in DummySession.objects.filter(ended=False, application_deadline__gte=today).select_related('dummy_company', 'selection_criteria'):
+			self.index_dsession(dsession)
+
+class OpenOpportunity(models.Model):
+	'''
+	Denormalised listing of open sessions, one row per (college, stream, year) a session is open to.
+	Kept in sync by the signals below (and in dummy_company.models), so that a student's listing
+	is a single indexed lookup. Run `manage.py rebuildopportunities` to rebuild from scratch.
+	'''
+	college = models.ForeignKey(College, related_name="open_opportunities")
+	stream = models.ForeignKey(Stream, related_name="open_opportunities")
+	year = models.CharField(max_length=1)
+	type = models.CharField(max_length=1, choices=Association.PLACEMENT_TYPE)
+	salary = models.DecimalField(max_digits=4, decimal_places=2, default=0)
+	application_deadline = models.DateField()
+	session = models.ForeignKey(PlacementSession, related_name="opportunities", null=True, blank=True)
+	dummy_session = models.ForeignKey('dummy_company.DummySession', related_name="opportunities", null=True, blank=True)
+
+	objects = OpportunityIndexManager()
+
+	class Meta:
+		index_together = [['college', 'stream', 'year', 'application_deadline']]
+
 @receiver(m2m_changed, sender=PlacementSession.students.through)
 def validating_students(sender, **kwargs):
 	session = kwargs.get('instance', None)
@@ -246,19 +324,17 @@ def notify_students_about_new_posting(sender, **kwargs):
 	association = session.association
 	subject = "New %s Posting - %s" % (dict(Association.PLACEMENT_TYPE)[association.type], association.company.name)
 	message = render_to_string('recruitment/new_posting.txt', {'association': association, 'company': association.company, 'session': session, 'deadline':session.application_deadline + datetime.timedelta(1)})
-	student_pks = []
-	customuser_pks = []
-	years = session.selection_criteria.years.split(',')
-	for stream in association.streams.all():
-		students = stream.students(manager='studying').filter(current_year__in=years) # Only currently studying students should be notified about new posting
-		student_pks += [s['pk'] for s in students.values('pk')]
-		customuser_pks += [u['profile__pk'] for u in students.values('profile__pk')]
+	years = session.selection_criteria.get_years()
+	students = Student.studying.filter(college=association.college, stream__in=association.streams.all(), current_year__in=years) # Only currently studying students should be notified about new posting
+	# As listed to students (student.views): those without qualifications yet are told too
+	not_ineligible = SelectionCriteria.objects.eligibility([session.selection_criteria], students).possibly_eligible_students(session.selection_criteria.pk)
+	customuser_pks = list(students.filter(pk__in=list(not_ineligible)).values_list('profile__pk', flat=True))
 #	students = Student.studying.filter(pk__in=student_pks)
 #	notification_data = NotificationData.objects.create(message=message, subject=subject)
 #	college = association.college
 #	for student in students:
 #		Notification.objects.create(notification_data=notification_data, actor=college.profile, target=student.profile)
-	send_mass_mail_task.delay(subject, message, customuser_pks)
+	send_mass_mail_task.delay(subject, message, customuser_pks, priority=MassMail.POSTING)
 
 	
 # # # # # # # #
@@ -281,3 +357,43 @@ def verify_assoc_stream_uniqueness(sender, **kwargs):
 				raise IntegrityError(_('Association between (%s, %s) already exists for chosen stream' % (association.college, association.company)))
 '''
 # # # # # # # #
+
+# Public profiles show the number of sessions
+@receiver(post_save, sender=PlacementSession)
+@receiver(post_delete, sender=PlacementSession)
+def invalidate_session_profiles(sender, **kwargs):
+	if kwargs.get('created', True):
+		association = kwargs['instance'].association
+		invalidate('profile:college:%d' % association.college_id, 'profile:company:%d' % association.company_id)
+
+# Keeping the OpenOpportunity index in sync
+@receiver(post_save, sender=PlacementSession)
+def index_session_opportunities(sender, **kwargs):
+	OpenOpportunity.objects.index_session(kwargs.get('instance'))
+
+@receiver(post_save, sender=Association)
+def index_association_opportunities(sender, **kwargs):
+	association = kwargs.get('instance')
+	for session in PlacementSession.objects.filter(association=association):
+		OpenOpportunity.objects.index_session(session)
+
+@receiver(m2m_changed, sender=Association.streams.through)
+def index_association_streams_opportunities(sender, **kwargs):
+	action = kwargs.get('action')
+	if action not in ['post_add', 'post_remove', 'post_clear']:
+		return
+	if not kwargs.get('reverse'):
+		sessions = PlacementSession.objects.filter(association=kwargs.get('instance'))
+	elif action == 'post_clear': # Stream no longer has any association
+		OpenOpportunity.objects.filter(stream=kwargs.get('instance'), session__isnull=False).delete()
+		return
+	else:
+		sessions = PlacementSession.objects.filter(association__pk__in=kwargs.get('pk_set'))
+	for session in sessions.select_related('association', 'selection_criteria'):
+		OpenOpportunity.objects.index_session(session)
+
+@receiver(post_save, sender=SelectionCriteria)
+def index_criterion_opportunities(sender, **kwargs):
+	if kwargs.get('created'):
+		return
+	OpenOpportunity.objects.index_criterion(kwargs.get('instance'))
@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.db.models import Count
+
+# The session and association listings (mysessions, filter_sessions, view_my_requests, view_association_requests,
+# my_dummy_sessions, filter_dsessions). Querysets are shaped so that a listing costs the same few queries however
+# many rows it has: related rows come joined, streams come prefetched and students come counted.
+
+def get_display_name(name, keep_case=False):
+	''' Titled; with keep_case, only names entered all lowercase are '''
+	return name.title() if not keep_case or name.islower() else name
+
+def get_streams_display(streams):
+	return ', '.join([s.name.title() for s in streams.all()]) # all() is served by the prefetch
+
+def with_session_relations(sessions):
+	return sessions.select_related('association__company', 'association__college', 'association__programme', 'selection_criteria')\
+				   .prefetch_related('association__streams').annotate(student_count=Count('students'))
+
+def with_dsession_relations(dsessions):
+	return dsessions.select_related('dummy_company', 'programme', 'selection_criteria')\
+					.prefetch_related('streams').annotate(student_count=Count('students')) # Don't Use 'studying'
+
+def with_association_relations(associations):
+	return associations.select_related('company', 'college', 'programme').prefetch_related('streams')
+
+def get_session_summaries(sessions, user_type):
+	'''
+	Dicts the mysessions templates render, for PlacementSessions as seen by `user_type`.
+	CAUTION: Count('students') reuses the join of a filter on students, so pass PlacementSession.objects.filter(pk__in=student.sessions.values('pk'))
+	rather than student.sessions.all()
+	'''
+	summaries = []
+	for s in with_session_relations(sessions):
+		assoc = s.association
+		data = {}
+		data['sessobj'] = s
+		data['salary'] = "%d LPA" % assoc.salary
+		data['type'] = "Internship" if assoc.type == 'I' else "Job"
+		data['streams'] = get_streams_display(assoc.streams)
+		data['programme'] = assoc.programme
+		data['years'] = s.selection_criteria.years
+		data['students'] = s.student_count
+		if user_type == 'S':
+			data['sessid'] = settings.HASHID_PLACEMENTSESSION.encode(s.pk)
+			data['company'] = get_display_name(assoc.company.name, keep_case=True)
+			data['photo'] = assoc.company.photo
+			data['status'] = s.status
+			data['is_dummy'] = False
+		elif user_type == 'CO':
+			data['sess_hashid'] = settings.HASHID_PLACEMENTSESSION.encode(s.pk)
+			data['college'] = get_display_name(assoc.college.name)
+			data['photo'] = assoc.college.photo
+		else:
+			data['sess_hashid'] = settings.HASHID_PLACEMENTSESSION.encode(s.pk)
+			data['company'] = get_display_name(assoc.company.name)
+			data['photo'] = assoc.company.photo
+		summaries.append(data)
+	return summaries
+
+def get_dsession_summaries(dsessions, user_type):
+	''' Same as get_session_summaries, for DummySessions (seen by students, colleges and faculties) '''
+	summaries = []
+	for ds in with_dsession_relations(dsessions):
+		data = {}
+		data['dsessobj'] = ds
+		data['salary'] = "%d LPA" % ds.salary
+		data['type'] = "Internship" if ds.type == 'I' else "Job"
+		data['streams'] = get_streams_display(ds.streams)
+		data['programme'] = ds.programme
+		data['years'] = ds.selection_criteria.years
+		data['students'] = ds.student_count
+		if user_type == 'S':
+			data['dsessid'] = settings.HASHID_DUMMY_SESSION.encode(ds.pk)
+			data['company'] = get_display_name(ds.dummy_company.name, keep_case=True)
+			data['status'] = ds.status
+			data['is_dummy'] = True
+		else:
+			data['dsess_hashid'] = settings.HASHID_DUMMY_SESSION.encode(ds.pk)
+			data['dcompany'] = get_display_name(ds.dummy_company.name)
+		summaries.append(data)
+	return summaries
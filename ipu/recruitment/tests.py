@@ -1,3 +1,70 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
 
-# Create your tests here.
+from .eligibility import EligibilityMatrix, mask_to_years, masks_with_year, years_to_mask
+
+def student(pk, year, is_sub_back=False, tenth=None, twelfth=None, graduation=None, post_graduation=None, doctorate=None):
+	''' A row in the order of STUDENT_COLUMNS; tenth=None is a student without qualifications '''
+	return (pk, year, is_sub_back, tenth, twelfth, graduation, post_graduation, doctorate)
+
+def criterion(pk, years, is_sub_back=False, tenth=None, twelfth=None, graduation=None, post_graduation=None, doctorate=None):
+	''' A row in the order of CRITERIA_COLUMNS '''
+	return (pk, years_to_mask(years), is_sub_back, tenth, twelfth, graduation, post_graduation, doctorate)
+
+class YearsMaskTests(SimpleTestCase):
+
+	def test_round_trip(self):
+		self.assertEqual(years_to_mask('1,3'), 0b101)
+		self.assertEqual(mask_to_years(0b101), ['1', '3'])
+
+	def test_ignores_repeats_and_unknown_years(self):
+		self.assertEqual(years_to_mask('2,2,9,'), 0b10)
+
+	def test_masks_with_year(self):
+		masks = masks_with_year(2)
+		self.assertIn(0b10, masks)
+		self.assertIn(0b111, masks)
+		self.assertNotIn(0b101, masks)
+		self.assertEqual(masks_with_year(7), [])
+
+class EligibilityMatrixTests(SimpleTestCase):
+
+	def test_years(self):
+		matrix = EligibilityMatrix([criterion(1, '3,4')], [student(10, '3', tenth=80), student(11, '2', tenth=80)])
+		self.assertEqual(matrix.eligible_students(1), {10})
+
+	def test_sub_back(self):
+		students = [student(10, '4', is_sub_back=True, tenth=80), student(11, '4', tenth=80)]
+		matrix = EligibilityMatrix([criterion(1, '4'), criterion(2, '4', is_sub_back=True)], students)
+		self.assertEqual(matrix.eligible_students(1), {11})
+		self.assertEqual(matrix.eligible_students(2), {10, 11})
+
+	def test_thresholds(self):
+		students = [student(10, '4', tenth=75, twelfth=60), student(11, '4', tenth=70, twelfth=80), student(12, '4', tenth=90, twelfth=90)]
+		matrix = EligibilityMatrix([criterion(1, '4', tenth=75, twelfth=60)], students)
+		self.assertEqual(matrix.eligible_students(1), {10, 12}) # Thresholds are inclusive
+
+	def test_empty_score_never_disqualifies(self):
+		matrix = EligibilityMatrix([criterion(1, '4', tenth=60, graduation=70)], [student(10, '4', tenth=80, graduation=None)])
+		self.assertTrue(matrix.is_eligible(1, 10))
+
+	def test_unqualified_is_unknown(self):
+		matrix = EligibilityMatrix([criterion(1, '4')], [student(10, '4'), student(11, '4', tenth=80)])
+		self.assertIsNone(matrix.is_eligible(1, 10))
+		self.assertTrue(matrix.is_eligible(1, 11))
+		self.assertEqual(matrix.eligible_students(1), {11})
+		self.assertEqual(matrix.possibly_eligible_students(1), {10, 11})
+
+	def test_possibly_eligible_leaves_out_the_ineligible(self):
+		matrix = EligibilityMatrix([criterion(1, '4', tenth=90)], [student(10, '4'), student(11, '4', tenth=80)])
+		self.assertIs(matrix.is_eligible(1, 11), False)
+		self.assertEqual(matrix.possibly_eligible_students(1), {10})
+
+	def test_identical_criteria(self):
+		students = [student(10, '4', tenth=80)]
+		matrix = EligibilityMatrix([criterion(1, '4', tenth=60), criterion(2, '4', tenth=60), criterion(3, '4', tenth=85)], students)
+		self.assertEqual(matrix.eligible_criteria(10), {1, 2})
+
+	def test_unknown_criterion(self):
+		matrix = EligibilityMatrix([], [student(10, '4', tenth=80)])
+		self.assertIs(matrix.is_eligible(1, 10), False)
+		self.assertEqual(matrix.eligible_students(1), frozenset())
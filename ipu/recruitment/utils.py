@@ -1,45 +1,21 @@
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils.crypto import salted_hmac
+from college.utils import get_board_name, get_reference_record
+from ipu.cache import get_namespace_version, invalidate
 from student.models import Student
-import openpyxl as excel, time
+import openpyxl as excel, glob, os, tempfile, time
+from openpyxl.writer.write_only import WriteOnlyCell
 from datetime import date
 from hashids import Hashids
+from wsgiref.util import FileWrapper
 
 def get_excel_structure(main_heading, secondary_heading, students_queryset):
-	workbook = excel.Workbook()
-	worksheet = workbook.active
-	worksheet.title = "Placement Session"
-	worksheet['A1'].font = excel.styles.Font(name='Times New Roman', size=20, bold=True)
-	worksheet.merge_cells("A1:I2");worksheet.merge_cells("A3:I3")
-	worksheet['A1'] = main_heading # Job/Internship @ College
-	worksheet['A3'] = secondary_heading # Programme - Streams
-	worksheet.freeze_panes = 'A5'
-	
-	# S.No. | Enrollment No. | First Name | Last Name | Gender | Email | Stream | Year | Tenth | Twelfth | Graduation | Post Grad | Doctorate
-	worksheet['A4'] = 'S.No.'; worksheet['B4'] = 'Enrollment No.'; worksheet['C4'] = 'First Name'; worksheet['D4'] = 'Last Name';
-	worksheet['E4'] = 'Gender'; worksheet['F4'] = 'Email'; worksheet['G4'] = 'Stream'; worksheet['H4'] = 'Year';
-	worksheet['I4'] = '10th'; worksheet['J4'] = '12th'; worksheet['K4'] = 'Graduation'; worksheet['L4'] = 'Post Graduation'; worksheet['M4'] = 'Doctorate'
-	
-	bold = excel.styles.Font(bold=True)
-	for i in range(1,14):
-		worksheet.cell(row=4, column=i).font = bold
-	
-	GENDER = dict(Student.GENDER_CHOICES)
-	for i, student in enumerate(students_queryset, 1):
-		qualifications = getattr(student, 'qualifications', None)
-		row = worksheet.max_row+1
-		worksheet.cell(row=row, column=1).value = i
-		worksheet.cell(row=row, column=2).value = student.profile.username
-		worksheet.cell(row=row, column=3).value = student.firstname.title()
-		worksheet.cell(row=row, column=4).value = student.lastname.title()
-		worksheet.cell(row=row, column=5).value = GENDER[student.gender].__str__()
-		worksheet.cell(row=row, column=6).value = student.profile.email
-		worksheet.cell(row=row, column=7).value = student.stream.name.title()
-		worksheet.cell(row=row, column=8).value = student.current_year
-		worksheet.cell(row=row, column=9).value = get_qual_value(qualifications, 'tenth')
-		worksheet.cell(row=row, column=10).value = get_qual_value(qualifications, 'twelfth')
-		worksheet.cell(row=row, column=11).value = get_qual_value(qualifications, 'graduation')
-		worksheet.cell(row=row, column=12).value = get_qual_value(qualifications, 'post_graduation')
-		worksheet.cell(row=row, column=13).value = get_qual_value(qualifications, 'doctorate')
-	
+	# Write-only workbook: appended rows are flushed to a temp file by openpyxl, so memory stays flat for big rosters.
+	# Write-only sheets can't merge cells or freeze panes.
+	workbook = excel.Workbook(write_only=True)
+	worksheet = workbook.create_sheet(title="Placement Session")
 	to_letter = excel.cell.get_column_letter
 	for col in [1,5,8]:
 		worksheet.column_dimensions[to_letter(col)].width = 5
@@ -47,78 +23,125 @@ def get_excel_structure(main_heading, secondary_heading, students_queryset):
 		worksheet.column_dimensions[to_letter(col)].width = 12
 	for col in [6,7]:
 		worksheet.column_dimensions[to_letter(col)].width = 20
+
+	heading = WriteOnlyCell(worksheet, value=main_heading) # Job/Internship @ College
+	heading.font = excel.styles.Font(name='Times New Roman', size=20, bold=True)
+	worksheet.append([heading])
+	worksheet.append([])
+	worksheet.append([secondary_heading]) # Programme - Streams
+
+	# S.No. | Enrollment No. | First Name | Last Name | Gender | Email | Stream | Year | Tenth | Twelfth | Graduation | Post Grad | Doctorate
+	bold = excel.styles.Font(bold=True)
+	header = []
+	for title in ['S.No.', 'Enrollment No.', 'First Name', 'Last Name', 'Gender', 'Email', 'Stream', 'Year', '10th', '12th', 'Graduation', 'Post Graduation', 'Doctorate']:
+		cell = WriteOnlyCell(worksheet, value=title)
+		cell.font = bold
+		header.append(cell)
+	worksheet.append(header)
+
+	GENDER = dict(Student.GENDER_CHOICES)
+	students_queryset = students_queryset.select_related('profile', 'qualifications')
+	for i, student in enumerate(students_queryset.iterator(), 1):
+		qualifications = getattr(student, 'qualifications', None)
+		worksheet.append([
+			i, student.profile.username, student.firstname.title(), student.lastname.title(), GENDER[student.gender].__str__(),
+			student.profile.email, get_reference_record('streams', student.stream_id).name.title(), student.current_year,
+			get_qual_value(qualifications, 'tenth'), get_qual_value(qualifications, 'twelfth'), get_qual_value(qualifications, 'graduation'),
+			get_qual_value(qualifications, 'post_graduation'), get_qual_value(qualifications, 'doctorate'),
+		])
 	return workbook
 
+def get_excel_response(workbook, filename):
+	# Saved to a temp file and streamed back in chunks rather than held in memory by save_virtual_workbook
+	temp = tempfile.TemporaryFile()
+	workbook.save(temp)
+	size = temp.tell()
+	temp.seek(0)
+	response = StreamingHttpResponse(FileWrapper(temp), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+	response['Content-Length'] = size
+	response['Content-Disposition'] = 'attachment; filename=%s' % filename
+	return response
+
 def get_master_excel_structure(college, students_queryset): # All students' data
 	students_queryset = students_queryset.order_by('stream__code') # Grouping stream-wise
-	workbook = excel.Workbook()
-	worksheet = workbook.active
-	worksheet.title = "Master"
-	worksheet['A1'].font = excel.styles.Font(name='Times New Roman', size=20, bold=True)
-	worksheet.merge_cells("A1:I2");worksheet.merge_cells("A3:I3")
-	worksheet['A1'] = college.name.title() # College Name
-	worksheet['A3'] = date.today().strftime("Students' data as of %d %b, %Y") # Date
-	worksheet.freeze_panes = 'A5'
-	
+	# Programmes, streams and boards come from the reference data registry; get_tenth_cgpa/get_board need no further queries
+	students_queryset = students_queryset.select_related('profile', 'qualifications', 'marksheet__cgpa_marksheet', 'marksheet__marksheet_10', 'marksheet__marksheet_12')
+	workbook = excel.Workbook(write_only=True)
+	worksheet = workbook.create_sheet(title="Master")
+	to_letter = excel.cell.get_column_letter
+	for col in [1,5,9,19,20,23]:
+		worksheet.column_dimensions[to_letter(col)].width = 7
+	for col in [2,3,4,7,10,11,12,13,14,15,16,17,18,22]:
+		worksheet.column_dimensions[to_letter(col)].width = 12
+	for col in [6,8,21]:
+		worksheet.column_dimensions[to_letter(col)].width = 20
+
+	heading = WriteOnlyCell(worksheet, value=college.name.title()) # College Name
+	heading.font = excel.styles.Font(name='Times New Roman', size=20, bold=True)
+	worksheet.append([heading])
+	worksheet.append([])
+	worksheet.append([date.today().strftime("Students' data as of %d %b, %Y")]) # Date
+
 	# S.No. | Enrollment No. | First Name | Last Name | Gender | Email | Programme | Stream | Year
 	# | Tenth CGPA | Tenth CC | Tenth Board | Tenth %
 	# | Twelfth Board | Twelfth %
 	# | Graduation | Post Grad | Doctorate
 	# | Verified | Back(s) | Min. Salary Expected
 	# | Phone Number | DoB         -- Not serving these because of privacy stipulation
-
-	worksheet['A4'] = 'S.No.'; worksheet['B4'] = 'Enrollment No.'; worksheet['C4'] = 'First Name'; worksheet['D4'] = 'Last Name';
-	worksheet['E4'] = 'Gender'; worksheet['F4'] = 'Email'; worksheet['G4'] = 'Programme'; worksheet['H4'] = 'Stream'; worksheet['I4'] = 'Year';
-	worksheet['J4'] = '10th CGPA'; worksheet['K4'] = '10th Conversion Factor'; worksheet['L4'] = '10th Board'; worksheet['M4'] = '10th %';
-	worksheet['N4'] = '12th Board'; worksheet['O4'] = '12th %'; worksheet['P4'] = 'Graduation'; worksheet['Q4'] = 'Post Graduation';
-	worksheet['R4'] = 'Doctorate'; worksheet['S4'] = 'Verified'; worksheet['T4'] = 'Back(s)'; worksheet['U4'] = 'Min. Salary Expected';
-#	worksheet['V4'] = 'Phone Number'; worksheet['W4'] = 'Date of Birth';
-	
 	bold = excel.styles.Font(bold=True)
-	for i in range(1,24):
-		worksheet.cell(row=4, column=i).font = bold
-	
+	header = []
+	for title in ['S.No.', 'Enrollment No.', 'First Name', 'Last Name', 'Gender', 'Email', 'Programme', 'Stream', 'Year',
+				  '10th CGPA', '10th Conversion Factor', '10th Board', '10th %', '12th Board', '12th %', 'Graduation', 'Post Graduation',
+				  'Doctorate', 'Verified', 'Back(s)', 'Min. Salary Expected']:
+		cell = WriteOnlyCell(worksheet, value=title)
+		cell.font = bold
+		header.append(cell)
+	worksheet.append(header)
+
 	GENDER = dict(Student.GENDER_CHOICES)
-	for i, student in enumerate(students_queryset, 1):
+	for i, student in enumerate(students_queryset.iterator(), 1):
 		qualifications = getattr(student, 'qualifications', None)
-		row = worksheet.max_row+1
-		worksheet.cell(row=row, column=1).value = i
-		worksheet.cell(row=row, column=2).value = student.profile.username
-		worksheet.cell(row=row, column=3).value = student.firstname.title()
-		worksheet.cell(row=row, column=4).value = student.lastname.title()
-		worksheet.cell(row=row, column=5).value = GENDER[student.gender].__str__()
-		worksheet.cell(row=row, column=6).value = student.profile.email
-
-		worksheet.cell(row=row, column=7).value = student.programme.name
-		worksheet.cell(row=row, column=8).value = student.stream.name.title()
-		worksheet.cell(row=row, column=9).value = student.current_year
-		
-		worksheet.cell(row=row, column=10).value, worksheet.cell(row=row, column=11).value = get_tenth_cgpa(student)
-		worksheet.cell(row=row, column=12).value = get_board(student, '10')
-		worksheet.cell(row=row, column=13).value = get_qual_value(qualifications, 'tenth')
-
-		worksheet.cell(row=row, column=14).value = get_board(student, '12')
-		worksheet.cell(row=row, column=15).value = get_qual_value(qualifications, 'twelfth')
-
-		worksheet.cell(row=row, column=16).value = get_qual_value(qualifications, 'graduation')
-		worksheet.cell(row=row, column=17).value = get_qual_value(qualifications, 'post_graduation')
-		worksheet.cell(row=row, column=18).value = get_qual_value(qualifications, 'doctorate')
-
-		worksheet.cell(row=row, column=19).value = "Yes" if (student.is_verified and student.verified_by) else "No"
-		worksheet.cell(row=row, column=20).value = "Yes" if student.is_sub_back else "No"
-		worksheet.cell(row=row, column=21).value = ("%d LPA" % student.salary_expected) if student.salary_expected else "--"
-#		worksheet.cell(row=row, column=22).value = student.phone_number
-#		worksheet.cell(row=row, column=23).value = student.dob.__str__()
-	
-	to_letter = excel.cell.get_column_letter
-	for col in [1,5,9,19,20,23]:
-		worksheet.column_dimensions[to_letter(col)].width = 7
-	for col in [2,3,4,7,10,11,12,13,14,15,16,17,18,22]:
-		worksheet.column_dimensions[to_letter(col)].width = 12
-	for col in [6,8,21]:
-		worksheet.column_dimensions[to_letter(col)].width = 20
+		tenth_cgpa, conversion_factor = get_tenth_cgpa(student)
+		worksheet.append([
+			i, student.profile.username, student.firstname.title(), student.lastname.title(), GENDER[student.gender].__str__(), student.profile.email,
+			get_reference_record('programmes', student.programme_id).name, get_reference_record('streams', student.stream_id).name.title(), student.current_year,
+			tenth_cgpa, conversion_factor, get_board(student, '10'), get_qual_value(qualifications, 'tenth'),
+			get_board(student, '12'), get_qual_value(qualifications, 'twelfth'),
+			get_qual_value(qualifications, 'graduation'), get_qual_value(qualifications, 'post_graduation'), get_qual_value(qualifications, 'doctorate'),
+			"Yes" if (student.is_verified and student.verified_by_id) else "No",
+			"Yes" if student.is_sub_back else "No",
+			("%d LPA" % student.salary_expected) if student.salary_expected else "--",
+		])
 	return workbook
 
+# Master excel is generated in the background (faculty.tasks) and kept in MEDIA_ROOT for the version of the college's data
+# it shows: a change to any student of the college bumps the version (a cache namespace) and the workbook is regenerated.
+MASTER_EXCEL_FOLDER = os.path.join(settings.MEDIA_ROOT, 'master')
+
+def get_master_excel_namespace(college_pk):
+	return 'master_excel:%d' % college_pk
+
+def get_master_excel_version(college):
+	''' None while the cache is unreachable (see ipu.cache.get_namespace_version) '''
+	return get_namespace_version(get_master_excel_namespace(college.pk))
+
+def get_master_excel_path(college, version):
+	'''
+	Of the workbook of the college's data as of `version` (get_master_excel_version). The one made while the version is
+	unknown has a name of its own; it can't be told stale, so it is only served until the version is known again.
+	'''
+	# Unguessable name as MEDIA_ROOT is publicly served
+	return os.path.join(MASTER_EXCEL_FOLDER, 'master_%s_%s.xlsx' % (college.code, salted_hmac('master_excel', '%s:%s' % (college.code, version or 'unversioned')).hexdigest()[:20]))
+
+def get_master_excel_paths(college):
+	''' Workbooks of every version of the college's data still on disk '''
+	return glob.glob(os.path.join(MASTER_EXCEL_FOLDER, 'master_%s_*.xlsx' % college.code))
+
+def invalidate_master_excel(colleges):
+	''' Workbooks of the colleges, generated or being generated, are stale once the change is committed '''
+	namespaces = [get_master_excel_namespace(pk) for pk in colleges.values_list('pk', flat=True)]
+	if namespaces:
+		transaction.on_commit(lambda: invalidate(*namespaces))
 
 def get_qual_value(qualifications, attr):
 	value = getattr(qualifications, attr, None)
@@ -142,13 +165,10 @@ def get_board(student, klass):
 		marksheet = student.marksheet
 		if klass == '10':
 			if marksheet.cgpa_marksheet:
-				board = marksheet.cgpa_marksheet.board
-				return board.abbreviation if board.abbreviation else board.name
+				return get_board_name(marksheet.cgpa_marksheet.board_id)
 			else:
-				board = marksheet.marksheet_10.board
-				return board.abbreviation if board.abbreviation else board.name
+				return get_board_name(marksheet.marksheet_10.board_id)
 		else:
-			board = marksheet.marksheet_12.board
-			return board.abbreviation if board.abbreviation else board.name
+			return get_board_name(marksheet.marksheet_12.board_id)
 	except:
 		return '--'
@@ -9,9 +9,10 @@ from django.http import HttpResponse, JsonResponse, Http404
 from django.shortcuts import render, redirect, get_object_or_404
 from django.utils.translation import ugettext_lazy as _
 from django.views.decorators.http import require_http_methods, require_GET, require_POST
-from account.decorators import require_user_types, require_AJAX
-from account.utils import handle_user_type, get_relevant_reversed_url, get_type_created
+from account.decorators import require_user_types, require_AJAX, require_groups
+from account.utils import handle_user_type, get_relevant_reversed_url, get_type_created, has_groups
 from college.models import College
+from college.utils import get_college_programmes, get_programme_streams
 from company.models import Company
 from dummy_company.models import DummyCompany, DummySession
 from faculty.models import Faculty
@@ -19,8 +20,9 @@ from notification.forms import NotifySessionStudentsForm
 from notification.models import Notification
 from recruitment.forms import AssociationForm, EditSessionForm, DissociationForm, CreateSessionCriteriaForm, EditCriteriaForm, ManageSessionStudentsForm, SessionFilterForm, DeclineForm
 from recruitment.models import Association, PlacementSession, Dissociation, SelectionCriteria
+from recruitment.summaries import get_dsession_summaries, get_session_summaries, get_streams_display, with_association_relations
 from recruitment.tasks import dump_stats_record_task
-from recruitment.utils import get_excel_structure
+from recruitment.utils import get_excel_structure, get_excel_response
 from student.models import Student, Programme, Stream
 
 import openpyxl as excel, time, logging
@@ -71,12 +73,11 @@ def associate(request, **kwargs):
 @require_user_types(['C', 'F', 'CO'])
 @login_required
 @require_GET
+@require_groups(['Placement Handler'])
 def manage_session(request, sess_hashid, **kwargs):
 	profile = kwargs.pop('profile')
 	user_type = kwargs.pop('user_type')
 	if user_type == 'F':
-		if not request.user.groups.filter(name='Placement Handler'):
-			return JsonResponse(status=403, data={'error': 'Permission Denied. You are not authorized to handle college\'s placements.'})
 		profile = profile.college
 	try:
 		session_pk = settings.HASHID_PLACEMENTSESSION.decode(sess_hashid)[0]
@@ -103,12 +104,11 @@ def manage_session(request, sess_hashid, **kwargs):
 @require_AJAX
 @login_required
 @require_POST
+@require_groups(['Placement Handler'])
 def edit_criteria(request, sess_hashid, **kwargs):
 	profile = kwargs.pop('profile')
 	user_type = kwargs.pop('user_type')
 	if user_type == 'F':
-		if not request.user.groups.filter(name='Placement Handler'):
-			return JsonResponse(status=403, data={'error': 'Permission Denied. You are not authorized to handle college\'s placements.'})
 		profile = profile.college
 	token = request.POST.get('token', None)
 	if token != sess_hashid:
@@ -142,12 +142,11 @@ def edit_criteria(request, sess_hashid, **kwargs):
 @require_AJAX
 @login_required
 @require_POST
+@require_groups(['Placement Handler'])
 def edit_session(request, sess_hashid, **kwargs):
 	profile = kwargs.pop('profile')
 	user_type = kwargs.pop('user_type')
 	if user_type == 'F':
-		if not request.user.groups.filter(name='Placement Handler'):
-			return JsonResponse(status=403, data={'error': 'Permission Denied. You are not authorized to handle college\'s placements.'})
 		profile = profile.college
 	token = request.POST.get('token', None)
 	if token != sess_hashid:
@@ -194,12 +193,11 @@ def edit_session(request, sess_hashid, **kwargs):
 @require_AJAX
 @login_required
 @require_POST
+@require_groups(['Placement Handler'])
 def manage_session_students(request, sess_hashid, **kwargs):
 	profile = kwargs.pop('profile')
 	user_type = kwargs.pop('user_type')
 	if user_type == 'F':
-		if not request.user.groups.filter(name='Placement Handler'):
-			return JsonResponse(status=403, data={'error': 'Permission Denied. You are not authorized to handle college\'s placements.'})
 		profile = profile.college
 	token = request.POST.get('token', None)
 	if token != sess_hashid:
@@ -233,12 +231,14 @@ def get_programmes(request, **kwargs):
 	try:
 		college = request.GET.get('college', '')
 		college = settings.HASHID_COLLEGE.decode(college)[0]
-		college = College.objects.get(pk=college)
+		programmes = get_college_programmes(college)
+		if not programmes:
+			raise College.DoesNotExist
 	except:
 		return JsonResponse(status=400, data={'error': 'Invalid college chosen.', 'message': 'Please choose a valid college'})
 	data = []
-	for p in college.get_programmes_queryset():
-		data.append({'html': p.name.title(), 'value': settings.HASHID_PROGRAMME.encode(p.pk)})
+	for pk, name in programmes:
+		data.append({'html': name.title(), 'value': settings.HASHID_PROGRAMME.encode(pk)})
 	return JsonResponse(status=200, data={'programmes': data})
 
 @require_user_types(['C', 'CO'])
@@ -251,13 +251,14 @@ def get_streams(request, **kwargs):
 	try:
 		programme = request.GET.get('programme', '')
 		programme = settings.HASHID_PROGRAMME.decode(programme)[0]
-		programme = Programme.objects.get(pk=programme)
+		streams = get_programme_streams(programme)
+		if not streams:
+			raise Programme.DoesNotExist
 	except:
 		return JsonResponse(status=400, data={'error': 'Invalid programme chosen.', 'message': 'Please choose a valid programme.'})
-	streams = programme.streams.all()
 	data = []
-	for s in streams:
-		data.append({'html': s.name.title(), 'value': settings.HASHID_STREAM.encode(s.pk)})
+	for pk, name in streams:
+		data.append({'html': name.title(), 'value': settings.HASHID_STREAM.encode(pk)})
 	return JsonResponse(status=200, data={'streams': data})
 
 @require_user_types(['C', 'CO', 'F'])
@@ -266,7 +267,7 @@ def get_streams(request, **kwargs):
 def create_session(request, **kwargs):
 	if request.is_ajax():
 		type = kwargs.pop('user_type')
-		if type == 'F' and not request.user.groups.filter(name='Placement Handler'):
+		if type == 'F' and not has_groups(request.user, ['Placement Handler']):
 			return JsonResponse(status=403, data={'error': 'Permission Denied. You are not authorized to handle college\'s placements.'})
 		if request.method == 'GET':
 			try:
@@ -353,39 +354,10 @@ def mysessions(request):
 				student = user.student
 			except Student.DoesNotExist:
 				return JsonResponse(status=400, data={'location': reverse(settings.PROFILE_CREATION_URL['S'])})
-			sessions = student.sessions.all()
-			dsessions = student.dummy_sessions.all()
-			all_sessions_list = []
-			for s in sessions:
-				assoc = s.association
-				data = {}
-				data['sessobj'] = s
-				data['sessid'] = settings.HASHID_PLACEMENTSESSION.encode(s.pk)
-				data['salary'] = "%d LPA" % assoc.salary
-				data['company'] = assoc.company.name.title() if assoc.company.name.islower() else assoc.company.name
-				data['type'] = "Internship" if assoc.type == 'I' else "Job"
-				data['photo'] = assoc.company.photo
-				data['streams'] = ', '.join([s.name.title() for s in assoc.streams.all()])
-				data['programme'] = assoc.programme
-				data['years'] = assoc.session.selection_criteria.years
-				data['students'] = s.students.count()
-				data['status'] = s.status
-				data['is_dummy'] = False
-				all_sessions_list.append(data)
-			for ds in dsessions:
-				data = {}
-				data['dsessobj'] = ds
-				data['dsessid'] = settings.HASHID_DUMMY_SESSION.encode(ds.pk)
-				data['salary'] = "%d LPA" % ds.salary
-				data['company'] = ds.dummy_company.name.title() if ds.dummy_company.name.islower() else ds.dummy_company.name
-				data['type'] = "Internship" if ds.type == 'I' else "Job"
-				data['streams'] = ', '.join([s.name.title() for s in ds.streams.all()])
-				data['programme'] = ds.programme
-				data['years'] = ds.selection_criteria.years
-				data['students'] = ds.students.count()
-				data['status'] = ds.status
-				data['is_dummy'] = True
-				all_sessions_list.append(data)
+			# Through pk__in, as counting students over student.sessions would only count the student
+			sessions = PlacementSession.objects.filter(pk__in=student.sessions.values('pk'))
+			dsessions = DummySession.objects.filter(pk__in=student.dummy_sessions.values('pk'))
+			all_sessions_list = get_session_summaries(sessions, 'S') + get_dsession_summaries(dsessions, 'S')
 			html = render(request, 'student/mysessions.html', {'sessions': all_sessions_list}).content.decode('utf-8')
 		elif type == 'CO':
 			try:
@@ -394,21 +366,7 @@ def mysessions(request):
 				return JsonResponse(status=400, data={'location': reverse(settings.PROFILE_CREATION_URL['CO'])})
 			associations = Association.objects.filter(company=company, approved=True).values('pk')
 			sessions = PlacementSession.objects.filter(association__pk__in = associations)
-			sessions_list = []
-			for s in sessions:
-				assoc = s.association
-				data = {}
-				data['sessobj'] = s
-				data['sess_hashid'] = settings.HASHID_PLACEMENTSESSION.encode(s.pk)
-				data['salary'] = "%d LPA" % assoc.salary
-				data['college'] = assoc.college.name.title()
-				data['type'] = "Internship" if assoc.type == 'I' else "Job"
-				data['photo'] = assoc.college.photo
-				data['streams'] = ', '.join([s.name.title() for s in assoc.streams.all()])
-				data['programme'] = assoc.programme
-				data['years'] = assoc.session.selection_criteria.years
-				data['students'] = s.students.count()
-				sessions_list.append(data)
+			sessions_list = get_session_summaries(sessions, 'CO')
 			html = render(request, 'company/mysessions.html', {'sessions': sessions_list}).content.decode('utf-8')
 		else:
 			college = None
@@ -422,7 +380,7 @@ def mysessions(request):
 					verdict = True
 				if verdict:
 					return JsonResponse(status=400, data={'location': reverse(settings.PROFILE_CREATION_URL['F'])})
-				if not request.user.groups.filter(name__in=['Placement Handler', 'Notifications Manager']):
+				if not has_groups(request.user, ['Placement Handler', 'Notifications Manager']):
 					return JsonResponse(status=403, data={'error': 'Permission Denied. You are not authorized to handle college\'s placements.'})
 				college = faculty.college
 			elif type == 'C':
@@ -433,36 +391,8 @@ def mysessions(request):
 			associations = Association.objects.filter(college=college, approved=True).values('pk')
 			sessions = PlacementSession.objects.filter(association__pk__in = associations, ended=False)
 			dsessions = DummySession.objects.filter(dummy_company__college=college, ended=False)
-			sessions_list = []
-			dsessions_list = []
-			for s in sessions:
-				assoc = s.association
-				data = {}
-				data['sessobj'] = s
-				data['sess_hashid'] = settings.HASHID_PLACEMENTSESSION.encode(s.pk)
-				data['salary'] = "%d LPA" % assoc.salary
-				data['company'] = assoc.company.name.title()
-				data['type'] = "Internship" if assoc.type == 'I' else "Job"
-				data['photo'] = assoc.company.photo
-				data['streams'] = ', '.join([s.name.title() for s in assoc.streams.all()])
-				data['programme'] = assoc.programme
-				data['years'] = assoc.session.selection_criteria.years
-				data['students'] = s.students.count()
-#				data['is_dummy'] = False
-				sessions_list.append(data)
-			for ds in dsessions:
-				data = {}
-				data['dsessobj'] = ds
-				data['dsess_hashid'] = settings.HASHID_DUMMY_SESSION.encode(ds.pk)
-				data['salary'] = "%d LPA" % ds.salary
-				data['dcompany'] = ds.dummy_company.name.title()
-				data['type'] = "Internship" if ds.type == 'I' else "Job"
-				data['streams'] = ', '.join([s.name.title() for s in ds.streams.all()])
-				data['programme'] = ds.programme
-				data['years'] = ds.selection_criteria.years
-				data['students'] = ds.students.count()
-#				data['is_dummy'] = True
-				dsessions_list.append(data)
+			sessions_list = get_session_summaries(sessions, type)
+			dsessions_list = get_dsession_summaries(dsessions, type)
 			html = render(request, 'college/mysessions.html', {'sessions': sessions_list, 'dsessions': dsessions_list}).content.decode('utf-8')
 		return JsonResponse(status=200, data={'html': html})
 	else:
@@ -474,7 +404,7 @@ def mysessions(request):
 def decline(request, **kwargs):
 	user_type = kwargs.get('user_type')
 	if request.is_ajax():
-		if user_type == 'F' and not request.user.groups.filter(name='Placement Handler'):
+		if user_type == 'F' and not has_groups(request.user, ['Placement Handler']):
 			return JsonResponse(status=403, data={'error': 'Permission Denied. You are not authorized to handle college\'s placements.'})
 		if request.method == 'GET':
 			try:
@@ -532,6 +462,7 @@ def view_my_requests(request, profile, user_type):
 		queryset = Association.objects.order_by('-updated_on').filter(company=profile, initiator=user_type).filter(~Q(approved=True))
 	else:
 		queryset = Association.objects.order_by('-updated_on').filter(college=profile, initiator='C').filter(~Q(approved=True))
+	queryset = with_association_relations(queryset)
 	my_requests = {'pending': [], 'declined': []}
 	for association in queryset:
 		if association.approved is None:
@@ -542,7 +473,7 @@ def view_my_requests(request, profile, user_type):
 			data['type'] = "Internship" if association.type == 'I' else "Job"
 			data['photo'] = association.company.photo if association.initiator=='C' else association.college.photo
 			data['programme'] = association.programme
-			data['streams'] = ', '.join([s.name.title() for s in association.streams.all()])
+			data['streams'] = get_streams_display(association.streams)
 			data['created_on'] = association.created_on
 			my_requests['pending'].append(data)
 		else:
@@ -553,7 +484,7 @@ def view_my_requests(request, profile, user_type):
 			data['type'] = "Internship" if association.type == 'I' else "Job"
 			data['photo'] = association.company.photo if association.initiator=='C' else association.college.photo
 			data['programme'] = association.programme
-			data['streams'] = ', '.join([s.name.title() for s in association.streams.all()])
+			data['streams'] = get_streams_display(association.streams)
 			data['created_on'] = association.created_on
 			data['decline_message'] = association.decline_message
 			my_requests['declined'].append(data)
@@ -688,15 +619,15 @@ def view_association_requests(request, **kwargs):
 		if user_type == 'C':
 			associations = associations.filter( Q(college=profile) & Q(approved=None) )
 		elif user_type == 'F':
-			if not request.user.groups.filter(name='Placement Handler'):
+			if not has_groups(request.user, ['Placement Handler']):
 				return JsonResponse(status=403, data={'error': 'Permission Denied. You are not authorized to handle college\'s placements.'})
 			associations = associations.filter( Q(college=profile.college) & Q(approved=None) & Q(initiator='CO') )
 		else:
 			associations = associations.filter( Q(company=profile) & Q(approved=None) )
 		associations_list = []
 		context = {}
-		for ass in associations:
-			streams = ', '.join([s['name'] for s in ass.streams.values('name')])
+		for ass in with_association_relations(associations):
+			streams = ', '.join([s.name for s in ass.streams.all()])
 			associations_list.append({'obj':ass, 'hashid':settings.HASHID_ASSOCIATION.encode(ass.pk), 'streams': streams})
 		context['associations'] = associations_list
 		if user_type in ['C','F']:
@@ -712,6 +643,7 @@ def view_association_requests(request, **kwargs):
 @require_user_types(['C', 'F', 'CO'])
 @login_required
 @require_GET
+@require_groups(['Placement Handler', 'Notifications Manager'])
 def generate_excel(request, sess, **kwargs):
 #	if request.is_ajax() and request.user.type in ['F', 'C', 'CO']:
 	user_type = kwargs.pop('user_type')
@@ -725,8 +657,6 @@ def generate_excel(request, sess, **kwargs):
 		elif user_type == 'C':
 			session = PlacementSession.objects.get(association__college=profile, pk=session_id)
 		else:
-			if not request.user.groups.filter(name__in=['Placement Handler', 'Notifications Manager']):
-				return JsonResponse(status=403, data={'error': 'Permission Denied. You are not authorized to handle college\'s placements.'})
 			session = PlacementSession.objects.get(association__college=profile.college, pk=session_id)
 	except: #To account for both KeyError as well as PlacementSession.DoesNotExist
 		return JsonResponse(status=400, data={'error': 'Invalid Request.'})
@@ -738,18 +668,15 @@ def generate_excel(request, sess, **kwargs):
 	streams_title = session.association.programme.name + ' - ' + ', '.join(["%s (%s)" % (s.name, s.code) for s in session.association.streams.all()])
 	students_queryset = session.students.all()
 	workbook = get_excel_structure(title, streams_title, students_queryset)
-	response = HttpResponse(content=excel.writer.excel.save_virtual_workbook(workbook), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-	response['Content-Disposition'] = 'attachment; filename=session_%s.xlsx' % Hashids(salt="AbhiKaSamay").encode(round(time.time()))
-	return response
+	return get_excel_response(workbook, 'session_%s.xlsx' % Hashids(salt="AbhiKaSamay").encode(round(time.time())))
 
 @require_user_types(['C', 'F', 'CO'])
 @require_AJAX
 @login_required
 @require_POST
+@require_groups(['Placement Handler', 'Notifications Manager'])
 def notify_session(request, sess_hashid, user_type, profile):
 	if user_type == 'F':
-		if not request.user.groups.filter(name__in=['Placement Handler', 'Notifications Manager']):
-			return JsonResponse(status=403, data={'error': 'Permission Denied. You are not authorized to handle college\'s placements.'})
 		profile = profile.college
 	try:
 		session_pk = settings.HASHID_PLACEMENTSESSION.decode(sess_hashid)[0]
@@ -772,29 +699,13 @@ def notify_session(request, sess_hashid, user_type, profile):
 @require_AJAX
 @login_required
 @require_POST
+@require_groups(['Placement Handler', 'Notifications Manager'])
 def filter_sessions(request, user_type, profile):
 	if user_type == 'F':
-		if not request.user.groups.filter(name__in=['Placement Handler', 'Notifications Manager']):
-			return JsonResponse(status=403, data={'error': 'Permission Denied. You are not authorized to handle college\'s placements.'})
 		profile = profile.college
 	f = SessionFilterForm(request.POST, profile=profile)
 	if f.is_valid():
-		sessions = f.get_filtered_sessions()
-		sessions_list = []
-		for s in sessions:
-			assoc = s.association
-			data = {}
-			data['sessobj'] = s
-			data['sess_hashid'] = settings.HASHID_PLACEMENTSESSION.encode(s.pk)
-			data['salary'] = "%d LPA" % assoc.salary
-			data['company'] = assoc.company.name.title()
-			data['type'] = "Internship" if assoc.type == 'I' else "Job"
-			data['photo'] = assoc.company.photo
-			data['streams'] = ', '.join([s.name.title() for s in assoc.streams.all()])
-			data['programme'] = assoc.programme
-			data['years'] = assoc.session.selection_criteria.years
-			data['students'] = s.students.count()
-			sessions_list.append(data)
+		sessions_list = get_session_summaries(f.get_filtered_sessions(), user_type)
 		if user_type == 'CO':
 			html = render(request, 'company/mysessions.html', {'sessions': sessions_list, 'filtering': True}).content.decode('utf-8')
 		else:
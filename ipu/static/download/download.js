@@ -23,6 +23,17 @@ var Download = (function() {
 					data: {},
 					processData: true,
 					success: function(data, status, xhr){
+						if (data['location']) {
+							swal({
+								title: "Success!",
+								text: "Your download has begun. Please don't close the browser until your download completes.",
+								type: "success",
+								allowEscapeKey: true,
+								allowOutsideClick: true,
+							});
+							window.location = data['location'];
+							return;
+						}
 						swal({
 							title: "Success!",
 							text: "Your request is being processed. A notification containing the download link will be generated. Please go to the home page, and look for new notifications. This otherwise instantaneous process, sometimes might take a while. We request you to refresh the home page in intervals to look for new notifications.",
@@ -100,6 +111,17 @@ var Download = (function() {
 					data: {},
 					processData: true,
 					success: function(data, status, xhr){
+						if (data['queued']) {
+							swal({
+								title: "Request Received",
+								text: data['message'],
+								type: "success",
+								allowEscapeKey: true,
+								allowOutsideClick: true,
+								confirmButtonText: "Ok"
+							});
+							return;
+						}
 						swal({
 							title: "Success!",
 							text: "The data is being processed and will be downloaded. Please don't close the browser until the downloading completes.",
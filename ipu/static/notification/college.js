@@ -1,6 +1,7 @@
 var Notification = (function() {
 	'use strict'
     var sphr_create_notification = true;
+    var selected_stream_to_year = ''; // Sent along with the students, so that a notification to whole cohorts is stored once for them
 	var indices = [];
     var preloader = document.getElementById('page-preloader');
     var preloader_shadow = document.getElementById('preloader-shadow');
@@ -135,7 +136,8 @@ var Notification = (function() {
             stream_to_year[id] = year_selected_list;
 
         });
-        submitYearForm(JSON.stringify(stream_to_year));
+        selected_stream_to_year = JSON.stringify(stream_to_year);
+        submitYearForm(selected_stream_to_year);
     }
         
     function submitYearForm(stream_to_year) {
@@ -233,6 +235,7 @@ var Notification = (function() {
                         'if_sms' : if_sms,
                         'sms_message' : sms_message.val(),
                         'if_email' : if_email,
+                        'stream_to_year' : selected_stream_to_year,
                     },
                     beforeSend: function() {
                         showPreloader();
@@ -306,11 +309,13 @@ function removeError(field){
 
 //==============================================================================//
 //============Below are functions to get a college's notifications.=============//
-    function getNotifications() {
+    var loaded_notifications = []; // Pages fetched so far, newest first
+    function getNotifications(before) {
         var url = $('#notification_button').attr('href');
         $.ajax({
             url : url,
             type : 'GET',
+            data : (before ? {'before' : before} : {}), // Cursor of the older page
             async : true,
             beforeSend: function() {
                 showPreloader();
@@ -320,12 +325,25 @@ function removeError(field){
                 removePreloader();  
             },
             success : function(data, status, xhr){
-                populateNotificationDiv(data);
+                loaded_notifications = (before ? loaded_notifications.concat(data.notifications) : data.notifications);
+                populateNotificationDiv(loaded_notifications);
+                if(data.next){
+                    addOlderNotificationsAnchor(data.next);
+                }
                 
             }
         });
         
     }
+    function addOlderNotificationsAnchor(next) {
+        var anchor = $('<li class="collection-item center-align"><a href="#!">Older notifications</a></li>');
+        anchor.find('a').on('click' , function(e) {
+            e.preventDefault();
+            getNotifications(next);
+        });
+        $('#your-notifications-div-ul').append(anchor);
+    }
+
     function populateNotificationDiv(data) {
         var raw_html = '';  
         var icon = '';
@@ -27,11 +27,13 @@ var Notification = (function() {
 //Gets the first form. Asks to select the streams.
 //==============================================================================//
 //============Below are functions to get a faculty's notifications.=============//
-    function getNotifications() {
+    var loaded_notifications = []; // Pages fetched so far, newest first
+    function getNotifications(before) {
         var url = $('#notification_button').attr('href');
         $.ajax({
             url : url,
             type : 'GET',
+            data : (before ? {'before' : before} : {}), // Cursor of the older page
             async : true,
             beforeSend: function() {
                 showPreloader();
@@ -41,12 +43,25 @@ var Notification = (function() {
                 removePreloader();  
             },
             success : function(data, status, xhr){
-                populateNotificationDiv(data);
+                loaded_notifications = (before ? loaded_notifications.concat(data.notifications) : data.notifications);
+                populateNotificationDiv(loaded_notifications);
+                if(data.next){
+                    addOlderNotificationsAnchor(data.next);
+                }
                 
             }
         });
         
     }
+    function addOlderNotificationsAnchor(next) {
+        var anchor = $('<li class="collection-item center-align"><a href="#!">Older notifications</a></li>');
+        anchor.find('a').on('click' , function(e) {
+            e.preventDefault();
+            getNotifications(next);
+        });
+        $('#your-notifications-div-ul').append(anchor);
+    }
+
     function populateNotificationDiv(data) {
         var raw_html = '';  
         var icon = '';
@@ -1,6 +1,7 @@
 var Notification = (function() {
 	'use strict'
     var sphr_create_notification = true;
+    var selected_stream_to_year = ''; // Sent along with the students, so that a notification to whole cohorts is stored once for them
     var indices = [];
     function handleMultipleJquery(){
         $('a').unbind('click'); // to prevent multiple fires because of reloading of jquery in the rendered template.
@@ -125,7 +126,8 @@ var Notification = (function() {
             stream_to_year[id] = year_selected_list;
 
         });
-        submitYearForm(JSON.stringify(stream_to_year));
+        selected_stream_to_year = JSON.stringify(stream_to_year);
+        submitYearForm(selected_stream_to_year);
     }
         
     function submitYearForm(stream_to_year) {
@@ -223,6 +225,7 @@ var Notification = (function() {
                         'if_sms' : if_sms,
                         'sms_message' : sms_message.val(),
                         'if_email' : if_email,
+                        'stream_to_year' : selected_stream_to_year,
                     },
                     beforeSend: function() {
                         showPreloader();
@@ -460,11 +463,13 @@ function removeError(field){
 
 //==============================================================================//
 //============Below are functions to get a faculty's notifications.=============//
-    function getNotifications() {
+    var loaded_notifications = []; // Pages fetched so far, newest first
+    function getNotifications(before) {
         var url = $('#notification_button').attr('href');
         $.ajax({
             url : url,
             type : 'GET',
+            data : (before ? {'before' : before} : {}), // Cursor of the older page
             async : true,
             beforeSend: function() {
                 showPreloader();
@@ -474,12 +479,25 @@ function removeError(field){
                 removePreloader();  
             },
             success : function(data, status, xhr){
-                populateNotificationDiv(data);                
+                loaded_notifications = (before ? loaded_notifications.concat(data.notifications) : data.notifications);
+                populateNotificationDiv(loaded_notifications);
+                if(data.next){
+                    addOlderNotificationsAnchor(data.next);
+                }
             }
         });       
     }
 
 
+    function addOlderNotificationsAnchor(next) {
+        var anchor = $('<li class="collection-item center-align"><a href="#!">Older notifications</a></li>');
+        anchor.find('a').on('click' , function(e) {
+            e.preventDefault();
+            getNotifications(next);
+        });
+        $('#your-notifications-div-ul').append(anchor);
+    }
+
 function populateNotificationDiv(data) {
         var raw_html = '';  
         var icon = '';
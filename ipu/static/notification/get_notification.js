@@ -44,11 +44,29 @@ var GetNotification = (function()  {
             }
         });
         
+    }
+
+	function pollUnreadCount() {
+        var badge = $('#notifications_badge');
+        if(badge.length === 0 || !badge.attr('url'))
+            return;
+        $.ajax({
+            url : badge.attr('url'),
+            type : 'GET',
+            async : true,
+            success : function(data, status, xhr){
+                if(data.unread > 0)
+                    badge.text(data.unread).show();
+                else
+                    badge.hide();
+            }
+        });
     }
 
 	return {
 		init : function() {
 			document.getElementById('notification_button').addEventListener('click' , obtainPings)
+			setInterval(pollUnreadCount , 60 * 1000);
 		}
 	}
 })();
\ No newline at end of file
@@ -228,11 +228,13 @@ function fieldEvaluator(input_field , max_length){
 
 //==============================================================================//
 //============Below are functions to get a student's notifications.=============//
-	function getNotifications() {
+	var loaded_notifications = []; // Pages fetched so far, newest first
+	function getNotifications(before) {
         var url = $('#notification_button').attr('href');
         $.ajax({
             url : url,
             type : 'GET',
+            data : (before ? {'before' : before} : {}), // Cursor of the older page
 			beforeSend: function() {
    				showPreloader();
             },
@@ -241,12 +243,25 @@ function fieldEvaluator(input_field , max_length){
             	removePreloader();	
             },
             success : function(data, status, xhr){
-                populateNotificationDiv(data);    
+                loaded_notifications = (before ? loaded_notifications.concat(data.notifications) : data.notifications);
+                populateNotificationDiv(loaded_notifications);
+                if(data.next){
+                    addOlderNotificationsAnchor(data.next);
+                }
             }
         });
         
     }
 
+	function addOlderNotificationsAnchor(next) {
+	    var anchor = $('<li class="collection-item center-align"><a href="#!">Older notifications</a></li>');
+	    anchor.find('a').on('click' , function(e) {
+	        e.preventDefault();
+	        getNotifications(next);
+	    });
+	    $('#your-notifications-div-ul').append(anchor);
+	}
+
     function populateNotificationDiv(data) {
         var raw_html = '';  
         var icon = '';
@@ -1,10 +1,12 @@
 from django import forms
+from django.conf import settings
+from ipu.cache import cached
 from .models import YearRecord
 
 class StatsForm(forms.ModelForm):
 	def __init__(self, *args, **kwargs):
 		super(StatsForm, self).__init__(*args, **kwargs)
-		self.fields['college'].widget.choices = self.get_fullname_choices()
+		self.fields['college'].widget.choices = cached('stats', ['college_choices'], self.get_fullname_choices, settings.CACHE_STATS_TIMEOUT)
 		self.fields['academic_year'] = forms.ChoiceField(choices=(('', '----------'),))
 		self.fields['academic_year'].widget.attrs['disabled'] = True
 
@@ -16,7 +18,7 @@ class StatsForm(forms.ModelForm):
 			name = college.name.title() + ('' if not college.alias else (' (' + college.alias + ')'))
 			names.append(name)
 			values.append(college.pk)
-		return zip(values, names)
+		return list(zip(values, names))
 	
 	class Meta:
 		model = YearRecord
@@ -1,5 +1,8 @@
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from ipu.cache import invalidate
 from decimal import Decimal
 
 # Create your models here.
@@ -62,3 +65,14 @@ class Placement(models.Model):
 # Highly sensitive field. If discrepancy in data regarding salary, then mention the salary column here.
 # In templates, check if salary_comment, then display that; else salary
 	total_offers = models.PositiveSmallIntegerField(default=0)
+
+@receiver(post_save, sender=College)
+@receiver(post_delete, sender=College)
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+@receiver(post_save, sender=YearRecord)
+@receiver(post_delete, sender=YearRecord)
+@receiver(post_save, sender=Placement)
+@receiver(post_delete, sender=Placement)
+def invalidate_stats(sender, **kwargs):
+	invalidate('stats')
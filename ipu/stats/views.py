@@ -1,14 +1,50 @@
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render
-from django.template.loader import get_template
+from django.template.loader import render_to_string
 from django.views.decorators.http import require_GET, require_http_methods
 
 from account.utils import handle_user_type
+from ipu.cache import cached
 from stats.forms import StatsForm
 from stats.models import College, Company, YearRecord, Placement
 
 # Create your views here.
 
+# Stats only change when a session ends or the admin edits them; answers are cached in the 'stats' namespace,
+# which the receivers in stats.models invalidate.
+
+def get_years(college_pk):
+	college = College.objects.get(pk=college_pk)
+	return [{'html': year, 'value': year} for year in college.records.values_list('academic_year', flat=True)]
+
+def get_record_stats(request, college_pk, year):
+	# Table
+	headings = ['Company', 'Type', 'Total Offerings', 'Salary (LPA)']
+	record = YearRecord.objects.get(college=college_pk, academic_year=year)
+	placements = list(record.placements.select_related('company').order_by('-salary'))
+	entries = []
+	for each in placements:
+		company = each.company.name
+		type = dict(Placement.PLACEMENT_TYPE)[each.type]
+		offered = each.total_offers or '---' #if each.total_offers else 'Result Awaited'
+		salary = each.salary_comment if each.salary_comment else ('Training' if not each.salary and type.lower().startswith('i') else each.salary)
+		entries.append([company, type, offered, salary])
+	table = render_to_string('stats/table.html', {'headings': headings, 'entries': entries}, request=request)
+	# # #
+	# Graph
+	graph = []
+	for each in placements:
+		if each.salary_comment:
+			continue
+		point = {}
+		point['salary'] = float(each.salary)
+		point['offers'] = each.total_offers
+		point['company'] = each.company.name
+		graph.append(point)
+	# # #
+	return {'table': table, 'graph': graph}
+
 @require_GET
 def stats(request):
 	if request.user.is_authenticated():
@@ -16,11 +52,8 @@ def stats(request):
 	if request.is_ajax():
 		if request.GET.get('years', '') == 'true':
 			try:
-				college = College.objects.prefetch_related('records').get(pk=request.GET.get('college', None))
-				years = [c['academic_year'] for c in college.records.values('academic_year')]
-				data = []
-				for year in years:
-					data.append({'html': year, 'value': year})
+				college_pk = int(request.GET.get('college', None))
+				data = cached('stats', ['years', college_pk], lambda: get_years(college_pk), settings.CACHE_STATS_TIMEOUT)
 				return JsonResponse(status=200, data={'years': data})
 			except:
 				return JsonResponse(status=400, data={'errors': 'Please choose a valid college.'})
@@ -30,50 +63,21 @@ def stats(request):
 			if not year or not college_pk:
 				message = 'Invalid ' + ('college chosen' if not college_pk else 'year chosen')
 				return JsonResponse(status=400, data={'errors': message})
-			# Table
-			headings = ['Company', 'Type', 'Total Offerings', 'Salary (LPA)']
-			college = College.objects.prefetch_related('records').get(pk=college_pk)
-			record = college.records.get(academic_year=year)
-			placements = record.placements.order_by('-salary').all()
-			entries = []
-			for each in placements:
-				company = each.company.name
-				type = dict(Placement.PLACEMENT_TYPE)[each.type]
-				offered = each.total_offers or '---' #if each.total_offers else 'Result Awaited'
-				salary = each.salary_comment if each.salary_comment else ('Training' if not each.salary and type.lower().startswith('i') else each.salary)
-				entries.append([company, type, offered, salary])
-			context = {'headings': headings, 'entries': entries}
-			table = render(request, 'stats/table.html', context).content.decode('utf-8')
-			# # #
-			# Graph
-			graph = []
-			for each in placements:
-				if each.salary_comment:
-					continue
-				point = {}
-				point['salary'] = float(each.salary)
-				point['offers'] = each.total_offers
-				point['company'] = each.company.name
-				graph.append(point)
-			# # #
-			return JsonResponse(status=200, data={'table': table, 'graph': graph})
+			try:
+				college_pk = int(college_pk)
+				data = cached('stats', ['record', college_pk, year], lambda: get_record_stats(request, college_pk, year), settings.CACHE_STATS_TIMEOUT)
+			except (ValueError, YearRecord.DoesNotExist):
+				return JsonResponse(status=400, data={'errors': 'No stats for the chosen college and year.'})
+			return JsonResponse(status=200, data=data)
 		else:
 			return JsonResponse(status=400, data={'errors': 'Please choose from the options.'})
 	else:
 		context = {'stats_form': StatsForm()}
 	return render(request, 'stats/stats.html', context)
 
-@require_GET
-def past_recruiters(request):
-	if request.user.is_authenticated():
-		return handle_user_type(request, redirect_request=True)
-	try:
-		get_template('stats/past_recruiters_compiled.html')
-		return render(request, 'stats/past_recruiters_compiled.html', {}) # optimization
-	except:
-		pass
+def get_past_recruiters_html(request):
 	queryset = Company.objects.all().order_by('name')
-	half = queryset.count()/2
+	half = queryset.count()//2
 	i,j = 0,0
 	ones = queryset[:half]
 	twos = queryset[half:]
@@ -91,13 +95,11 @@ def past_recruiters(request):
 		i = i+1
 		j = j+1
 		companies.append(data)
-	r = render(request, 'stats/past_recruiters.html', {'companies': companies})
-# compiling the data to a template because the data to be displayed is constant for long time
-# so why hit the db
-	content = r.content.decode('utf-8')
-	f = open('templates/stats/past_recruiters_compiled.html', 'w')
-	try:
-		f.write(content)
-	finally:
-		f.close()
-	return r
+	return render_to_string('stats/past_recruiters.html', {'companies': companies}, request=request)
+
+@require_GET
+def past_recruiters(request):
+	if request.user.is_authenticated():
+		return handle_user_type(request, redirect_request=True)
+	# The list stays the same for long, so the rendered page is cached (until a stats company changes)
+	return HttpResponse(cached('stats', ['past_recruiters'], lambda: get_past_recruiters_html(request), settings.CACHE_STATS_TIMEOUT))
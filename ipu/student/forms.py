@@ -7,7 +7,7 @@ from django.core.urlresolvers import reverse
 from django.db.utils import IntegrityError
 from django.utils.translation import ugettext_lazy as _
 from account.models import CustomUser
-from college.models import College, Stream
+from college.utils import college_has_stream, get_reference_data, get_stream_programme_pk
 from student.models import Student, Qualification, TechProfile, ScoreMarksheet, CGPAMarksheet, Score
 from urllib.parse import urlparse
 import re
@@ -66,11 +66,12 @@ class StudentSignupForm(forms.ModelForm):
 			raise forms.ValidationError(_('Enrollment number should contain only digits'))
 		except ValueError:
 			raise forms.ValidationError(_('Enrollment number should be 11 digits long'))
-		if College.objects.filter(code=coll).count() == 0:
+		reference = get_reference_data()
+		if coll not in reference.colleges_by_code:
 			raise forms.ValidationError(_('Institution with code %s does not exist' % coll))
-		if Stream.objects.filter(code=strm).count() == 0:
+		if strm not in reference.streams_by_code:
 			raise forms.ValidationError(_('Incorrect programme code'))
-		if not College.objects.get(code=coll).streams.filter(code=strm).exists():
+		if not college_has_stream(coll, strm):
 			raise forms.ValidationError(_('Invalid enrollment number'))
 		return username
 
@@ -139,7 +140,7 @@ class StudentCreationForm(forms.ModelForm):
 		self.fields['phone_number'].required = True
 		self.initial['college'] = self.coll
 		self.initial['stream'] = self.strm
-		self.initial['programme'] = Stream.objects.get(pk=self.strm).programme.pk
+		self.initial['programme'] = get_stream_programme_pk(self.strm)
 		self.fields['college'].widget.attrs['disabled'] = 'disabled'
 		self.fields['stream'].widget.attrs['disabled'] = 'disabled'
 		self.fields['programme'].widget.attrs['disabled'] = 'disabled'
@@ -159,7 +160,7 @@ class StudentCreationForm(forms.ModelForm):
 
 	def clean_programme(self):
 		programme = self.cleaned_data.get('programme', None)
-		if programme and programme.pk != Stream.objects.get(pk=self.strm).programme.pk:
+		if programme and programme.pk != get_stream_programme_pk(self.strm):
 			raise forms.ValidationError(_('Error. Programme field changed.'))
 		return programme
 
@@ -1,14 +1,97 @@
 from django.core.management.base import BaseCommand, CommandError
 from django.core.mail import mail_admins
+from django.db import connection, transaction
+from django.db.models import F
 
 from account.models import CustomUser
+from account.search import unindex
+from college.models import College
+from college.utils import get_college_pk, get_reference_data
+from ipu.cache import invalidate
+from recruitment.utils import invalidate_master_excel
 from student.models import Student
 
+from concurrent.futures import ThreadPoolExecutor
 import getpass, datetime, logging
 
 accountLogger = logging.getLogger('account')
 studentLogger = logging.getLogger('student')
 
+# Special Case
+# Programme: B.Tech./M.Tech. Dual Degree
+# The programme offers 6 years in total.
+# This programme has optional M.Tech. choice after B.Tech. completion
+# That is, 4 (B.Tech.) + 2 (M.Tech.[optional])
+# Thus, it is required to separately handle the graduation of the students
+# enrolled in this programme who've only pursued B.Tech.
+# Not able to think of any other way, a hard coded logic is being applied
+# Checking for specific stream codes
+# TODO: Add stream codes in the list if such anamoly is found
+# Also, students who are pursuing the optional course will be marked GRADUATED.
+# They'll need to be manually unmarked (admin panel).
+EXCEPTIONAL_STREAMS = {'015': ['4'], '032': ['4'], '128': ['4']} # {'stream_codes': [possible_prog_termination_years]}
+
+def is_promoted(username, current_year, this_year):
+	'''
+		Strictly assuming that the command is run in July
+		Eg. If the script is run in July 2020
+			Student's admission year is 2018
+			Student's current_year = (2020 - 2018 + 1) = 3,
+			then it is correct (already incremented). Thus, the student is left alone.
+	'''
+	try:
+		return int(current_year) == this_year - int('20' + username[-2:]) + 1
+	except ValueError: # Username doesn't end in the admission year
+		return False
+
+def graduates(programme_years, stream_code, current_year):
+	''' True if the (programme, stream, year) cohort graduates, False if it moves to the next year '''
+	if stream_code in EXCEPTIONAL_STREAMS and current_year in EXCEPTIONAL_STREAMS[stream_code]:
+		return True
+	return int(current_year) >= int(programme_years) # i.e., as of 1st July XXXX, the cohort has just completed the even semester of the final year
+
+def plan_college(college_pk, skip_promoted=False):
+	'''
+	One read of the college's current students, grouped into (programme, stream, current_year) cohorts.
+	Every student of a cohort gets the same treatment; with skip_promoted, bar those already incremented this year (see is_promoted).
+	Returns [{'programme', 'stream', 'year', 'graduate', 'pks', 'skipped'}], highest years first.
+	'''
+	data, this_year = get_reference_data(), datetime.datetime.today().year
+	cohorts = {}
+	for pk, username, programme, stream, current_year in Student.studying.filter(college=college_pk).values_list('pk', 'profile__username', 'programme', 'stream', 'current_year'):
+		cohort = cohorts.setdefault((programme, stream, current_year), {'pks': [], 'skipped': []})
+		cohort['skipped' if skip_promoted and is_promoted(username, current_year, this_year) else 'pks'].append(pk)
+	plan = []
+	for (programme, stream, current_year), cohort in cohorts.items():
+		cohort.update(programme=programme, stream=stream, year=current_year, graduate=graduates(data.programmes[programme].years, data.streams[stream].code, current_year))
+		plan.append(cohort)
+	# Incrementing year 1 before year 2 would have the year 2 update pick the just incremented students up again
+	return sorted(plan, key=lambda c: c['year'], reverse=True)
+
+def graduate_college(college_pk, skip_promoted=False):
+	''' Plans and applies grouped updates inside one transaction: a failure leaves the college as it was. Returns (plan, graduated pks, incremented pks) '''
+	graduated, incremented = [], []
+	with transaction.atomic():
+		plan = plan_college(college_pk, skip_promoted)
+		for cohort in plan:
+			if not cohort['pks']:
+				continue
+			students = Student.studying.filter(college=college_pk, programme=cohort['programme'], stream=cohort['stream'], current_year=cohort['year']).exclude(pk__in=cohort['skipped'])
+			if cohort['graduate']:
+				students.update(has_graduated=True)
+				graduated += cohort['pks']
+			else:
+				students.update(current_year=str(int(cohort['year']) + 1))
+				incremented += cohort['pks']
+		# Broadcasts stay addressed to the years they were sent to (see BroadcastNotificationManager.for_user)
+		College.objects.filter(pk=college_pk).update(promotions=F('promotions') + 1)
+		# update() sends no post_save; doing what the receivers in student.models and faculty.models would
+		if graduated:
+			unindex(*Student.objects.filter(pk__in=graduated).values_list('profile', flat=True))
+	invalidate('profile:college:%d' % college_pk)
+	invalidate_master_excel(College.objects.filter(pk=college_pk))
+	return plan, graduated, incremented
+
 class Command(BaseCommand):
 	help = 'Increments Academic Year: Graduates Final Year Students; Increments current_year of students still studying'
 
@@ -16,34 +99,43 @@ class Command(BaseCommand):
 #		parser.add_argument('username', nargs='?', type=str)
 		parser.add_argument('--college', action='append', help="College (Codes) whose academic cal needs to be incremented", required=True, dest='college_codes')
 		parser.add_argument('--override', action='store_true', help="Increment Academic Year Irrespective of whether the command is run in July", dest='override')
+		parser.add_argument('--dry-run', action='store_true', help="Only print what would change", dest='dry_run')
+		parser.add_argument('--workers', type=int, default=4, help="Colleges updated in parallel, each in its own transaction", dest='workers')
+		parser.add_argument('--skip-promoted', action='store_true', help="Leave alone students whose current_year already matches their admission year (from the username)", dest='skip_promoted')
 
 	def handle(self, *args, **options):
-		
 
-		# AUTHENTICATION
+
 		college_codes = options['college_codes']
-		
+
 		print('College Codes: %s' % college_codes)
-		
-		username = input('Enter Username: ')
-		pwd = getpass.getpass()
-		user = CustomUser.objects.get(username=username)
-		if not user.is_superuser:
-			raise CommandError("Not Authorized")
-		if not user.check_password(pwd):
-			raise CommandError("Incorrect Password. Try again.")
+		try:
+			colleges = [(code, get_college_pk(code)) for code in college_codes]
+		except College.DoesNotExist as e:
+			raise CommandError(str(e))
+
+		# AUTHENTICATION
+		if not options['dry_run']: # Which only reads
+			username = input('Enter Username: ')
+			pwd = getpass.getpass()
+			user = CustomUser.objects.get(username=username)
+			if not user.is_superuser:
+				raise CommandError("Not Authorized")
+			if not user.check_password(pwd):
+				raise CommandError("Incorrect Password. Try again.")
 
 		# WARNINGS
 		if not datetime.datetime.today().month == 7:
 			if options.get('override'):
 				self.stdout.write(self.style.WARNING('You are not running this script in July. It will surely BREAK things.\nConsult this script writer before running the script.'))
-				self.stdout.write(self.style.WARNING('\nStill want to run the script? (y/N)'), ending=' ')
-				if not input().lower().startswith('y'):
-					self.stdout.write(self.style.SUCCESS('Command Withdrawn Successfully'))
-					return
+				if not options['dry_run']:
+					self.stdout.write(self.style.WARNING('\nStill want to run the script? (y/N)'), ending=' ')
+					if not input().lower().startswith('y'):
+						self.stdout.write(self.style.SUCCESS('Command Withdrawn Successfully'))
+						return
 			else:
 				raise CommandError('Academic Calendar should not be updated in any month other than July. Try python manage.py <command> \'help\'')
-		else:
+		elif not options['dry_run']:
 			self.stdout.write(self.style.WARNING('Are you sure you want to run the script? (y/N)'), ending=' ')
 			if not input().lower().startswith('y'):
 				self.stdout.write(self.style.SUCCESS('Command Withdrawn Successfully'))
@@ -52,69 +144,49 @@ class Command(BaseCommand):
 
 		# Graduating students after 1st July (i.e. completion of their last sem)
 
-		students = Student.studying.filter(college__code__in=college_codes) # Returns only current students who are studying i.e. not alumni
-		print("Total Students", students.count())
-		
-		graduated_pks = []
-		incremented_pks = []
-
-		for student in students:
-			programme = student.programme
-			stream = student.stream
-
-			# Strictly assuming that the command is run in July
-			admission_year = '20' + student.profile.username[-2:]
-			diff = datetime.datetime.today().year - int(admission_year)
-			if student.current_year == (diff + 1):
-				'''
-					Eg. If the script is run in July 2020
-						Student's admission year is 2018
-						Student's current_year = (2020 - 2018 + 1) = 3,
-						then it is correct. Thus, continue.
-				'''
-				continue
-
-			# Special Case
-			# Programme: B.Tech./M.Tech. Dual Degree
-			# The programme offers 6 years in total.
-			# This programme has optional M.Tech. choice after B.Tech. completion
-			# That is, 4 (B.Tech.) + 2 (M.Tech.[optional])
-			# Thus, it is required to separately handle the graduation of the students
-			# enrolled in this programme who've only pursued B.Tech.
-			# Not able to think of any other way, a hard coded logic is being applied
-			# Checking for specific stream codes
-			# TODO: Add stream codes in the list if such anamoly is found
-			# Also, students who are pursuing the optional course will be marked GRADUATED.
-			# They'll need to be manually unmarked (admin panel).
-
-			exceptional_streams = {'015': ['4'], '032': ['4'], '128': ['4']} # {'stream_codes': [possible_prog_termination_years]}
-			
-			try:
-				if stream.code in exceptional_streams:
-					if student.current_year in exceptional_streams[stream.code]:
-						student.has_graduated = True
-						student.save()
-						graduated_pks.append(student.pk)
-						continue
-				
-				if int(student.current_year) >= int(programme.years):
-					""" i.e., as of 1st July XXXX, student has just completed the even semester of the final year """
-					# Then graduate him/her
-					student.has_graduated = True
-					student.save()
-					graduated_pks.append(student.pk)
-
-				elif int(student.current_year) < int(programme.years):
-					# Increase the student's current_year
-					student.current_year = str(int(student.current_year) + 1)
-					student.save()
-					incremented_pks.append(student.pk)
-			except Exception as e:
-				studentLogger.error('GRADUATE - Student<%d> [%s]' % (student.pk, student.profile.username))
-				self.stdout.write(self.style.ERROR('Error occurred while running. Continuing. Check student logs'))
-#				mail_admins()
-
-		studentLogger.info('Students Graduated: %s' % (graduated_pks))
-		studentLogger.info('Students Incremented: %s' % (incremented_pks))
-		accountLogger.info('SuperUser - %s - Incremented Academic Calendar for %s.\nGraduated: %s\nIncremented: %s' % (username, college_codes, graduated_pks, incremented_pks))
-		self.stdout.write(self.style.SUCCESS('Successfully Run. Check logs.'))
+		def run(college):
+			code, pk = college
+			try: # Every thread has its own connection
+				if options['dry_run']:
+					return (code, plan_college(pk, options['skip_promoted']), None)
+				plan, graduated, incremented = graduate_college(pk, options['skip_promoted'])
+				return (code, plan, (graduated, incremented))
+			finally:
+				connection.close()
+
+		failed = []
+		with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as executor:
+			futures = [(code, executor.submit(run, (code, pk))) for code, pk in colleges]
+			for code, future in futures:
+				try:
+					code, plan, result = future.result()
+				except Exception as e:
+					failed.append(code)
+					studentLogger.exception('GRADUATE - College<%s> rolled back - %s' % (code, e))
+					self.stdout.write(self.style.ERROR('%s: Error occurred, nothing was changed. Continuing. Check student logs' % code))
+#					mail_admins()
+					continue
+				self.report(code, plan)
+				if result:
+					graduated_pks, incremented_pks = result
+					studentLogger.info('%s - Students Graduated: %s' % (code, graduated_pks))
+					studentLogger.info('%s - Students Incremented: %s' % (code, incremented_pks))
+					accountLogger.info('SuperUser - %s - Incremented Academic Calendar for %s.\nGraduated: %s\nIncremented: %s' % (username, code, graduated_pks, incremented_pks))
+
+		if options['dry_run']:
+			self.stdout.write(self.style.SUCCESS('Dry run. Nothing was changed.'))
+		elif failed:
+			raise CommandError('Failed for %s. Rerun the command for them.' % ', '.join(failed))
+		else:
+			self.stdout.write(self.style.SUCCESS('Successfully Run. Check logs.'))
+
+	def report(self, code, plan):
+		data = get_reference_data()
+		graduated = sum(len(c['pks']) for c in plan if c['graduate'])
+		incremented = sum(len(c['pks']) for c in plan if not c['graduate'])
+		skipped = sum(len(c['skipped']) for c in plan)
+		self.stdout.write('%s: %d graduated, %d incremented, %d already incremented' % (code, graduated, incremented, skipped))
+		for cohort in sorted(plan, key=lambda c: (str(data.streams[c['stream']]), c['year'])):
+			action = 'graduated' if cohort['graduate'] else 'to year %d' % (int(cohort['year']) + 1)
+			self.stdout.write('\t%s, year %s: %d %s%s' % (data.streams[cohort['stream']], cohort['year'], len(cohort['pks']), action,
+							  ', %d skipped' % len(cohort['skipped']) if cohort['skipped'] else ''))
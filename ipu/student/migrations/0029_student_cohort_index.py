@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('college', '0003_auto_20170801_0023'),
+        ('student', '0028_student_has_graduated'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='student',
+            index_together=set([('college', 'has_graduated', 'stream', 'current_year')]),
+        ),
+    ]
@@ -1,11 +1,12 @@
 from django.core import validators
 from django.core.exceptions import ValidationError
 from django.db import models
-from django.db.models.signals import post_delete
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.utils.translation import ugettext_lazy as _
 from account.models import CustomUser
 from college.models import (College, Programme, Stream)
+from ipu.cache import invalidate
 from urllib.parse import urlparse
 
 from decimal import Decimal
@@ -226,6 +227,7 @@ class Student(models.Model):
 
 	class Meta:
 		ordering = ('profile__username',)
+		index_together = [['college', 'has_graduated', 'stream', 'current_year']] # Student.studying cohorts
 
 	objects = models.Manager()
 	studying = CurrentStudentsManager()
@@ -279,3 +281,31 @@ def delete_photo_resume(sender, **kwargs):
 		student.resume.delete(False)
 	except:
 		pass
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def invalidate_college_profile(sender, **kwargs):
+	if kwargs.get('created', True): # The college's profile shows its number of students
+		invalidate('profile:college:%d' % kwargs['instance'].college_id)
+
+@receiver(post_save, sender=ExaminationBoard)
+@receiver(post_delete, sender=ExaminationBoard)
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def invalidate_reference_data(sender, **kwargs):
+	from college.utils import invalidate_reference_data # college.utils imports this module
+	invalidate_reference_data()
+
+# Keeping the search index (account.search) in sync
+SEARCHED_FIELDS = {'firstname', 'lastname', 'college', 'has_graduated'}
+
+@receiver(post_save, sender=Student)
+def index_student(sender, **kwargs):
+	from account.search import index_student
+	if kwargs.get('update_fields') is None or SEARCHED_FIELDS.intersection(kwargs['update_fields']):
+		index_student(kwargs['instance'])
+
+@receiver(post_delete, sender=Student)
+def unindex_student(sender, **kwargs):
+	from account.search import unindex
+	unindex(kwargs['instance'].profile_id)
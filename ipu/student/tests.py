@@ -1,3 +1,66 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
 
-# Create your tests here.
+from student.management.commands import graduatestudents
+from student.management.commands.graduatestudents import graduates, is_promoted, plan_college
+
+from collections import namedtuple
+from unittest import mock
+import datetime
+
+Programme = namedtuple('Programme', ['years'])
+Stream = namedtuple('Stream', ['code'])
+ReferenceData = namedtuple('ReferenceData', ['programmes', 'streams'])
+
+class GraduatesTests(SimpleTestCase):
+
+	def test_final_year_graduates(self):
+		self.assertTrue(graduates('4', '027', '4'))
+		self.assertFalse(graduates('4', '027', '3'))
+
+	def test_exceptional_streams_graduate_early(self):
+		self.assertTrue(graduates('6', '015', '4'))
+		self.assertFalse(graduates('6', '015', '5'))
+		self.assertFalse(graduates('6', '027', '4'))
+
+	def test_is_promoted(self):
+		this_year = 2020
+		self.assertTrue(is_promoted('01214802718', '3', this_year)) # Admitted 2018, in year 3 as of 2020
+		self.assertFalse(is_promoted('01214802718', '2', this_year))
+		self.assertFalse(is_promoted('student', '2', this_year))
+
+@mock.patch.object(graduatestudents, 'get_reference_data', lambda: ReferenceData(
+	programmes={1: Programme('4'), 2: Programme('6')},
+	streams={10: Stream('027'), 11: Stream('015')},
+))
+class PlanCollegeTests(SimpleTestCase):
+
+	def plan(self, rows, **kwargs):
+		with mock.patch.object(graduatestudents, 'Student') as Student:
+			Student.studying.filter.return_value.values_list.return_value = rows
+			return plan_college(1, **kwargs)
+
+	def test_cohorts(self):
+		plan = self.plan([
+			(1, 'a', 1, 10, '4'),
+			(2, 'b', 1, 10, '4'),
+			(3, 'c', 1, 10, '3'),
+			(4, 'd', 2, 11, '4'), # Dual degree student done with B.Tech.
+		])
+		cohorts = {(c['programme'], c['stream'], c['year']): c for c in plan}
+		self.assertEqual(sorted(cohorts), [(1, 10, '3'), (1, 10, '4'), (2, 11, '4')])
+		self.assertEqual(sorted(cohorts[(1, 10, '4')]['pks']), [1, 2])
+		self.assertTrue(cohorts[(1, 10, '4')]['graduate'])
+		self.assertFalse(cohorts[(1, 10, '3')]['graduate'])
+		self.assertTrue(cohorts[(2, 11, '4')]['graduate'])
+
+	def test_highest_years_first(self):
+		plan = self.plan([(1, 'a', 1, 10, '1'), (2, 'b', 1, 10, '3'), (3, 'c', 1, 10, '2')])
+		self.assertEqual([c['year'] for c in plan], ['3', '2', '1'])
+
+	def test_promoted_students_are_only_skipped_on_request(self):
+		admitted = str(datetime.datetime.today().year - 1)[-2:]
+		rows = [(1, '012148027' + admitted, 1, 10, '2'), (2, '012148027' + admitted, 1, 10, '1')] # pk 1 already incremented
+		cohort = self.plan(rows)[0]
+		self.assertEqual((cohort['pks'], cohort['skipped']), ([1], []))
+		cohort = self.plan(rows, skip_promoted=True)[0]
+		self.assertEqual((cohort['pks'], cohort['skipped']), ([], [1]))
@@ -14,13 +14,14 @@ from account.decorators import require_user_types , check_recaptcha
 from account.forms import AccountForm, SocialProfileForm
 from account.models import CustomUser, SocialProfile
 from account.tasks import send_activation_email_task
-from account.utils import handle_user_type, get_relevant_reversed_url
-from college.models import College, Stream
+from account.utils import handle_user_type, get_relevant_reversed_url, has_groups
+from college.utils import get_college_pk, get_stream, get_stream_programme_pk
 from dummy_company.models import DummyCompany, DummySession
 from faculty.forms import VerifyStudentProfileForm
 from notification.models import Notification
+from notification.utils import get_unread_count
 from student.forms import StudentLoginForm, StudentSignupForm, StudentCreationForm, StudentEditForm, QualificationForm, TechProfileForm, FileUploadForm, PaygradeForm, ScoreForm, ScoreMarksheetForm, CGPAMarksheetForm, QualForm
-from recruitment.models import Association, PlacementSession
+from recruitment.models import Association, PlacementSession, OpenOpportunity, SelectionCriteria
 from student.models import Student, TechProfile, Qualification, SchoolMarksheet, Score
 from . import scrape
 
@@ -87,8 +88,8 @@ def create_student(request, **kwargs):
 		except ValueError:
 #			pass
 			raise Http404(_('Enrollment number should be 11 digits long'))
-		coll = College.objects.get(code=coll).pk
-		strm = Stream.objects.get(code=strm).pk
+		coll = get_college_pk(coll)
+		strm = get_stream(strm).pk
 		if request.method == 'GET':
 			f = StudentCreationForm(profile=user_profile, coll=coll, strm=strm, year=year)
 			try:
@@ -100,7 +101,7 @@ def create_student(request, **kwargs):
 			POST = request.POST.copy()
 			POST['college'] = coll
 			POST['stream'] = strm
-			POST['programme'] = Stream.objects.get(pk=strm).programme.pk
+			POST['programme'] = get_stream_programme_pk(strm)
 			f = StudentCreationForm(POST, request.FILES, profile=user_profile, coll=coll, strm=strm, year=year)
 			if f.is_valid():
 				student = f.save()
@@ -167,7 +168,7 @@ def student_home(request, **kwargs):
 		context['tech_profile_form'] = TechProfileForm(student=student)
 	if not student.salary_expected:
 		context['paygrade_form'] = PaygradeForm()
-	context['badge'] = student.profile.notification_target.filter(is_read=False).count()
+	context['badge'] = get_unread_count(student.profile)
 	return render(request, 'student/home.html', context)
 ##	else:
 ##		return handle_user_type(request, redirect_request=True)
@@ -184,8 +185,8 @@ def edit_student(request, **kwargs):
 			except:
 				print("KAAABOOOOOOM ~~~~")
 				return JsonResponse(status=403, data={'location': get_relevant_reversed_url('S')})
-			coll = College.objects.get(code=coll).pk
-			strm = Stream.objects.get(code=strm).pk
+			coll = get_college_pk(coll)
+			strm = get_stream(strm).pk
 			try:
 				student = request.user.student
 			except Student.DoesNotExist:
@@ -209,7 +210,7 @@ def edit_student(request, **kwargs):
 				return JsonResponse(status=400, data={'errors': dict(f.errors.items())})
 			
 		elif request.user.type == 'F' and request.is_ajax():
-			if not request.user.groups.filter(name='Verifier'):
+			if not has_groups(request.user, ['Verifier']):
 				return JsonResponse(status=403, data={'error': 'Permission Denied. You cannot verify students'})
 			enroll = request.session.get('enrollmentno', None)
 			if not enroll:
@@ -285,7 +286,7 @@ def edit_qualifications(request, **kwargs):
 				return JsonResponse(status=400, data={'errors': dict(f.errors.items())})
 		
 		elif request.user.type == 'F' and request.is_ajax():
-			if not request.user.groups.filter(name='Verifier'):
+			if not has_groups(request.user, ['Verifier']):
 				return JsonResponse(status=403, data={'error': 'Permission Denied. You cannot verify students'})
 			enroll = request.session.get('enrollmentno', None)
 			if not enroll:
@@ -356,7 +357,7 @@ def delete_student(request, **kwargs):
 			faculty = request.user.faculty
 		except Faculty.DoesNotExist:
 			return redirect(settings.PROFILE_CREATION_URL['F'])
-		if not request.user.groups.filter(name='Verifier With Student Deletion Privilege'):
+		if not has_groups(request.user, ['Verifier With Student Deletion Privilege']):
 			return JsonResponse(status=403, data={'error': 'Permission Denied. You don\'t have permission to delete students.'})
 		enroll = request.session['enrollmentno']
 		if not enroll:
@@ -430,90 +431,46 @@ def companies_in_my_college(request, **kwargs):
 
 		if student.is_barred:
 			return JsonResponse(status=200, data={'barred': 'Sorry, you have been barred by your college. You cannot view/apply to various job and internship opportunities.'})
-		# Recruitment
-		associations = Association.objects.filter(college=student.college, approved=True, streams__pk__in=[student.stream.pk]).filter(~Q(session=None)).filter(session__application_deadline__gte=datetime.date.today()).filter(session__selection_criteria__years__contains=student.current_year)
-		associations = associations.order_by('session__application_deadline')
-		placement_sessions_assoc_pk = [a['association__pk'] for a in student.sessions.filter( Q(application_deadline__lt=datetime.date.today()) | Q(ended=True)).values('association__pk')]
-		associations = associations.exclude(pk__in=placement_sessions_assoc_pk)
-		# Dummy
-		dsessions = DummySession.objects.filter(dummy_company__college=student.college, streams__pk__in=[student.stream.pk]).filter(application_deadline__gte=datetime.date.today()).filter(selection_criteria__years__contains=student.current_year)
-		dsessions = dsessions.order_by('application_deadline')
-		dsessions = dsessions.exclude(pk__in=[ds.pk for ds in student.dummy_sessions.filter(Q(application_deadline__lt=datetime.date.today()) | Q(ended=True))])
-		# Eligibility
-		'''
-		eligible_criteria = set()
-		only_eligible_assoc = list()
-		for a in associations:
-			criterion = a.session.selection_criteria
-			if criterion in eligible_criteria:
-				only_eligible_assoc.append(a.pk)
+		# Listing is answered from the OpenOpportunity index, see recruitment.models
+		today = datetime.date.today()
+		opportunities = OpenOpportunity.objects.filter(college=student.college_id, stream=student.stream_id, year=student.current_year, application_deadline__gte=today)
+		opportunities = opportunities.filter(Q(type='I') | Q(salary__gte=student.salary_expected)) # Filtering jobs acc. to min_salary; salary=0 for I
+		opportunities = opportunities.select_related(
+			'session__association__company', 'session__association__programme', 'session__selection_criteria',
+			'dummy_session__dummy_company', 'dummy_session__programme', 'dummy_session__selection_criteria',
+		).prefetch_related('session__association__streams', 'dummy_session__streams').order_by('application_deadline')
+		opportunities = list(opportunities)
+		enrolled_sessions = set(student.sessions.values_list('pk', flat=True))
+		enrolled_dsessions = set(student.dummy_sessions.values_list('pk', flat=True))
+		# Eligibility, all criteria at once. Students yet to fill qualifications (None) still get to see the listing.
+		criteria = set((o.session or o.dummy_session).selection_criteria for o in opportunities)
+		eligibility = SelectionCriteria.objects.eligibility(criteria, Student.objects.filter(pk=student.pk))
+		listing = {'jobs': {'on': [], 'off': []}, 'internships': {'on': [], 'off': []}}
+		for o in opportunities:
+			group = listing['jobs' if o.type == 'J' else 'internships']
+			date = o.application_deadline + datetime.timedelta(1)
+			if o.session_id:
+				enrolled = o.session_id in enrolled_sessions
+				criterion = o.session.selection_criteria
+				entry = {'sessid': settings.HASHID_PLACEMENTSESSION.encode(o.session_id), 'assoc': o.session.association, 'date': date, 'is_dummy': False}
 			else:
-				if criterion.check_eligibility(student):
-					eligible_criteria.add(criterion)
-					only_eligible_assoc.append(a.pk)
-		associations = associations.filter(pk__in=only_eligible_assoc)
-		'''
-		# Actual
-		jobs = associations.filter(type='J').filter(salary__gte=student.salary_expected) # Filtering acc. to min_salary
-		enrolled_jobs = jobs.filter(session__students__pk__in = [student.pk])
-		unenrolled_jobs = jobs.exclude(pk__in = [j['pk'] for j in enrolled_jobs.values('pk')])
-		internships = associations.filter(type='I') # Not filtering acc. to min_salary because salary=0 for I
-		enrolled_internships = internships.filter(session__students__pk__in = [student.pk])
-		unenrolled_internships = internships.exclude(pk__in = [i['pk'] for i in enrolled_internships.values('pk')])
-		# Dummy
-		djobs = dsessions.filter(type='J').filter(salary__gte=student.salary_expected)
-		enrolled_djobs = djobs.filter(students__pk__in = [student.pk])
-		unenrolled_djobs = djobs.exclude(pk__in = [dj['pk'] for dj in enrolled_djobs.values('pk')])
-		dinternships = dsessions.filter(type='I')
-		enrolled_dinternships = dinternships.filter(students__pk__in = [student.pk])
-		unenrolled_dinternships = dinternships.exclude(pk__in = [di['pk'] for di in enrolled_dinternships.values('pk')])
+				enrolled = o.dummy_session_id in enrolled_dsessions
+				criterion = o.dummy_session.selection_criteria
+				entry = {'dsessid': settings.HASHID_DUMMY_SESSION.encode(o.dummy_session_id), 'dsess': o.dummy_session, 'date': date, 'is_dummy': True}
+			if enrolled:
+				group['on'].append(entry)
+			elif eligibility.is_eligible(criterion.pk, student.pk) != False:
+				group['off'].append(entry)
 		# # #
 		render_data = {}; context = {}
-		context['datecomp'] = datetime.date.today() + datetime.timedelta(1)
-		context['htmlid'] = 'jobs'
-		data = []
-		for j in enrolled_jobs:
-			sess = settings.HASHID_PLACEMENTSESSION.encode(j.session.pk)
-			data.append({'sessid':sess, 'assoc':j, 'date':j.session.application_deadline + datetime.timedelta(1), 'is_dummy': False})
-		for j in enrolled_djobs:
-			dsess = settings.HASHID_DUMMY_SESSION.encode(j.pk)
-			data.append({'dsessid': dsess, 'dsess': j, 'date': j.application_deadline + datetime.timedelta(1), 'is_dummy': True})
-		data = sorted(data, key=lambda x: x['date'])
-		context['on'] = data
-		data = []
-		for j in unenrolled_jobs:
-			sess = settings.HASHID_PLACEMENTSESSION.encode(j.session.pk)
-			data.append({'sessid':sess, 'assoc':j, 'date':j.session.application_deadline + datetime.timedelta(1), 'is_dummy': False})
-		for j in unenrolled_djobs:
-			dsess = settings.HASHID_DUMMY_SESSION.encode(j.pk)
-			data.append({'dsessid': dsess, 'dsess': j, 'date': j.application_deadline + datetime.timedelta(1), 'is_dummy': True})
-		data = sorted(data, key=lambda x: x['date'])
-		context['off'] = data
-		render_data['jobs'] = render(request, 'student/companies_in_my_college.html', context).content.decode('utf-8')
-		context['htmlid'] = 'internships'
-		data = []
-		for i in enrolled_internships:
-			sess = settings.HASHID_PLACEMENTSESSION.encode(i.session.pk)
-			data.append({'sessid':sess, 'assoc':i, 'date':i.session.application_deadline + datetime.timedelta(1)})
-		for i in enrolled_dinternships:
-			dsess = settings.HASHID_DUMMY_SESSION.encode(i.pk)
-			data.append({'dsessid': dsess, 'dsess': i, 'date': i.application_deadline + datetime.timedelta(1), 'is_dummy': True})
-		data = sorted(data, key=lambda x: x['date'])
-		context['on'] = data
-		data = []
-		for i in unenrolled_internships:
-			sess = settings.HASHID_PLACEMENTSESSION.encode(i.session.pk)
-			data.append({'sessid':sess, 'assoc':i, 'date':i.session.application_deadline + datetime.timedelta(1)})
-		for i in unenrolled_dinternships:
-			dsess = settings.HASHID_DUMMY_SESSION.encode(i.pk)
-			data.append({'dsessid': dsess, 'dsess': i, 'date': i.application_deadline + datetime.timedelta(1), 'is_dummy': True})
-		data = sorted(data, key=lambda x: x['date'])
-		context['off'] = data
-		render_data['internships'] = render(request, 'student/companies_in_my_college.html', context).content.decode('utf-8')
-		if not any(enrolled_jobs) and not any(enrolled_djobs) and not any(unenrolled_jobs) and not any(unenrolled_djobs):
-			render_data['jobs_empty'] = True
-		if not any(enrolled_internships) and not any(enrolled_dinternships) and not any(unenrolled_internships) and not any(unenrolled_dinternships):
-			render_data['internships_empty'] = True
+		context['datecomp'] = today + datetime.timedelta(1)
+		for htmlid in ['jobs', 'internships']:
+			context['htmlid'] = htmlid
+			context['on'] = listing[htmlid]['on']
+			context['off'] = listing[htmlid]['off']
+			render_data[htmlid] = render(request, 'student/companies_in_my_college.html', context).content.decode('utf-8')
+			if not context['on'] and not context['off']:
+				render_data['%s_empty' % htmlid] = True
 		return JsonResponse(status=200, data=render_data)
 ##		else:
 ##			return JsonResponse(status=400, data={'location': get_relevant_reversed_url(request)})
@@ -2,7 +2,8 @@
 
 from django.utils.crypto import get_random_string
 from django.conf import settings
-import re
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+import mimetypes, os, re
 
 # CAUTION: If you plan to change the file storage directory structure (MEDIA_ROOT/actor/fieldname), then modify this function accordingly.
 # # # # # # # DONT REMOVE THIS FUNCTION... MIGRATIONS CAUSE ERROR
@@ -72,3 +73,58 @@ def validate_username_for_urls(username):
 		if re.compile(pattern).match(username):
 			return False
 	return True
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64*1024
+
+def serve_file(request, path, filename=None, content_type=None, attachment=True):
+	''' Serves a file under MEDIA_ROOT as per settings.FILE_SERVING_BACKEND '''
+	content_type = content_type or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+	backend = getattr(settings, 'FILE_SERVING_BACKEND', 'django')
+	if backend == 'nginx':
+		# nginx streams the file (and handles Range) from its internal location
+		response = HttpResponse(content_type=content_type)
+		response['X-Accel-Redirect'] = settings.FILE_SERVING_INTERNAL_URL + os.path.relpath(path, settings.MEDIA_ROOT)
+	elif backend == 'sendfile':
+		response = HttpResponse(content_type=content_type)
+		response['X-Sendfile'] = path
+	else:
+		response = get_ranged_file_response(request, path, content_type)
+	if filename:
+		response['Content-Disposition'] = '%s; filename=%s' % ('attachment' if attachment else 'inline', filename)
+	return response
+
+def get_ranged_file_response(request, path, content_type):
+	''' Chunked response honouring a single "Range: bytes=start-end" header, so that interrupted downloads can resume '''
+	size = os.path.getsize(path)
+	match = RANGE_RE.match(request.META.get('HTTP_RANGE', '').strip())
+	if not match or match.groups() == ('', ''):
+		response = FileResponse(open(path, 'rb'), content_type=content_type)
+		response['Content-Length'] = size
+		response['Accept-Ranges'] = 'bytes'
+		return response
+	start, end = match.groups()
+	if start:
+		start, end = int(start), min(int(end) if end else size-1, size-1)
+	else: # Suffix range, i.e. last `end` bytes
+		start, end = max(size-int(end), 0), size-1
+	if start > end or start >= size:
+		response = HttpResponse(status=416)
+		response['Content-Range'] = 'bytes */%d' % size
+		return response
+	response = StreamingHttpResponse(read_file_range(path, start, end-start+1), status=206, content_type=content_type)
+	response['Content-Length'] = end-start+1
+	response['Content-Range'] = 'bytes %d-%d/%d' % (start, end, size)
+	response['Accept-Ranges'] = 'bytes'
+	return response
+
+def read_file_range(path, start, length):
+	with open(path, 'rb') as f:
+		f.seek(start)
+		while length > 0:
+			chunk = f.read(min(CHUNK_SIZE, length))
+			if not chunk:
+				break
+			length -= len(chunk)
+			yield chunk